@@ -0,0 +1,217 @@
+from notebooks.experiments.embedding_generation import EmbeddingGenerator
+from src.data_ingestion.text_cleaner import TextCleaner
+from src.models.embeddings.sentence_transformers.stub_embedder import StubEmbedder
+from src.models.llm.legal_llm_model.stub_llm import StubLLM
+from src.pipelines.ingestion_pipeline import IngestionPipeline
+from src.pipelines.retrieval_pipeline import RetrievalPipeline
+from src.retrieval.vector_db.chromadb_handler import load_embeddings_to_chromadb
+from src.utils.profiling import percentile
+from src.utils.text_processing import RecursiveTextSplitter, TextCleaningEngine
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+SCHEMA_VERSION = 1
+
+ACTS = ["Indian Penal Code, 1860", "Code of Criminal Procedure, 1973", "Indian Contract Act, 1872",
+        "Right to Information Act, 2005", "Consumer Protection Act, 2019", "Indian Evidence Act, 1872"]
+TOPICS = ["bail", "murder", "contract", "consideration", "evidence", "appeal", "writ", "fundamental rights",
+          "information", "consumer", "negligence", "cognizable offence", "anticipatory bail", "jurisdiction"]
+FILLER = ("the court held that the accused shall be liable under the provisions of the act and the high court "
+          "observed that the petitioner had a right to be heard before the tribunal passed any order").split()
+QUERIES = [f"What does the law say about {topic}?" for topic in TOPICS] + [
+    "Explain the essentials of a valid contract under the Indian Contract Act.",
+    "What is anticipatory bail under the Code of Criminal Procedure?",
+    "Summarise the Right to Information Act, 2005.",
+]
+
+def synthetic_page(rng, number, pages):
+    """One raw page of legal-looking text with the headers, citations and section numbers the cleaner strips."""
+    act = rng.choice(ACTS)
+    lines = [f"Page {number} of {pages}"]
+    for _ in range(rng.randint(4, 8)):
+        topic = rng.choice(TOPICS)
+        clauses = (" ".join(rng.choices(FILLER, k=rng.randint(8, 16))) for _ in range(rng.randint(3, 6)))
+        lines.append(f"Section {rng.randint(1, 500)}. On {topic} under the {act}, " + ". ".join(clauses) + "."
+                     + f" See State v. {rng.choice(['Kumar', 'Sharma', 'Rao'])}, {rng.randint(1, 30)} SCC "
+                     f"{rng.randint(1, 900)} ({rng.randint(1950, 2023)}).")
+    return "\n".join(lines)
+
+def write_corpus(base_path, documents=30, pages=12, seed=0):
+    """Write a synthetic raw corpus (plain-text pages) for every data type and return its size in MB."""
+    rng = random.Random(seed)
+    total = 0
+    for config in TextCleaner(base_path).paths.values():
+        raw_path = config["input"]
+        os.makedirs(raw_path, exist_ok=True)
+        for i in range(documents):
+            text = "\f".join(synthetic_page(rng, page + 1, pages) for page in range(pages))
+            with open(os.path.join(raw_path, f"doc_{i:04d}.txt"), 'w', encoding='utf-8') as f:
+                f.write(text)
+            total += len(text.encode('utf-8'))
+    return total / 1e6
+
+def raw_pages(base_path):
+    """Every raw page of the synthetic corpus."""
+    pages = []
+    for config in TextCleaner(base_path).paths.values():
+        raw_path = config["input"]
+        for name in sorted(os.listdir(raw_path)):
+            with open(os.path.join(raw_path, name), 'r', encoding='utf-8') as f:
+                pages.extend(f.read().split("\f"))
+    return pages
+
+def bench_cleaning(pages):
+    """Cleaning throughput of the TextCleaningEngine in MB/s."""
+    engine = TextCleaningEngine()
+    megabytes = sum(len(page.encode('utf-8')) for page in pages) / 1e6
+    start = time.perf_counter()
+    cleaned = [engine.clean(page) for page in pages]
+    elapsed = time.perf_counter() - start
+    return {"pages": len(pages), "megabytes": megabytes, "seconds": elapsed,
+            "mb_per_s": megabytes / elapsed if elapsed else 0.0}, cleaned
+
+def bench_chunking(texts):
+    """Chunking throughput of the native splitter."""
+    splitter = RecursiveTextSplitter()
+    megabytes = sum(len(text.encode('utf-8')) for text in texts) / 1e6
+    start = time.perf_counter()
+    chunks = [chunk for text in texts for chunk in splitter.split_text(text)]
+    elapsed = time.perf_counter() - start
+    return {"chunks": len(chunks), "megabytes": megabytes, "seconds": elapsed,
+            "mb_per_s": megabytes / elapsed if elapsed else 0.0,
+            "chunks_per_s": len(chunks) / elapsed if elapsed else 0.0}, chunks
+
+def bench_embedding(generator, chunks):
+    """Embedding throughput of the generator's batched encode path in chunks/s."""
+    generator.generate_embeddings(chunks[:generator.batch_size])  # Warm-up (loads a real model)
+    start = time.perf_counter()
+    generator.generate_embeddings(chunks)
+    elapsed = time.perf_counter() - start
+    return {"chunks": len(chunks), "seconds": elapsed, "chunks_per_s": len(chunks) / elapsed if elapsed else 0.0}
+
+def bench_ingestion(base_path, embedder):
+    """Run the full ingestion pipeline once and report its stage spans."""
+    pipeline = IngestionPipeline(base_path, embedder=embedder)
+    for config in pipeline.text_cleaner.paths.values():
+        config["type"] = "txt"  # The synthetic corpus is plain text; PDF parsing is not measured
+    start = time.perf_counter()
+    pipeline.run()
+    return {"seconds": time.perf_counter() - start, "stages": pipeline.stage_stats()}, pipeline
+
+def bench_chroma_load(base_path, vectors, workers=4):
+    """Bulk-load every stored shard into Chroma again and report vectors per second."""
+    start = time.perf_counter()
+    load_embeddings_to_chromadb(base_path, workers=workers, resume=False)
+    elapsed = time.perf_counter() - start
+    return {"vectors": vectors, "seconds": elapsed, "vectors_per_s": vectors / elapsed if elapsed else 0.0}
+
+def bench_retrieval(base_path, embedder, queries, n_results=5, llm_latency=0.0):
+    """Run queries through RetrievalPipeline.run and report end-to-end percentiles and stage spans."""
+    pipeline = RetrievalPipeline(base_path, use_cache=False, embedder=embedder, context_tokens=None,
+                                 llm_client=StubLLM(latency=llm_latency, tokens_per_second=1e6))
+    pipeline.run(queries[0], n_results)  # Warm-up
+    pipeline.timer.reset()
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        pipeline.run(query, n_results)
+        latencies.append(time.perf_counter() - start)
+    return {"queries": len(queries), "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000, "p99_ms": percentile(latencies, 99) * 1000,
+            "qps": len(latencies) / sum(latencies) if latencies else 0.0, "stages": pipeline.stage_stats()}
+
+def git_commit():
+    """Current git commit of the checkout, or None."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(documents=30, pages=12, queries=200, embedder="stub", llm_latency=0.0, seed=0):
+    """Run every benchmark against a fresh synthetic corpus and return the report."""
+    model = StubEmbedder() if embedder == "stub" else None  # None: the configured sentence-transformers model
+    report = {"schema_version": SCHEMA_VERSION,
+              "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+              "git_commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "config": {"documents": documents, "pages": pages, "queries": queries, "embedder": embedder,
+                         "llm_latency": llm_latency, "seed": seed}}
+    with tempfile.TemporaryDirectory() as base_path:
+        report["corpus_mb"] = write_corpus(base_path, documents, pages, seed)
+        report["cleaning"], cleaned = bench_cleaning(raw_pages(base_path))
+        report["chunking"], chunks = bench_chunking(["\n".join(cleaned[i:i + pages])
+                                                     for i in range(0, len(cleaned), pages)])
+        generator = EmbeddingGenerator(base_path, embedder=model)
+        report["embedding"] = bench_embedding(generator, chunks)
+        report["ingestion"], ingestion = bench_ingestion(base_path, generator.model)
+        store = ingestion.embedding_generator.store
+        vectors = sum(len(store.open_embeddings(data_type, source))
+                      for data_type in ingestion.text_cleaner.paths for source in store.sources(data_type))
+        report["chroma_load"] = bench_chroma_load(base_path, vectors)
+        rng = random.Random(seed)
+        report["retrieval"] = bench_retrieval(base_path, generator.model,
+                                              [rng.choice(QUERIES) for _ in range(queries)], llm_latency=llm_latency)
+    return report
+
+def flatten(report, prefix=""):
+    """Flatten nested numeric report fields into {"a.b.c": value}."""
+    values = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[f"{prefix}{key}"] = value
+    return values
+
+def compare(report, baseline, threshold=0.1):
+    """Metrics that moved by more than threshold (relative) against a baseline report."""
+    current, previous = flatten(report), flatten(baseline)
+    changes = {}
+    for key in sorted(current.keys() & previous.keys()):
+        if key.startswith("config.") or key == "schema_version" or not previous[key]:
+            continue
+        delta = (current[key] - previous[key]) / abs(previous[key])
+        if abs(delta) > threshold:
+            changes[key] = {"baseline": previous[key], "current": current[key], "change": delta}
+    return changes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark suite over a synthetic legal corpus.")
+    parser.add_argument("--documents", type=int, default=30, help="Documents per data type")
+    parser.add_argument("--pages", type=int, default=12, help="Pages per document")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--embedder", choices=["stub", "model"], default="stub",
+                        help="stub: hashed bag-of-words vectors; model: the configured embedding model")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM time to first token (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default="benchmark_results.json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    report = run_suite(args.documents, args.pages, args.queries, args.embedder, args.llm_latency, args.seed)
+    print(f"Corpus: {report['corpus_mb']:.1f} MB")
+    print(f"Cleaning: {report['cleaning']['mb_per_s']:.1f} MB/s")
+    print(f"Chunking: {report['chunking']['mb_per_s']:.1f} MB/s ({report['chunking']['chunks_per_s']:.0f} chunks/s)")
+    print(f"Embedding ({args.embedder}): {report['embedding']['chunks_per_s']:.0f} chunks/s")
+    print(f"Ingestion: {report['ingestion']['seconds']:.1f}s; " + ", ".join(
+        f"{stage} {stats['total_s']:.2f}s" for stage, stats in report["ingestion"]["stages"].items()))
+    print(f"Chroma load: {report['chroma_load']['vectors_per_s']:.0f} vectors/s")
+    retrieval = report["retrieval"]
+    print(f"Retrieval: p50 {retrieval['p50_ms']:.1f} ms, p95 {retrieval['p95_ms']:.1f} ms, "
+          f"p99 {retrieval['p99_ms']:.1f} ms; " + ", ".join(
+              f"{stage} p50 {stats['p50_ms']:.2f} ms" for stage, stats in retrieval["stages"].items()))
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report["changes"] = compare(report, json.load(f))
+        for key, change in report["changes"].items():
+            print(f"  {key}: {change['baseline']:.4g} -> {change['current']:.4g} ({change['change']:+.0%})")
+    with open(args.json, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.json}")
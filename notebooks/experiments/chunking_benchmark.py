@@ -0,0 +1,102 @@
+from notebooks.experiments.embedding_generation import EmbeddingGenerator
+from src.utils.text_processing import RecursiveTextSplitter
+import argparse
+import glob
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+WORDS = ("the court held that section of the act the constitution guarantees rights bail appeal "
+         "Article 21 punishment accused tribunal petition writ high supreme judgment").split()
+
+def langchain_splitter(chunk_size=500, chunk_overlap=50):
+    """The LangChain splitter the native one replaces, or None if LangChain is not installed."""
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+        except ImportError:
+            return None
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def synthetic_text(pages, rng):
+    """A cleaned-text-like document: one page of words per line."""
+    return "".join(" ".join(rng.choices(WORDS, k=rng.randint(200, 700))) + "\n" for _ in range(pages))
+
+def write_corpus(path, files, pages_per_file=40, seed=0):
+    """Write a synthetic corpus of cleaned text files."""
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(path, f"doc_{i:05d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(synthetic_text(pages_per_file, rng))
+
+def compare_splitters(texts):
+    """Check the native splitter reproduces LangChain's chunks and its offsets, and time both."""
+    native = RecursiveTextSplitter()
+    start = time.perf_counter()
+    native_spans = [native.split_spans(text) for text in texts]
+    report = {"texts": len(texts), "megabytes": sum(len(text) for text in texts) / 1e6,
+              "native_s": time.perf_counter() - start,
+              "offset_errors": sum(text[s:e] != chunk for text, spans in zip(texts, native_spans)
+                                   for (s, e), chunk in zip(spans, native.split_text(text)))}
+    reference = langchain_splitter()
+    if reference is not None:
+        start = time.perf_counter()
+        chunks = [reference.split_text(text) for text in texts]
+        report["langchain_s"] = time.perf_counter() - start
+        report["speedup"] = report["langchain_s"] / report["native_s"] if report["native_s"] else 0.0
+        report["mismatched_texts"] = sum([text[s:e] for s, e in spans] != expected
+                                         for text, spans, expected in zip(texts, native_spans, chunks))
+    return report
+
+def chunking_peak_mb(input_path, max_in_flight=8):
+    """Peak traced memory (MB) of streaming every file of input_path through read -> split."""
+    generator = EmbeddingGenerator(tempfile.mkdtemp(), chunk_workers=4, max_in_flight=max_in_flight)
+    jobs = (("legal_texts", file_path) for file_path in sorted(glob.glob(os.path.join(input_path, "*.txt"))))
+    tracemalloc.start()
+    chunks = sum(len(job[3]) for job in generator.iter_chunks(jobs))
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return chunks, peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the native splitter against LangChain and measure chunking memory.")
+    parser.add_argument("--path", help="Directory of cleaned .txt files (default: a synthetic corpus)")
+    parser.add_argument("--files", type=int, default=50, help="Synthetic corpus size; memory is measured at 1x and 4x")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        corpora = [args.path] if args.path else []
+        if not args.path:
+            for scale in (1, 4):
+                corpora.append(os.path.join(scratch, f"x{scale}"))
+                write_corpus(corpora[-1], args.files * scale)
+        texts = []
+        for file_path in sorted(glob.glob(os.path.join(corpora[0], "*.txt"))):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                texts.append(f.read())
+        report = {"splitter": compare_splitters(texts), "memory": []}
+        for corpus in corpora:
+            chunks, peak = chunking_peak_mb(corpus)
+            megabytes = sum(os.path.getsize(path) for path in glob.glob(os.path.join(corpus, "*.txt"))) / 1e6
+            report["memory"].append({"corpus_mb": megabytes, "chunks": chunks, "peak_mb": peak})
+
+    splitter = report["splitter"]
+    print(f"Splitter: {splitter['texts']} texts ({splitter['megabytes']:.1f} MB), native {splitter['native_s']:.2f}s, "
+          f"offset errors: {splitter['offset_errors']}")
+    if "langchain_s" in splitter:
+        print(f"LangChain: {splitter['langchain_s']:.2f}s ({splitter['speedup']:.1f}x slower), "
+              f"mismatched texts: {splitter['mismatched_texts']}")
+    else:
+        print("LangChain not installed; skipped the boundary comparison")
+    for row in report["memory"]:
+        print(f"Chunking {row['corpus_mb']:.1f} MB corpus ({row['chunks']} chunks): peak {row['peak_mb']:.1f} MB")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,84 @@
+from src.utils.text_processing import TextCleaningEngine
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+def legacy_clean_text(text):
+    """Reference implementation of the original five-pass cleaner, the parity baseline for this benchmark and the tests."""
+    text = re.sub(r'\s+', ' ', text.strip())
+    text = re.sub(r'Page \d+ of \d+|\d{4} \w+ \d+|\(c\) \d{4}.*?$', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[A-Za-z\s]+ v\.? [A-Za-z\s]+, \d+ [A-Z\.]+ \d+ \(\d{4}\)|\[\d{4}\] \d+ [A-Z]+ \d+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'(Section|Sec\.|§)\s*\d+[A-Za-z]*\d*\s*(?:\([a-zA-Z0-9\s]*\))?', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'[^\w\s.,!?;:]', '', text)
+    return text
+
+def load_pages(input_path):
+    """Load page texts of every PDF under input_path."""
+    from langchain_community.document_loaders import PyPDFLoader  # Deferred: the tests import legacy_clean_text
+    pages = []
+    for file_path in sorted(glob.glob(os.path.join(input_path, "*.pdf"))):
+        pages.extend(doc.page_content for doc in PyPDFLoader(file_path).lazy_load())
+    return pages
+
+def time_cleaner(clean, pages):
+    """Clean every page, returning outputs, per-page latencies (s) and total time (s)."""
+    outputs, latencies = [], []
+    start = time.perf_counter()
+    for page in pages:
+        page_start = time.perf_counter()
+        outputs.append(clean(page))
+        latencies.append(time.perf_counter() - page_start)
+    return outputs, latencies, time.perf_counter() - start
+
+def summarize(latencies, total, megabytes):
+    """Summarize throughput and per-page latency."""
+    ordered = sorted(latencies)
+    return {
+        "mb_per_s": megabytes / total if total else 0.0,
+        "total_s": total,
+        "p99_page_ms": ordered[int(0.99 * (len(ordered) - 1))] * 1000 if ordered else 0.0,
+        "max_page_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+def run_benchmark(input_path, compare_legacy=True):
+    """Benchmark the cleaning engine (and optionally the legacy cleaner) over the PDFs in input_path."""
+    pages = load_pages(input_path)
+    megabytes = sum(len(page.encode('utf-8')) for page in pages) / 1e6
+    engine = TextCleaningEngine()
+    outputs, latencies, total = time_cleaner(engine.clean, pages)
+    report = {"pages": len(pages), "megabytes": megabytes, "engine": summarize(latencies, total, megabytes)}
+    if compare_legacy:
+        legacy_outputs, latencies, total = time_cleaner(legacy_clean_text, pages)
+        report["legacy"] = summarize(latencies, total, megabytes)
+        report["mismatched_pages"] = [i for i, (a, b) in enumerate(zip(outputs, legacy_outputs)) if a != b]
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TextCleaningEngine over the bundled legal PDFs.")
+    parser.add_argument("--path", default=os.path.join("data", "raw", "legal_texts"))
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the legacy cleaner and parity check")
+    parser.add_argument("--min-mbps", type=float, default=0.0, help="Fail if engine throughput drops below this")
+    parser.add_argument("--max-page-ms", type=float, default=0.0, help="Fail if the slowest page exceeds this")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.path, compare_legacy=not args.no_legacy)
+    engine = report["engine"]
+    print(f"Pages: {report['pages']} ({report['megabytes']:.2f} MB)")
+    print(f"Engine: {engine['mb_per_s']:.2f} MB/s, p99 page {engine['p99_page_ms']:.2f} ms, worst page {engine['max_page_ms']:.2f} ms")
+    if "legacy" in report:
+        legacy = report["legacy"]
+        print(f"Legacy: {legacy['mb_per_s']:.2f} MB/s, p99 page {legacy['p99_page_ms']:.2f} ms, worst page {legacy['max_page_ms']:.2f} ms")
+        print(f"Mismatched pages: {len(report['mismatched_pages'])}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failed = bool(report.get("mismatched_pages"))
+    failed |= args.min_mbps > 0 and engine["mb_per_s"] < args.min_mbps
+    failed |= args.max_page_ms > 0 and engine["max_page_ms"] > args.max_page_ms
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,92 @@
+import numpy as np
+from src.models.embeddings.sentence_transformers.model_registry import (
+    BACKENDS, DEFAULT_EMBEDDING_MODEL, get_sentence_transformer
+)
+from src.retrieval.vector_db.embedding_store import EmbeddingStore
+import argparse
+import json
+import os
+import time
+
+def sample_chunks(store, size=2000):
+    """Take an evenly spaced sample of stored chunk texts across every data type and source."""
+    chunks = []
+    for data_type in sorted(os.listdir(store.root)) if os.path.isdir(store.root) else []:
+        for source in store.sources(data_type):
+            chunks.extend(meta["chunk"] for meta in store.iter_metadata(data_type, source))
+    stride = max(1, len(chunks) // size)
+    return chunks[::stride][:size]
+
+def normalize(embeddings):
+    """Scale rows to unit length."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+def neighbour_overlap(reference, candidate, k=10):
+    """Mean fraction of each chunk's top-k neighbours (within the sample) that both backends agree on."""
+    k = min(k, len(reference) - 1)
+    if k < 1:
+        return 1.0
+    overlap = 0.0
+    for ref_row, cand_row in zip(reference @ reference.T, candidate @ candidate.T):
+        ref_top = set(np.argpartition(-ref_row, k)[:k + 1])
+        cand_top = set(np.argpartition(-cand_row, k)[:k + 1])
+        overlap += (len(ref_top & cand_top) - 1) / k  # Each chunk is its own nearest neighbour
+    return overlap / len(reference)
+
+def run_benchmark(chunks, backends=BACKENDS, model_name=DEFAULT_EMBEDDING_MODEL, batch_size=64, repeat=2):
+    """Compare each backend's throughput and agreement (cosine, top-10 neighbours) with the fp32 torch model."""
+    report = {"model": model_name, "chunks": len(chunks), "backends": {}}
+    reference = None
+    for backend in ("torch",) + tuple(b for b in backends if b != "torch"):
+        start = time.perf_counter()
+        try:
+            model = get_sentence_transformer(model_name, backend)
+        except ImportError as e:
+            report["backends"][backend] = {"available": False, "error": str(e)}
+            continue
+        load_s = time.perf_counter() - start  # Includes the one-off export/quantization when not cached
+        model.encode(chunks[:batch_size], batch_size=batch_size)  # Warm-up
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            embeddings = normalize(model.encode(chunks, batch_size=batch_size, show_progress_bar=False))
+            best = min(best, time.perf_counter() - start)
+        result = {"available": True, "load_s": load_s, "chunks_per_s": len(chunks) / best if best else 0.0}
+        if reference is None:
+            reference = embeddings
+        else:
+            cosine = np.sum(reference * embeddings, axis=1)
+            result.update(mean_cosine=float(cosine.mean()), min_cosine=float(cosine.min()),
+                          p1_cosine=float(np.percentile(cosine, 1)),
+                          top10_overlap=neighbour_overlap(reference, embeddings))
+            result["speedup"] = result["chunks_per_s"] / report["backends"]["torch"]["chunks_per_s"]
+        report["backends"][backend] = result
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare torch, ONNX and int8 ONNX embedding backends.")
+    parser.add_argument("--base-path", default=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data")
+    parser.add_argument("--sample", type=int, default=2000, help="Chunks sampled from the embedding store")
+    parser.add_argument("--backend", action="append", choices=BACKENDS, help="Limit to these backends")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    chunks = sample_chunks(EmbeddingStore(os.path.join(args.base_path, r"processed\embeddings")), args.sample)
+    if not chunks:
+        raise SystemExit("No stored chunks found; run the ingestion pipeline first")
+    report = run_benchmark(chunks, tuple(args.backend or BACKENDS), batch_size=args.batch_size)
+    print(f"{report['model']} on {report['chunks']} chunks")
+    for backend, result in report["backends"].items():
+        if not result["available"]:
+            print(f"{backend}: unavailable ({result['error']})")
+            continue
+        line = f"{backend}: {result['chunks_per_s']:.0f} chunks/s, load {result['load_s']:.1f}s"
+        if "mean_cosine" in result:
+            line += (f", {result['speedup']:.2f}x vs torch, cosine mean {result['mean_cosine']:.4f} "
+                     f"min {result['min_cosine']:.4f}, top-10 overlap {result['top10_overlap']:.3f}")
+        print(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
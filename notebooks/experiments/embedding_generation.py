@@ -1,13 +1,30 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.models.embeddings.sentence_transformers.model_registry import embedding_model, embedding_space
+from src.retrieval.vector_db.embedding_store import EmbeddingStore
+from src.utils.text_processing import RecursiveTextSplitter, find_act_name, simhash
+from collections import deque
+import bisect
 import os
-import pickle
 import glob
+import re
+import time
+
+def read_text(file_path):
+    """Read one cleaned text file."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return {"content": f.read(), "source": os.path.basename(file_path)}
+
+def read_and_split(file_path, text_splitter):
+    """Read a file and return it with the (start, end) offsets of its chunks (module-level so processes can run it)."""
+    text = read_text(file_path)
+    return text, text_splitter.split_spans(text["content"])
 
 class EmbeddingGenerator:
     """Class to split text, generate embeddings, and store them."""
     
-    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 batch_size=64, sort_window=32, chunk_workers=None, use_processes=False, storage_dtype="float32",
+                 embedding_socket=None, embedding_backend=None, max_in_flight=None, embedder=None):
         self.base_path = base_path
         self.input_paths = {
             "legal_texts": os.path.join(base_path, r"processed\cleaned_text\legal_texts"),
@@ -15,54 +32,164 @@ class EmbeddingGenerator:
             "youtube_transcripts": os.path.join(base_path, r"processed\cleaned_text\youtube_transcripts")
         }
         self.output_path = os.path.join(base_path, r"processed\embeddings")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight embedding model
-        self.text_splitter = RecursiveCharacterTextSplitter(
+        self.store = EmbeddingStore(self.output_path, dtype=storage_dtype)  # float32, or float16 to halve disk
+        # Lightweight embedding model, loaded on first encode (or served by the embedding daemon).
+        # embedding_backend is torch, onnx or onnx-int8 (default LEGAL_EMBEDDING_BACKEND, else torch)
+        # embedder replaces the model (e.g. a StubEmbedder); its embedding_space attribute tags the store
+        self.model = embedder or embedding_model('all-MiniLM-L6-v2', socket_path=embedding_socket,
+                                                 backend=embedding_backend)
+        self.embedding_space = (getattr(embedder, "embedding_space", type(embedder).__name__) if embedder
+                                else embedding_space('all-MiniLM-L6-v2', embedding_backend))
+        # Same boundaries as LangChain's RecursiveCharacterTextSplitter, plus each chunk's offsets
+        self.text_splitter = RecursiveTextSplitter(
             chunk_size=500,  # Adjust based on needs
             chunk_overlap=50  # Overlap for context
         )
+        self.batch_size = batch_size  # Chunks per encode call
+        self.sort_window = sort_window  # Batches pooled and length-sorted together
+        self.chunk_workers = chunk_workers or os.cpu_count()
+        self.use_processes = use_processes  # Chunk in processes instead of threads
+        self.max_in_flight = max_in_flight or 2 * self.chunk_workers  # Files read and split ahead of the encoder
 
-    def load_text(self, input_path):
-        """Load all text files from a directory."""
-        texts = []
-        for file_path in glob.glob(os.path.join(input_path, "*.txt")):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                texts.append({"content": f.read(), "source": os.path.basename(file_path)})
-        return texts
+    def load_text(self, input_path, file_paths=None):
+        """Load all text files from a directory, or only the given file paths."""
+        if file_paths is None:
+            file_paths = glob.glob(os.path.join(input_path, "*.txt"))
+        return [read_text(file_path) for file_path in file_paths]
 
     def split_text(self, text):
         """Split text into chunks."""
         return self.text_splitter.split_text(text)
 
     def generate_embeddings(self, chunks):
-        """Generate embeddings for text chunks."""
-        return self.model.encode(chunks, show_progress_bar=True)
+        """Generate embeddings for text chunks in length-sorted, fixed-size batches, returned in input order."""
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+        embeddings = [None] * len(chunks)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.model.encode([chunks[i] for i in batch], batch_size=self.batch_size,
+                                        show_progress_bar=False)
+            for i, embedding in zip(batch, encoded):
+                embeddings[i] = embedding
+        return embeddings
+
+    def iter_chunks(self, jobs):
+        """Read and split (data_type, file_path) jobs in a worker pool, yielding (data_type, text, file_path,
+        chunks, spans) in order.
+
+        Only max_in_flight files are read ahead, so memory is bounded by the look-ahead rather than the corpus.
+        """
+        executor_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=self.chunk_workers) as executor:
+            # Workers keep reading and splitting upcoming files while the caller encodes earlier ones
+            in_flight = deque()
+            for data_type, file_path in jobs:
+                in_flight.append((data_type, file_path, executor.submit(read_and_split, file_path, self.text_splitter)))
+                if len(in_flight) >= self.max_in_flight:
+                    yield self._chunked(*in_flight.popleft())
+            while in_flight:
+                yield self._chunked(*in_flight.popleft())
+
+    def _chunked(self, data_type, file_path, future):
+        text, spans = future.result()
+        return data_type, text, file_path, [text["content"][start:end] for start, end in spans], spans
+
+    def embed_jobs(self, chunked_jobs):
+        """Pool chunks across files and data types into windows, encode them and yield each job with its embeddings."""
+        window_size = self.batch_size * self.sort_window
+        pending, window = [], []
+        for job in chunked_jobs:
+            pending.append(job)
+            window.extend(job[3])
+            if len(window) >= window_size:
+                yield from self._encode_window(pending, window)
+                pending, window = [], []
+        if pending:
+            yield from self._encode_window(pending, window)
+
+    def _encode_window(self, pending, window):
+        embeddings = self.generate_embeddings(window) if window else []
+        offset = 0
+        for job in pending:
+            count = len(job[3])
+            yield job, embeddings[offset:offset + count]
+            offset += count
 
-    def process_and_store_embeddings(self):
-        """Process all text files, generate embeddings, and store them."""
+    def build_metadata(self, text, chunks, data_type=None, spans=None):
+        """Build per-chunk metadata rows: data type, source, act name, page, character offsets and SimHash.
+
+        spans are the splitter's (start, end) offsets of the chunks; without them chunks are located
+        in the text. Cleaned files hold one page per line, so a chunk's page is the line its start falls on.
+        """
+        content = text["content"]
+        line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+        base = {"source": text["source"]}
+        if data_type:
+            base["data_type"] = data_type
+        act = find_act_name(content)
+        if act:
+            base["act"] = act
+        if spans is None:
+            spans, start = [], 0
+            for chunk in chunks:
+                found = content.find(chunk, start)
+                start = found if found >= 0 else start
+                spans.append((start, start + len(chunk)))
+                start += 1
+        return [dict(base, chunk=chunk, chunk_index=index, start=start, end=end,
+                     page=bisect.bisect_right(line_starts, start), simhash=simhash(chunk))
+                for index, (chunk, (start, end)) in enumerate(zip(chunks, spans))]
+
+    def process_and_store_embeddings(self, manifest=None):
+        """Process all text files, generate embeddings, and store them as per-source shards.
+
+        With a manifest, only new or changed files are re-chunked and re-embedded, and shards of
+        removed files are deleted. Returns a mapping of data type to the sources that were updated
+        and removed.
+        """
         os.makedirs(self.output_path, exist_ok=True)
+        self.store.claim_space(self.embedding_space)  # Never mix vectors from different models/backends
+        changes = {}
+        jobs = []
         
         for data_type, input_path in self.input_paths.items():
             print(f"\nProcessing {data_type}...")
-            texts = self.load_text(input_path)
-            if not texts:
+            file_paths = sorted(glob.glob(os.path.join(input_path, "*.txt")))
+            if manifest is not None:
+                file_paths, removed = manifest.diff("cleaned", data_type, file_paths)
+                if not file_paths and not removed:
+                    print(f"No changes in {input_path}")
+                    continue
+            else:
+                present = {os.path.basename(file_path) for file_path in file_paths}
+                removed = [source for source in self.store.sources(data_type) if source not in present]
+            if not file_paths and not removed:
                 print(f"No texts found in {input_path}")
                 continue
             
-            all_embeddings = []
-            metadata = []
-            
-            for text in texts:
-                chunks = self.split_text(text["content"])
-                if chunks:
-                    embeddings = self.generate_embeddings(chunks)
-                    all_embeddings.extend(embeddings)
-                    metadata.extend([{"source": text["source"], "chunk": chunk} for chunk in chunks])
-            
-            # Save embeddings and metadata
-            output_file = os.path.join(self.output_path, f"{data_type}_embeddings.pkl")
-            with open(output_file, 'wb') as f:
-                pickle.dump({"embeddings": all_embeddings, "metadata": metadata}, f)
-            print(f"Saved embeddings to: {output_file}")
+            for name in removed:
+                self.store.remove_shard(data_type, name)
+                if manifest is not None:
+                    manifest.forget("cleaned", data_type, name)
+            # Files are only read once the chunking stage reaches them
+            jobs.extend((data_type, file_path) for file_path in file_paths)
+            changes[data_type] = {"updated": [os.path.basename(file_path) for file_path in file_paths],
+                                  "removed": removed}
+        
+        # Stream files -> chunks -> shared, length-sorted batches -> vectors -> per-source shards
+        start = time.perf_counter()
+        total_chunks = 0
+        for (data_type, text, file_path, chunks, spans), embeddings in self.embed_jobs(self.iter_chunks(jobs)):
+            self.store.write_shard(data_type, text["source"], embeddings,
+                                   self.build_metadata(text, chunks, data_type, spans))
+            total_chunks += len(chunks)
+            if manifest is not None:
+                manifest.record("cleaned", data_type, file_path,
+                                chunks=[manifest.text_digest(chunk) for chunk in chunks])
+        elapsed = time.perf_counter() - start
+        print(f"Encoded {total_chunks} chunks in {elapsed:.1f}s ({total_chunks / max(elapsed, 1e-9):.1f} chunks/s)")
+        print(f"Saved embeddings to: {self.output_path}")
+        return changes
 
 if __name__ == "__main__":
     generator = EmbeddingGenerator()
@@ -0,0 +1,115 @@
+from bs4 import BeautifulSoup
+import requests
+from src.data_ingestion.html_extractors import EXTRACTORS, get_extractor
+from src.data_ingestion.web_scraper import START_URLS
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+def legacy_parse(html):
+    """Reference implementation of the original parse_page, used to check output parity."""
+    content = BeautifulSoup(html, "html.parser").find("div", class_="mw-parser-output")
+    if not content:
+        return None
+    text = "\n".join(p.get_text().strip() for p in content.find_all("p") if p.get_text().strip())
+    links = []
+    for a in content.find_all("a", href=True):
+        href = a["href"]
+        if href.startswith("/wiki/") and not href.startswith("/wiki/File:"):
+            if any(keyword in href.lower() for keyword in ["india", "law", "legal", "court", "act", "constitution"]):
+                links.append(href)
+    return text, links
+
+def save_fixtures(output_path, base_url="https://en.wikipedia.org"):
+    """Download the scraper's start pages as HTML fixtures."""
+    os.makedirs(output_path, exist_ok=True)
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    with requests.Session() as session:
+        for url in START_URLS:
+            response = session.get(urljoin(base_url, url), headers=headers, timeout=10)
+            response.raise_for_status()
+            with open(os.path.join(output_path, url.split("/")[-1] + ".html"), 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            time.sleep(1)
+
+def load_fixtures(input_path):
+    """Load every saved .html page under input_path."""
+    pages = []
+    for file_path in sorted(glob.glob(os.path.join(input_path, "*.html"))):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+def time_parser(parse, pages, repeat=3):
+    """Parse every page repeat times, returning the last outputs and the best per-page latencies (ms)."""
+    best = [float("inf")] * len(pages)
+    outputs = []
+    for _ in range(repeat):
+        outputs = []
+        for i, html in enumerate(pages):
+            start = time.perf_counter()
+            outputs.append(parse(html))
+            best[i] = min(best[i], (time.perf_counter() - start) * 1000)
+    return outputs, best
+
+def normalize(result):
+    """Bring extractor output into the legacy (text, links) shape."""
+    if result is None:
+        return None
+    paragraphs, links = result
+    return "\n".join(paragraphs), links
+
+def run_benchmark(input_path, backends=None, repeat=3):
+    """Benchmark each available extractor backend against the legacy parser over saved fixtures."""
+    pages = load_fixtures(input_path)
+    megabytes = sum(len(html.encode('utf-8')) for html in pages) / 1e6
+    reference, latencies = time_parser(legacy_parse, pages, repeat)
+    report = {"pages": len(pages), "megabytes": megabytes,
+              "legacy": {"total_ms": sum(latencies), "max_page_ms": max(latencies, default=0.0)}, "backends": {}}
+    for name in backends or EXTRACTORS:
+        try:
+            extractor = get_extractor(name)
+        except ImportError:
+            report["backends"][name] = {"available": False}
+            continue
+        outputs, latencies = time_parser(extractor.extract, pages, repeat)
+        total = sum(latencies)
+        report["backends"][name] = {
+            "available": True,
+            "total_ms": total,
+            "max_page_ms": max(latencies, default=0.0),
+            "speedup": report["legacy"]["total_ms"] / total if total else 0.0,
+            "mismatched_pages": [i for i, (a, b) in enumerate(zip(outputs, reference)) if normalize(a) != b],
+        }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML extractor backends over saved Wikipedia pages.")
+    parser.add_argument("--path", default=os.path.join("data", "raw", "html_fixtures"))
+    parser.add_argument("--save-fixtures", action="store_true", help="Download the scraper's start pages first")
+    parser.add_argument("--backend", action="append", choices=list(EXTRACTORS), help="Limit to these backends")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    if args.save_fixtures:
+        save_fixtures(args.path)
+    report = run_benchmark(args.path, args.backend, args.repeat)
+    legacy = report["legacy"]
+    print(f"Pages: {report['pages']} ({report['megabytes']:.2f} MB)")
+    print(f"legacy: {legacy['total_ms']:.1f} ms total, worst page {legacy['max_page_ms']:.2f} ms")
+    for name, result in report["backends"].items():
+        if not result["available"]:
+            print(f"{name}: not installed")
+            continue
+        print(f"{name}: {result['total_ms']:.1f} ms total, worst page {result['max_page_ms']:.2f} ms, "
+              f"{result['speedup']:.1f}x, mismatched pages: {len(result['mismatched_pages'])}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if any(result.get("mismatched_pages") for result in report["backends"].values()) else 0)
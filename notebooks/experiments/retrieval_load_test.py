@@ -0,0 +1,62 @@
+from src.pipelines.retrieval_pipeline import RetrievalPipeline
+from src.models.llm.legal_llm_model.stub_llm import AsyncStubLLM, StubLLM
+from src.utils.profiling import percentile
+import argparse
+import asyncio
+import random
+import time
+
+QUERIES = [
+    "Generate me curriculum to study indian constitution and Teach me step wise the main 10 lessons.",
+    "Teach me the Indian Constitution step wise.",
+    "What are the fundamental rights under the Constitution of India?",
+    "Explain the essentials of a valid contract under the Indian Contract Act.",
+    "What is the difference between cognizable and non-cognizable offences?",
+    "Explain the doctrine of basic structure.",
+    "What is anticipatory bail under the Code of Criminal Procedure?",
+    "Summarise the Right to Information Act, 2005.",
+]
+
+async def user(pipeline, requests, latencies, n_results):
+    """Simulate one user issuing queries back to back."""
+    for _ in range(requests):
+        start = time.perf_counter()
+        await pipeline.arun(random.choice(QUERIES), n_results)
+        latencies.append(time.perf_counter() - start)
+
+async def load_test(pipeline, users, requests_per_user, n_results):
+    """Run concurrent users against the async pipeline and report throughput and latency."""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(user(pipeline, requests_per_user, latencies, n_results) for _ in range(users)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "qps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "encode_batches": pipeline.encode_batcher.stats(),
+        "query_batches": pipeline.query_batcher.stats(),
+        "cache": pipeline.cache_stats(),
+        "stages": pipeline.stage_stats(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of RetrievalPipeline.arun with a stub LLM.")
+    parser.add_argument("--base-path", default="data")
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per user")
+    parser.add_argument("--n-results", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Stub time to first token (s)")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    pipeline = RetrievalPipeline(
+        args.base_path,
+        use_cache=not args.no_cache,
+        llm_client=StubLLM(latency=args.llm_latency),
+        async_llm_client=AsyncStubLLM(latency=args.llm_latency)
+    )
+    report = asyncio.run(load_test(pipeline, args.users, args.requests, args.n_results))
+    for key, value in report.items():
+        print(f"{key}: {value}")
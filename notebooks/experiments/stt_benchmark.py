@@ -0,0 +1,144 @@
+from notebooks.experiments.benchmark_suite import QUERIES, write_corpus
+from src.models.embeddings.sentence_transformers.stub_embedder import StubEmbedder
+from src.models.llm.legal_llm_model.stub_llm import StubLLM
+from src.models.stt.whisper_model.streaming_whisper import StreamingWhisper
+from src.models.stt.whisper_model.stub_whisper import StubWhisperModel
+from src.pipelines.ingestion_pipeline import IngestionPipeline
+from src.pipelines.retrieval_pipeline import RetrievalPipeline
+from src.pipelines.voice_pipeline import VoiceQueryPipeline
+from src.utils.audio_processing import StreamingResampler, VADSegmenter, WavReader, write_wav
+from src.utils.profiling import percentile
+import numpy as np
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+def speech_like(rng, seconds, sample_rate):
+    """Voiced-speech-like sound: a wandering harmonic tone with syllable-rate amplitude modulation."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * np.pi * rng.uniform(0.3, 0.8) * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    tone = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    return 0.2 * tone * envelope
+
+def write_samples(path, script, sample_rate=44100, words_per_second=2.5, seed=0, lead_in=0.0):
+    """Write a WAV file speaking each script line as one burst, separated by quiet noise.
+
+    lead_in seconds of noise precede the first line; the default 0 starts the file with speech.
+    """
+    rng = np.random.default_rng(seed)
+    parts = [0.003 * rng.standard_normal(int(lead_in * sample_rate))]
+    for line in script:
+        parts.append(speech_like(rng, len(line.split()) / words_per_second, sample_rate))
+        parts.append(0.003 * rng.standard_normal(int(rng.uniform(1.0, 1.5) * sample_rate)))
+    write_wav(path, np.concatenate(parts), sample_rate)
+
+def bench_frontend(path, block_ms=100):
+    """Real-time factors of WAV decoding, resampling and VAD segmentation, and peak traced memory."""
+    seconds = {"decode": 0.0, "resample": 0.0, "vad": 0.0}
+    utterances = 0
+    tracemalloc.start()
+    with WavReader(path, block_ms) as reader:
+        duration = reader.duration
+        resampler, segmenter = StreamingResampler(reader.sample_rate), VADSegmenter()
+        blocks = iter(reader)
+        while True:
+            start = time.perf_counter()
+            block = next(blocks, None)
+            seconds["decode"] += time.perf_counter() - start
+            if block is None:
+                break
+            start = time.perf_counter()
+            block = resampler.process(block)
+            seconds["resample"] += time.perf_counter() - start
+            start = time.perf_counter()
+            utterances += sum(kind == "start" for kind, _ in segmenter.process(block))
+            seconds["vad"] += time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    report = {"audio_s": duration, "utterances": utterances, "peak_mb": peak}
+    for stage, elapsed in seconds.items():
+        report[f"{stage}_x_realtime"] = duration / elapsed if elapsed else 0.0
+    return report
+
+def bench_transcription(path, transcriber):
+    """Stream a file through the transcriber: decode real-time factor, partials and final decode latency."""
+    start = time.perf_counter()
+    events = list(transcriber.transcribe_file(path))
+    elapsed = time.perf_counter() - start
+    finals = [event["decode_ms"] for event in events if event["type"] == "final"]
+    with WavReader(path) as reader:
+        duration = reader.duration
+    return {"audio_s": duration, "x_realtime": duration / elapsed if elapsed else 0.0,
+            "partials": sum(event["type"] == "partial" for event in events), "finals": len(finals),
+            "final_decode_p50_ms": percentile(finals, 50), "transcript": [event["text"] for event in events
+                                                                            if event["type"] == "final"]}
+
+def bench_overlap(base_path, path, script, encode_latency, decode_cost, llm_latency):
+    """Speech-end-to-answer latency with retrieval prefetched on partial transcripts vs. sequential."""
+    report = {}
+    for mode, min_words in (("sequential", 10 ** 6), ("prefetch", 3)):
+        pipeline = RetrievalPipeline(base_path, use_cache=False, context_tokens=None,
+                                     embedder=StubEmbedder(seconds_per_text=encode_latency),
+                                     llm_client=StubLLM(latency=llm_latency, tokens_per_second=1e6))
+        transcriber = StreamingWhisper(model=StubWhisperModel(script, seconds_per_audio_second=decode_cost))
+        voice = VoiceQueryPipeline(pipeline, transcriber, n_results=5, min_prefetch_words=min_words)
+        latencies = [event["speech_to_answer_ms"] for event in voice.ask_file(path) if event["type"] == "answer"]
+        voice.close()
+        report[mode] = dict(voice.prefetch_stats(), answers=len(latencies),
+                            speech_to_answer_p50_ms=percentile(latencies, 50),
+                            speech_to_answer_p95_ms=percentile(latencies, 95))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming speech-to-text front end on WAV files.")
+    parser.add_argument("--path", help="Directory of sample .wav files (default: synthetic speech-like files)")
+    parser.add_argument("--model", help="faster-whisper model size to transcribe with (e.g. base.en); "
+                                        "default: skip real transcription")
+    parser.add_argument("--encode-latency", type=float, default=0.03, help="Simulated query encode cost (s)")
+    parser.add_argument("--decode-cost", type=float, default=0.05,
+                        help="Simulated Whisper decode seconds per audio second for the overlap benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM time to first token (s)")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    script = QUERIES[-8:]
+    report = {"frontend": {}, "transcription": {}}
+    with tempfile.TemporaryDirectory() as scratch:
+        files = sorted(glob.glob(os.path.join(args.path, "*.wav"))) if args.path else []
+        if not args.path:
+            for rate in (16000, 44100, 48000):
+                files.append(os.path.join(scratch, f"speech_{rate}.wav"))
+                write_samples(files[-1], script, rate)
+        for path in files:
+            name = os.path.basename(path)
+            report["frontend"][name] = bench_frontend(path)
+            row = report["frontend"][name]
+            print(f"{name}: {row['audio_s']:.1f}s audio, {row['utterances']} utterances; decode "
+                  f"{row['decode_x_realtime']:.0f}x, resample {row['resample_x_realtime']:.0f}x, "
+                  f"VAD {row['vad_x_realtime']:.0f}x real time; peak {row['peak_mb']:.2f} MB")
+            if args.model:
+                report["transcription"][name] = bench_transcription(path, StreamingWhisper(args.model))
+                row = report["transcription"][name]
+                print(f"  Whisper {args.model}: {row['x_realtime']:.1f}x real time, {row['partials']} partials, "
+                      f"final decode p50 {row['final_decode_p50_ms']:.0f} ms")
+        if not args.path:
+            base_path = os.path.join(scratch, "data")
+            write_corpus(base_path, documents=10, pages=6)
+            ingestion = IngestionPipeline(base_path, embedder=StubEmbedder())
+            for config in ingestion.text_cleaner.paths.values():
+                config["type"] = "txt"
+            ingestion.run()
+            report["overlap"] = bench_overlap(base_path, files[0], script, args.encode_latency,
+                                              args.decode_cost, args.llm_latency)
+            for mode, row in report["overlap"].items():
+                print(f"{mode}: speech-to-answer p50 {row['speech_to_answer_p50_ms']:.0f} ms, "
+                      f"p95 {row['speech_to_answer_p95_ms']:.0f} ms; prefetch hits {row['hits']}/{row['answers']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
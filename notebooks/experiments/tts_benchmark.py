@@ -0,0 +1,90 @@
+from notebooks.experiments.benchmark_suite import TOPICS
+from src.models.tts.tts_model.streaming_tts import PiperSynthesizer, StreamingTTS
+from src.models.tts.tts_model.stub_tts import StubSynthesizer
+from src.utils.profiling import percentile
+import argparse
+import json
+import random
+import tempfile
+import time
+
+STEPS = ["Read the bare text of the provision and note its key terms.",
+         "Identify the essential ingredients that must be proved.",
+         "Study the leading Supreme Court judgments on the point.",
+         "Compare the provision with the corresponding earlier law.",
+         "Note the exceptions and the defences available to the accused.",
+         "Work through two hypothetical fact patterns on your own.",
+         "Summarise the procedure followed by the trial court.",
+         "Learn the relevant Article of the Constitution of India.",
+         "Revise the landmark cases and the principles they laid down.",
+         "Attempt previous year questions on this topic under timed conditions."]
+
+def lecture_answer(rng, topic, steps=8):
+    """A "teach me step wise" style answer: an intro, numbered steps drawn from a shared pool and an outro."""
+    lines = [f"Here is a step-wise lesson plan on {topic}."]
+    lines += [f"{i}. {step}" for i, step in enumerate(rng.sample(STEPS, steps), 1)]
+    lines.append("Revise each step before moving to the next one.")
+    return "\n".join(lines)
+
+def token_stream(text, latency, tokens_per_second):
+    """Yield text word by word like a streaming LLM with a time to first token."""
+    time.sleep(latency)
+    for word in text.split(" "):
+        time.sleep(1 / tokens_per_second)
+        yield word + " "
+
+def bench_full_answer(answers, synthesizer, latency, tokens_per_second):
+    """Time to first audio when the whole answer is generated, then synthesized in one call."""
+    ttfa = []
+    for answer in answers:
+        start = time.perf_counter()
+        synthesizer.synthesize("".join(token_stream(answer, latency, tokens_per_second)))
+        ttfa.append(time.perf_counter() - start)
+    return {"ttfa_p50_ms": percentile(ttfa, 50) * 1000, "ttfa_p95_ms": percentile(ttfa, 95) * 1000}
+
+def bench_streaming(answers, tts, latency, tokens_per_second):
+    """Time to first audio, total time and cache hit rate of sentence-level streaming synthesis."""
+    ttfa, totals = [], []
+    hits, misses = (tts.cache.hits, tts.cache.misses) if tts.cache else (0, 0)
+    for answer in answers:
+        start = time.perf_counter()
+        for _ in tts.speak(token_stream(answer, latency, tokens_per_second)):
+            pass
+        ttfa.append(tts.time_to_first_audio)
+        totals.append(time.perf_counter() - start)
+    report = {"ttfa_p50_ms": percentile(ttfa, 50) * 1000, "ttfa_p95_ms": percentile(ttfa, 95) * 1000,
+              "total_p50_ms": percentile(totals, 50) * 1000}
+    if tts.cache:
+        hits, misses = tts.cache.hits - hits, tts.cache.misses - misses
+        report["hit_rate"] = hits / (hits + misses) if hits + misses else 0.0
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time to first audio of streaming sentence-level TTS.")
+    parser.add_argument("--answers", type=int, default=20)
+    parser.add_argument("--voice", help="Piper .onnx voice to benchmark (default: a stub synthesizer)")
+    parser.add_argument("--seconds-per-char", type=float, default=0.005, help="Stub synthesis cost per character")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Simulated LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=20, help="Simulated LLM streaming rate")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    answers = [lecture_answer(rng, rng.choice(TOPICS)) for _ in range(args.answers)]
+    synthesizer = PiperSynthesizer(args.voice) if args.voice else StubSynthesizer(args.seconds_per_char)
+    report = {"full_answer": bench_full_answer(answers[:5], synthesizer, args.llm_latency, args.tokens_per_second)}
+    with tempfile.TemporaryDirectory() as base_path:
+        for mode, use_cache in (("streaming_uncached", False), ("streaming_cold", True), ("streaming_warm", True)):
+            tts = StreamingTTS(base_path, synthesizer, use_cache=use_cache, workers=args.workers)
+            report[mode] = bench_streaming(answers, tts, args.llm_latency, args.tokens_per_second)
+            tts.close()
+
+    for mode, row in report.items():
+        print(f"{mode}: time to first audio p50 {row['ttfa_p50_ms']:.0f} ms, p95 {row['ttfa_p95_ms']:.0f} ms"
+              + (f", total p50 {row['total_p50_ms']:.0f} ms" if "total_p50_ms" in row else "")
+              + (f", cache hit rate {row['hit_rate']:.0%}" if "hit_rate" in row else ""))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
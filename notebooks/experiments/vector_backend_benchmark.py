@@ -0,0 +1,68 @@
+from src.retrieval.vector_db.embedding_store import EmbeddingStore
+from src.retrieval.vector_db.faiss_index_manager import FaissIndexManager
+import chromadb
+import numpy as np
+import argparse
+import os
+import tempfile
+import time
+
+def sample_queries(store, n_queries, noise=0.05, seed=0):
+    """Sample stored vectors across data types and perturb them to use as queries."""
+    vectors = []
+    for data_type in sorted(os.listdir(store.root)):
+        if os.path.isdir(os.path.join(store.root, data_type)):
+            vectors.extend(batch for batch, _ in store.iter_batches(data_type, 10000))
+    matrix = np.concatenate(vectors)
+    rng = np.random.default_rng(seed)
+    picked = matrix[rng.choice(len(matrix), size=min(n_queries, len(matrix)), replace=False)]
+    return (picked + noise * rng.standard_normal(picked.shape)).astype(np.float32)
+
+def recall_at_k(found, truth, k):
+    """Mean fraction of the exact top-k ids that were retrieved."""
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+def time_backend(backend, queries, k, batch_size):
+    """Return (ids per query, single-query QPS, batched QPS) for a ChromaDB-compatible backend."""
+    start = time.perf_counter()
+    ids = [backend.query(query_embeddings=[query], n_results=k)["ids"][0] for query in queries]
+    single_qps = len(queries) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        backend.query(query_embeddings=queries[i:i + batch_size], n_results=k)
+    batched_qps = len(queries) / (time.perf_counter() - start)
+    return ids, single_qps, batched_qps
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recall@k and QPS of ChromaDB and FAISS index types.")
+    parser.add_argument("--base-path", default="data")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--index-types", nargs="+", default=["flat", "ivf", "hnsw", "ivf-pq", "hnsw-pq"])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    store = EmbeddingStore(os.path.join(args.base_path, r"processed\embeddings"))
+    queries = sample_queries(store, args.queries)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Exact search over the same vectors provides the ground truth
+        exact = FaissIndexManager(args.base_path, index_type="flat", index_dir=os.path.join(tmp_dir, "exact"))
+        truth = exact.build().query(queries, n_results=args.k)["ids"]
+
+        rows = []
+        if not args.skip_chroma:
+            client = chromadb.PersistentClient(path=os.path.join(args.base_path, r"vector_db"))
+            ids, single_qps, batched_qps = time_backend(client.get_collection("legal_docs"), queries, args.k, args.batch_size)
+            rows.append(("chroma", recall_at_k(ids, truth, args.k), single_qps, batched_qps))
+        for index_type in args.index_types:
+            name, _, pq = index_type.partition("-")
+            manager = FaissIndexManager(args.base_path, index_type=name, pq_m=args.pq_m if pq else None,
+                                        index_dir=os.path.join(tmp_dir, index_type))
+            ids, single_qps, batched_qps = time_backend(manager.build(), queries, args.k, args.batch_size)
+            rows.append((f"faiss-{index_type}", recall_at_k(ids, truth, args.k), single_qps, batched_qps))
+
+    print(f"{'backend':<16}{'recall@' + str(args.k):>10}{'QPS':>12}{'batched QPS':>14}")
+    for name, recall, single_qps, batched_qps in rows:
+        print(f"{name:<16}{recall:>10.3f}{single_qps:>12.1f}{batched_qps:>14.1f}")
@@ -0,0 +1,87 @@
+from src.data_ingestion.stub_youtube import StubTranscriptApi, StubYouTubeClient
+from src.data_ingestion.youtube_loader import KEYWORDS, SEARCH_TERMS, YouTubeTranscriptLoader
+from src.utils.text_processing import KeywordMatcher
+import argparse
+import json
+import tempfile
+import time
+
+def legacy_load(youtube, transcript_api, max_results=10):
+    """The original loader's request pattern: sequential searches with a 1s pause, then one transcript at a time."""
+    video_ids = []
+    for term in SEARCH_TERMS:
+        response = youtube.search().list(part="id,snippet", q=term, type="video", maxResults=max_results,
+                                         videoCaption="closedCaption").execute()
+        video_ids.extend(item["id"]["videoId"] for item in response["items"])
+        time.sleep(1)
+    saved = 0
+    for video_id in set(video_ids):
+        try:
+            transcript = transcript_api.get_transcript(video_id, languages=['en', 'en-IN'])
+        except Exception:
+            continue
+        transcript_text = " ".join([entry["text"] for entry in transcript]).lower()
+        saved += any(keyword in transcript_text for keyword in KEYWORDS)
+    return saved
+
+def bench_matcher(transcripts, repeat=5):
+    """Keyword check per transcript: join-and-scan per keyword vs. the single-pass KeywordMatcher."""
+    matcher = KeywordMatcher(KEYWORDS)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        joined = []
+        for transcript in transcripts:
+            transcript_text = " ".join([entry["text"] for entry in transcript]).lower()
+            joined.append(any(keyword in transcript_text for keyword in KEYWORDS))
+    join_s = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        single = [matcher.any_match(entry["text"] for entry in transcript) for transcript in transcripts]
+    matcher_s = (time.perf_counter() - start) / repeat
+    return {"transcripts": len(transcripts), "join_ms": join_s * 1000, "matcher_ms": matcher_s * 1000,
+            "backend": "pyahocorasick" if matcher._automaton is not None else "python", "agree": joined == single}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the sequential and concurrent YouTube loaders offline.")
+    parser.add_argument("--videos", type=int, default=60, help="Size of the stub video pool")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub API latency per call (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--transcripts-per-second", type=float, default=10.0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = {}
+    youtube = StubYouTubeClient(args.videos, args.latency)
+    api = StubTranscriptApi(args.latency)
+    start = time.perf_counter()
+    legacy_load(youtube, api)
+    report["legacy"] = {"seconds": time.perf_counter() - start, "transcript_requests": api.calls}
+    with tempfile.TemporaryDirectory() as base_path:
+        for run in ("concurrent_cold", "concurrent_warm"):
+            api = StubTranscriptApi(args.latency)
+            loader = YouTubeTranscriptLoader(base_path, youtube=youtube, transcript_api=api, workers=args.workers,
+                                             transcripts_per_second=args.transcripts_per_second,
+                                             burst=args.workers)
+            start = time.perf_counter()
+            counts = loader.load_transcripts()
+            report[run] = dict(counts, seconds=time.perf_counter() - start,
+                               search_requests=loader.requests["search"], transcript_requests=api.calls)
+    transcripts = []
+    for i in range(40):
+        try:
+            transcripts.append(api.get_transcript(f"vid{i:08d}"))
+        except Exception:
+            pass
+    report["matcher"] = bench_matcher(transcripts)
+
+    for run in ("legacy", "concurrent_cold", "concurrent_warm"):
+        row = report[run]
+        print(f"{run}: {row['seconds']:.1f}s, {row['transcript_requests']} transcript requests"
+              + (f", {row['search_requests']} searches, saved {row['saved']}, cached {row['cached']}"
+                 if "saved" in row else ""))
+    matcher = report["matcher"]
+    print(f"Keyword check over {matcher['transcripts']} transcripts: join+in {matcher['join_ms']:.1f} ms, "
+          f"KeywordMatcher ({matcher['backend']}) {matcher['matcher_ms']:.1f} ms, agree: {matcher['agree']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,137 @@
+from bs4 import BeautifulSoup
+from collections import deque
+import threading
+import time
+
+LINK_KEYWORDS = ("india", "law", "legal", "court", "act", "constitution")
+# Text inside these tags is not page text (BeautifulSoup's get_text() skips it too)
+SKIPPED_TAGS = ("script", "style", "template")
+
+def is_relevant_link(href):
+    """Whether a link is an in-wiki article link on a legal topic worth following."""
+    if not href.startswith("/wiki/") or href.startswith("/wiki/File:"):
+        return False
+    href = href.lower()
+    return any(keyword in href for keyword in LINK_KEYWORDS)
+
+class BeautifulSoupExtractor:
+    """Reference extractor using BeautifulSoup's pure-Python html.parser."""
+
+    name = "bs4"
+
+    def extract(self, html):
+        """Return (paragraph texts, relevant hrefs) from the article body, or None if there is none."""
+        content = BeautifulSoup(html, "html.parser").find("div", class_="mw-parser-output")
+        if not content:
+            return None
+        paragraphs, links = [], []
+        for element in content.find_all(["p", "a"]):
+            if element.name == "p":
+                text = element.get_text().strip()
+                if text:
+                    paragraphs.append(text)
+            elif element.has_attr("href") and is_relevant_link(element["href"]):
+                links.append(element["href"])
+        return paragraphs, links
+
+class LxmlExtractor:
+    """Extractor using lxml's C HTML parser."""
+
+    name = "lxml"
+    _CONTENT = '//div[contains(concat(" ", normalize-space(@class), " "), " mw-parser-output ")]'
+    _TEXT = ".//text()[not(" + " or ".join(f"ancestor::{tag}" for tag in SKIPPED_TAGS) + ")]"
+
+    def __init__(self):
+        import lxml.html
+        self.lxml_html = lxml.html
+
+    def extract(self, html):
+        """Return (paragraph texts, relevant hrefs) from the article body, or None if there is none."""
+        content = self.lxml_html.fromstring(html).xpath(self._CONTENT)
+        if not content:
+            return None
+        paragraphs, links = [], []
+        for element in content[0].iter("p", "a"):
+            if element.tag == "p":
+                text = "".join(element.xpath(self._TEXT)).strip()
+                if text:
+                    paragraphs.append(text)
+            else:
+                href = element.get("href")
+                if href is not None and is_relevant_link(href):
+                    links.append(href)
+        return paragraphs, links
+
+class SelectolaxExtractor:
+    """Extractor using selectolax's lexbor HTML5 parser."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.parser_cls = LexborHTMLParser
+
+    def extract(self, html):
+        """Return (paragraph texts, relevant hrefs) from the article body, or None if there is none."""
+        content = self.parser_cls(html).css_first("div.mw-parser-output")
+        if content is None:
+            return None
+        content.strip_tags(list(SKIPPED_TAGS))
+        paragraphs, links = [], []
+        for element in content.css("p, a[href]"):
+            if element.tag == "p":
+                text = element.text(deep=True).strip()
+                if text:
+                    paragraphs.append(text)
+            elif is_relevant_link(element.attributes["href"] or ""):
+                links.append(element.attributes["href"])
+        return paragraphs, links
+
+EXTRACTORS = {"selectolax": SelectolaxExtractor, "lxml": LxmlExtractor, "bs4": BeautifulSoupExtractor}
+
+def get_extractor(name="auto"):
+    """Return an extractor by name; "auto" is the bs4 backend, whose text is identical to the legacy parser's.
+
+    selectolax and lxml are much faster and match on well-formed pages, but they build the tree the
+    HTML5 way, so malformed nesting (a block element inside <p>, unclosed or nested <p>) yields different
+    paragraphs. Opt into them after checking the mismatched pages reported by html_extraction_benchmark.
+    """
+    return EXTRACTORS["bs4" if name == "auto" else name]()
+
+class TimedExtractor:
+    """Wraps an extractor and records per-page parse time in milliseconds (thread-safe).
+
+    The most recent max_samples timings are kept, plus running totals for the mean.
+    """
+
+    def __init__(self, extractor, max_samples=10000):
+        self.extractor = extractor
+        self.name = extractor.name
+        self.timings_ms = deque(maxlen=max_samples)
+        self.pages = 0
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def last_ms(self):
+        """Parse time of the last page extracted on the calling thread."""
+        return getattr(self._local, "last_ms", 0.0)
+
+    def extract(self, html):
+        start = time.perf_counter()
+        try:
+            return self.extractor.extract(html)
+        finally:
+            self._local.last_ms = elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.timings_ms.append(elapsed)
+                self.pages += 1
+                self.total_ms += elapsed
+
+    def stats(self):
+        """Return page count and mean/max parse time (max over the recent timings)."""
+        with self._lock:
+            return {"backend": self.name, "pages": self.pages,
+                    "mean_ms": self.total_ms / self.pages if self.pages else 0.0,
+                    "max_ms": max(self.timings_ms, default=0.0)}
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+
+class IngestionManifest:
+    """Tracks content hashes and mtimes of ingested files so runs only reprocess what changed."""
+
+    def __init__(self, path):
+        """Initialize with manifest file path and load any existing state."""
+        self.path = path
+        self.entries = {}
+        self._pending = {}
+        self.load()
+
+    def load(self):
+        """Load manifest entries from disk, starting empty if none exist."""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def save(self):
+        """Atomically write manifest entries to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def file_digest(file_path, block_size=1 << 20):
+        """Return the SHA-256 hex digest of a file's contents."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def text_digest(text):
+        """Return a short SHA-256 hex digest of a text chunk."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+    def _section(self, section, data_type):
+        return self.entries.setdefault(section, {}).setdefault(data_type, {})
+
+    def get(self, section, data_type, name):
+        """Return the recorded entry for a file, or None."""
+        return self.entries.get(section, {}).get(data_type, {}).get(name)
+
+    def diff(self, section, data_type, file_paths):
+        """Split file_paths into new/changed files and return them with names of removed files."""
+        entries = self._section(section, data_type)
+        changed = []
+        for file_path in file_paths:
+            name = os.path.basename(file_path)
+            stat = os.stat(file_path)
+            entry = entries.get(name)
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                continue
+            digest = self.file_digest(file_path)
+            if entry and entry["sha256"] == digest:
+                # Touched but unchanged: refresh mtime so the next run skips hashing
+                entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+                continue
+            self._pending[file_path] = (digest, stat)
+            changed.append(file_path)
+        seen = {os.path.basename(p) for p in file_paths}
+        removed = sorted(name for name in entries if name not in seen)
+        return changed, removed
+
+    def record(self, section, data_type, file_path, **extra):
+        """Record a processed file's hash and mtime along with any extra fields."""
+        digest, stat = self._pending.pop(file_path, (None, None))
+        if digest is None:
+            digest, stat = self.file_digest(file_path), os.stat(file_path)
+        entry = {"sha256": digest, "mtime": stat.st_mtime, "size": stat.st_size}
+        entry.update(extra)
+        self._section(section, data_type)[os.path.basename(file_path)] = entry
+
+    def forget(self, section, data_type, name):
+        """Drop a file's entry from the manifest."""
+        self._section(section, data_type).pop(name, None)
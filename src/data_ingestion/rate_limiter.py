@@ -0,0 +1,54 @@
+from urllib.parse import urlsplit
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate tokens per second up to capacity."""
+
+    def __init__(self, rate, capacity=1):
+        """Initialize with refill rate (tokens/second) and burst capacity."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without blocking; return the seconds to wait otherwise (0 on success)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available, then take them."""
+        while (wait := self.try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+class HostRateLimiter:
+    """Keeps one TokenBucket per host so concurrent workers share each host's request budget."""
+
+    def __init__(self, rate=1.0, capacity=1):
+        """Initialize with the per-host request rate (requests/second) and burst size."""
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Return the bucket for a URL's host, creating it on first use."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    def acquire(self, url, tokens=1):
+        """Block until the URL's host has budget for another request."""
+        self.bucket(url).acquire(tokens)
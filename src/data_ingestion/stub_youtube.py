@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+LAW_LINES = ["today we discuss the constitution of india", "article 21 protects life and liberty",
+             "the supreme court of india held", "under the indian penal code murder is defined",
+             "the high court may issue writs", "consideration under the contract act"]
+OTHER_LINES = ["welcome back to the channel", "please like and subscribe", "today we cook a simple curry",
+               "the match went into extra time", "let us solve this equation step by step"]
+
+class NoTranscriptFound(Exception):
+    pass
+
+class TranscriptsDisabled(Exception):
+    pass
+
+class TooManyRequests(Exception):
+    pass
+
+class _Request:
+    def __init__(self, client, kwargs):
+        self.client = client
+        self.kwargs = kwargs
+
+    def execute(self):
+        time.sleep(self.client.latency)
+        rng = random.Random(f"{self.client.seed}:{self.kwargs['q']}")
+        # Overlapping result sets, like related search terms on YouTube
+        ids = [f"vid{rng.randrange(self.client.videos):08d}" for _ in range(self.kwargs.get("maxResults", 5))]
+        return {"items": [{"id": {"kind": "youtube#video", "videoId": video_id}} for video_id in ids]}
+
+class _Search:
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, **kwargs):
+        return _Request(self.client, kwargs)
+
+class StubYouTubeClient:
+    """Offline stand-in for the YouTube Data API resource (search().list(...).execute() only)."""
+
+    def __init__(self, videos=60, latency=0.2, seed=0):
+        """Initialize with the size of the video pool searches draw from and the per-call latency (s)."""
+        self.videos = videos
+        self.latency = latency
+        self.seed = seed
+
+    def search(self):
+        return _Search(self)
+
+class StubTranscriptApi:
+    """Offline stand-in for youtube_transcript_api with configurable latency and outcome mix.
+
+    Each video is deterministically on topic, off topic or without a transcript; throttle_ratio of
+    calls fail with TooManyRequests before succeeding on retry.
+    """
+
+    def __init__(self, latency=0.2, lines=600, unrelated_ratio=0.3, unavailable_ratio=0.1, throttle_ratio=0.0,
+                 seed=0):
+        """Initialize with the per-call latency (s), transcript length and outcome ratios."""
+        self.latency = latency
+        self.lines = lines
+        self.unrelated_ratio = unrelated_ratio
+        self.unavailable_ratio = unavailable_ratio
+        self.throttle_ratio = throttle_ratio
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_transcript(self, video_id, languages=None):
+        """Return transcript entries like YouTubeTranscriptApi.get_transcript."""
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.latency)
+        if random.Random(f"{self.seed}:{call}").random() < self.throttle_ratio:
+            raise TooManyRequests(video_id)
+        rng = random.Random(f"{self.seed}:{video_id}")
+        kind = rng.random()
+        if kind < self.unavailable_ratio:
+            raise (NoTranscriptFound if rng.random() < 0.5 else TranscriptsDisabled)(video_id)
+        entries = [rng.choice(OTHER_LINES) for _ in range(self.lines)]
+        if kind >= self.unavailable_ratio + self.unrelated_ratio:
+            entries[rng.randrange(self.lines)] = rng.choice(LAW_LINES)
+        return [{"text": text, "start": i * 3.0, "duration": 3.0} for i, text in enumerate(entries)]
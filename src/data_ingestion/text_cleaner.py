@@ -1,13 +1,20 @@
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader, TextLoader
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from src.utils.text_processing import TextCleaningEngine
+import glob
 import os
-import re
 
 class TextCleaner:
     """Class to clean legal texts, previous year docs, and YouTube transcripts."""
     
-    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-        """Initialize with base data path."""
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 workers=None, pages_per_task=8, max_in_flight=64, cleaning_rules=None):
+        """Initialize with base data path, page-cleaning pool settings and optional cleaning rules."""
         self.base_path = base_path
+        self.engine = TextCleaningEngine(cleaning_rules)
+        self.workers = workers or os.cpu_count()
+        self.pages_per_task = pages_per_task  # Pages sent to a worker per task
+        self.max_in_flight = max_in_flight  # Tasks queued ahead of the writer, bounding memory
         self.paths = {
             "legal_texts": {
                 "input": os.path.join(base_path, r"raw\legal_texts"),
@@ -28,43 +35,88 @@ class TextCleaner:
 
     def clean_text(self, text):
         """Clean text: remove whitespace, headers/footers, case citations, section numbers, special chars."""
-        # Remove extra whitespace and newlines
-        text = re.sub(r'\s+', ' ', text.strip())
-        # Remove headers/footers (e.g., "Page X of Y", copyright)
-        text = re.sub(r'Page \d+ of \d+|\d{4} \w+ \d+|\(c\) \d{4}.*?$', '', text, flags=re.IGNORECASE)
-        # Remove case citations (e.g., "Brown v. Board, 347 U.S. 483 (1954)", "[2020] 1 SCC 123")
-        text = re.sub(r'[A-Za-z\s]+ v\.? [A-Za-z\s]+, \d+ [A-Z\.]+ \d+ \(\d{4}\)|\[\d{4}\] \d+ [A-Z]+ \d+', '', text, flags=re.IGNORECASE)
-        # Remove section numbers (e.g., "Section 123", "Sec. 45A", "§ 19(1)(a)")
-        text = re.sub(r'(Section|Sec\.|§)\s*\d+[A-Za-z]*\d*\s*(?:\([a-zA-Z0-9\s]*\))?', '', text, flags=re.IGNORECASE)
-        # Remove special characters (keep alphanumeric, spaces, basic punctuation)
-        text = re.sub(r'[^\w\s.,!?;:]', '', text)
-        return text
+        return self.engine.clean(text)
 
-    def process_files(self, input_path, output_path, file_type="pdf"):
-        """Process files (PDF or text) from input_path, clean, and save to output_path."""
-        os.makedirs(output_path, exist_ok=True)
+    def clean_pages(self, pages):
+        """Clean a batch of page texts."""
+        return [self.clean_text(page) for page in pages]
+
+    def iter_pages(self, file_path, file_type="pdf"):
+        """Lazily yield page texts of a PDF (or the whole text of a .txt file)."""
+        # Deferred: langchain_community is slow to import and only needed once files are read
+        from langchain_community.document_loaders import PyPDFLoader, TextLoader
         loader_cls = PyPDFLoader if file_type == "pdf" else TextLoader
+        for doc in loader_cls(file_path).lazy_load():
+            yield doc.page_content
+
+    def iter_cleaned_pages(self, pages, executor=None):
+        """Clean pages across the worker pool, yielding results in page order with bounded look-ahead."""
+        if executor is None:
+            for page in pages:
+                yield self.clean_text(page)
+            return
+        batch = []
+        in_flight = deque()
+        for page in pages:
+            batch.append(page)
+            if len(batch) == self.pages_per_task:
+                in_flight.append(executor.submit(self.clean_pages, batch))
+                batch = []
+            if len(in_flight) >= self.max_in_flight:
+                yield from in_flight.popleft().result()
+        if batch:
+            in_flight.append(executor.submit(self.clean_pages, batch))
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+    def process_file(self, file_path, output_path, file_type="pdf", executor=None):
+        """Stream and clean a single PDF or text file, then write its output only once every page succeeded."""
+        cleaned_pages = self.iter_cleaned_pages(self.iter_pages(file_path, file_type), executor)
+        cleaned_text = "".join(page + "\n" for page in cleaned_pages)
+        output_file = os.path.join(output_path, f"{os.path.basename(file_path)}.txt")
+        with open(f"{output_file}.tmp", 'w', encoding='utf-8') as f:
+            f.write(cleaned_text)
+        os.replace(f"{output_file}.tmp", output_file)
+        return output_file
+
+    def process_files(self, input_path, output_path, file_type="pdf", data_type=None, manifest=None, executor=None):
+        """Process files (PDF or text) from input_path, clean, and save to output_path.
+
+        With a manifest, only new or changed files are cleaned and outputs of removed files are deleted.
+        """
+        os.makedirs(output_path, exist_ok=True)
         glob_pattern = "*.pdf" if file_type == "pdf" else "*.txt"
-        
-        loader = DirectoryLoader(path=input_path, glob=glob_pattern, loader_cls=loader_cls)
-        
-        try:
-            docs = loader.load()  # Use load() for full PDF processing
-            for doc in docs:
-                print(f"Processing: {doc.metadata['source']}")
-                cleaned_text = self.clean_text(doc.page_content)
-                output_file = os.path.join(output_path, f"{os.path.basename(doc.metadata['source'])}.txt")
-                with open(output_file, 'a', encoding='utf-8') as f:
-                    f.write(cleaned_text + "\n")
-                print(f"Appended cleaned text to: {output_file}")
-        except Exception as e:
-            print(f"Error processing files in {input_path}: {e}")
+        files = sorted(glob.glob(os.path.join(input_path, glob_pattern)))
+
+        if manifest is not None:
+            files, removed = manifest.diff("raw", data_type, files)
+            for name in removed:
+                output_file = os.path.join(output_path, f"{name}.txt")
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                manifest.forget("raw", data_type, name)
+                print(f"Removed cleaned text for deleted file: {name}")
 
-    def clean_all_data(self):
+        for file_path in files:
+            try:
+                print(f"Processing: {file_path}")
+                output_file = self.process_file(file_path, output_path, file_type, executor)
+                if manifest is not None:
+                    manifest.record("raw", data_type, file_path)
+                print(f"Saved cleaned text to: {output_file}")
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+
+    def clean_all_data(self, manifest=None):
         """Clean all data types: legal_texts, previous_year_docs, youtube_transcripts."""
-        for data_type, config in self.paths.items():
-            print(f"\nCleaning {data_type}...")
-            self.process_files(config["input"], config["output"], config["type"])
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            for data_type, config in self.paths.items():
+                print(f"\nCleaning {data_type}...")
+                self.process_files(config["input"], config["output"], config["type"], data_type, manifest, executor)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
 
 if __name__ == "__main__":
     cleaner = TextCleaner()
@@ -1,39 +1,65 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from src.data_ingestion.html_extractors import TimedExtractor, get_extractor
+from src.data_ingestion.rate_limiter import HostRateLimiter
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
 import os
-import time
 import logging
+import threading
 from urllib.parse import urljoin
 
+START_URLS = [
+    "/wiki/Law_of_India",
+    "/wiki/Indian_legal_system",
+    "/wiki/Constitution_of_India",
+    "/wiki/Indian_Penal_Code",
+    "/wiki/Code_of_Criminal_Procedure_(India)",
+    "/wiki/Indian_Evidence_Act",
+    "/wiki/Indian_Contract_Act,_1872",
+    "/wiki/Civil_Procedure_Code_(India)",
+    "/wiki/Transfer_of_Property_Act_1882",
+    "/wiki/Indian_Succession_Act,_1925",
+    "/wiki/Hindu_Marriage_Act,_1955",
+    "/wiki/Specific_Relief_Act,_1963",
+    "/wiki/Consumer_Protection_Act,_2019",
+    "/wiki/Right_to_Information_Act,_2005",
+    "/wiki/Arbitration_and_Conciliation_Act,_1996",
+    "/wiki/Supreme_Court_of_India",
+    "/wiki/High_courts_of_India",
+    "/wiki/Legal_education_in_India"
+]
+
 class IndianLawScraper:
     """Scraper for Indian laws and legal system content from Wikipedia."""
     
-    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-        """Initialize with base path and setup logging."""
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 base_url="https://en.wikipedia.org", start_urls=None, workers=4, requests_per_second=1.0,
+                 burst=1, checkpoint_every=10, extractor="auto"):
+        """Initialize with base path, crawl concurrency and per-host rate limit, and setup logging.
+
+        base_url and start_urls can point the crawler at another site (e.g. a local fixture server).
+        extractor selects the HTML backend: "auto" (bs4, identical to the legacy parser), or the faster
+        "selectolax" or "lxml", which differ on malformed nesting (see html_extractors.get_extractor).
+        """
         self.base_path = base_path
         self.output_path = os.path.join(base_path, r"raw\legal_texts")  # Changed to legal_texts
+        self.state_path = os.path.join(base_path, "web_scraper_state.json")
         self.logger = self._setup_logging()
-        self.base_url = "https://en.wikipedia.org"
-        self.start_urls = [
-            "/wiki/Law_of_India",
-            "/wiki/Indian_legal_system",
-            "/wiki/Constitution_of_India",
-            "/wiki/Indian_Penal_Code",
-            "/wiki/Code_of_Criminal_Procedure_(India)",
-            "/wiki/Indian_Evidence_Act",
-            "/wiki/Indian_Contract_Act,_1872",
-            "/wiki/Civil_Procedure_Code_(India)",
-            "/wiki/Transfer_of_Property_Act_1882",
-            "/wiki/Indian_Succession_Act,_1925",
-            "/wiki/Hindu_Marriage_Act,_1955",
-            "/wiki/Specific_Relief_Act,_1963",
-            "/wiki/Consumer_Protection_Act,_2019",
-            "/wiki/Right_to_Information_Act,_2005",
-            "/wiki/Arbitration_and_Conciliation_Act,_1996",
-            "/wiki/Supreme_Court_of_India",
-            "/wiki/High_courts_of_India",
-            "/wiki/Legal_education_in_India"
-        ]
+        self.base_url = base_url
+        self.workers = workers
+        self.checkpoint_every = checkpoint_every
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        self.extractor = TimedExtractor(get_extractor(extractor))
+        self.validators = {}  # url -> ETag/Last-Modified and outgoing links from the last fetch
+        self._validators_lock = threading.Lock()  # Entries are replaced, never mutated, under this lock
+        self.start_urls = start_urls or list(START_URLS)
         os.makedirs(self.output_path, exist_ok=True)
 
     def _setup_logging(self):
@@ -49,39 +75,43 @@ class IndianLawScraper:
         return logging.getLogger(__name__)
 
     def fetch_page(self, url):
-        """Fetch page content with error handling and rate limiting."""
+        """Fetch page content over the pooled session with per-host rate limiting and conditional GETs.
+
+        Returns (html, not_modified); html is None on failure or when the server answers 304.
+        """
         try:
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            response = requests.get(url, headers=headers, timeout=10)
+            headers = {}
+            with self._validators_lock:
+                cached = self.validators.get(url, {})
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+            self.rate_limiter.acquire(url)
+            response = self.session.get(url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                self.logger.info(f"Not modified: {url}")
+                return None, True
             response.raise_for_status()
-            time.sleep(1)  # Respect rate limit
+            with self._validators_lock:
+                self.validators[url] = {"etag": response.headers.get("ETag"),
+                                        "last_modified": response.headers.get("Last-Modified")}
             self.logger.info(f"Fetched: {url}")
-            return response.text
+            return response.text, False
         except Exception as e:
             self.logger.error(f"Failed to fetch {url}: {str(e)}")
-            return None
+            return None, False
 
     def parse_page(self, html, url):
-        """Parse HTML content and extract text."""
+        """Parse HTML content and extract paragraph text and relevant links in one pass."""
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            content = soup.find("div", class_="mw-parser-output")
-            if not content:
+            extracted = self.extractor.extract(html)
+            self.logger.debug(f"Parsed {url} in {self.extractor.last_ms:.1f} ms ({self.extractor.name})")
+            if extracted is None:
                 self.logger.warning(f"No content found in {url}")
-                return None
-            
-            # Extract text from paragraphs
-            text = "\n".join(p.get_text().strip() for p in content.find_all("p") if p.get_text().strip())
-            
-            # Follow relevant links within the page
-            links = []
-            for a in content.find_all("a", href=True):
-                href = a["href"]
-                if href.startswith("/wiki/") and not href.startswith("/wiki/File:"):
-                    full_url = urljoin(self.base_url, href)
-                    if any(keyword in href.lower() for keyword in ["india", "law", "legal", "court", "act", "constitution"]):
-                        links.append(full_url)
-            return text, links
+                return None, []
+            paragraphs, hrefs = extracted
+            return "\n".join(paragraphs), [urljoin(self.base_url, href) for href in hrefs]
         except Exception as e:
             self.logger.error(f"Failed to parse {url}: {str(e)}")
             return None, []
@@ -96,36 +126,110 @@ class IndianLawScraper:
         except Exception as e:
             self.logger.error(f"Failed to save {filename}: {str(e)}")
 
-    def scrape(self, max_pages=30):
-        """Scrape content from start URLs and follow relevant links."""
-        visited = set()
-        to_visit = [urljoin(self.base_url, url) for url in self.start_urls]
-        page_count = 0
+    def load_checkpoint(self):
+        """Load the saved frontier, visited set, page count and validators, if any."""
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_checkpoint(self, frontier, visited, page_count, finished=False):
+        """Atomically persist crawl state so an interrupted crawl can resume.
 
-        while to_visit and page_count < max_pages:
-            url = to_visit.pop(0)
-            if url in visited:
-                continue
+        finished marks a run that ended on its page budget or an empty frontier rather than an interruption.
+        """
+        # Workers keep updating validators while the crawl checkpoints, so dump a snapshot
+        with self._validators_lock:
+            validators = dict(self.validators)
+        state = {"frontier": list(frontier), "visited": sorted(visited), "page_count": page_count,
+                 "finished": finished, "validators": validators}
+        with open(f"{self.state_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(f"{self.state_path}.tmp", self.state_path)
 
-            self.logger.info(f"Scraping: {url}")
-            html = self.fetch_page(url)
-            if not html:
-                continue
+    def crawl_page(self, url):
+        """Fetch, parse and save one page; returns (saved, links)."""
+        self.logger.info(f"Scraping: {url}")
+        html, not_modified = self.fetch_page(url)
+        if not_modified:
+            # Unchanged since the last crawl: keep the saved file and reuse its links
+            with self._validators_lock:
+                return False, self.validators.get(url, {}).get("links", [])
+        if not html:
+            return False, []
 
-            text, links = self.parse_page(html, url)
-            if text:
-                filename = url.split("/")[-1].replace(":", "_")
-                self.save_content(text, filename)
-                page_count += 1
+        text, links = self.parse_page(html, url)
+        with self._validators_lock:
+            if url in self.validators:
+                self.validators[url] = dict(self.validators[url], links=links)
+        if text:
+            filename = url.split("/")[-1].replace(":", "_")
+            self.save_content(text, filename)
+            return True, links
+        return False, links
 
-            # Add new links to visit
-            for link in links:
-                if link not in visited and link not in to_visit:
-                    to_visit.append(link)
+    def scrape(self, max_pages=30, resume=True):
+        """Crawl start URLs and relevant links concurrently, checkpointing the frontier to disk.
 
-            visited.add(url)
+        max_pages is a budget of pages saved per run. An interrupted crawl resumes from its checkpoint;
+        after a finished run the start URLs are re-seeded ahead of the remaining frontier, so unchanged
+        pages are re-checked with conditional GETs (which do not count against the budget) before the
+        crawl moves on to new pages.
+        """
+        state = self.load_checkpoint() if resume else None
+        if state:
+            self.validators = state.get("validators", {})
+        if state and state["frontier"] and not state.get("finished", False):
+            frontier = deque(state["frontier"])
+            visited = set(state["visited"])
+            self.logger.info(f"Resuming crawl: {len(frontier)} queued, {len(visited)} visited")
+        else:
+            start_urls = [urljoin(self.base_url, url) for url in self.start_urls]
+            queued = state["frontier"] if state else []
+            frontier = deque(start_urls + [url for url in queued if url not in start_urls])
+            visited = set()
+        page_count = 0
+        seen = visited | set(frontier)
+        in_flight = {}
+        completed = 0
+        finished = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Once the budget is spent nothing new is submitted, but fetches already in flight are
+                # drained and recorded so the checkpoint does not re-queue pages that were fetched
+                while in_flight or (frontier and page_count < max_pages):
+                    while frontier and len(in_flight) < self.workers and page_count + len(in_flight) < max_pages:
+                        url = frontier.popleft()
+                        in_flight[executor.submit(self.crawl_page, url)] = url
+                    if not in_flight:
+                        break
 
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = in_flight.pop(future)
+                        try:
+                            saved, links = future.result()
+                        except Exception as e:
+                            self.logger.error(f"Failed to crawl {url}: {str(e)}")
+                            saved, links = False, []
+                        page_count += saved
+                        visited.add(url)
+                        # Add new links to visit
+                        for link in links:
+                            if link not in seen:
+                                seen.add(link)
+                                frontier.append(link)
+                        completed += 1
+                        if completed % self.checkpoint_every == 0:
+                            self.save_checkpoint(list(in_flight.values()) + list(frontier), visited, page_count)
+                finished = True
+        finally:
+            # Pages still in flight on an interruption are re-queued rather than lost
+            self.save_checkpoint(list(in_flight.values()) + list(frontier), visited, page_count, finished)
         self.logger.info(f"Scraping completed. Processed {page_count} pages.")
+        self.logger.info(f"Parse timing: {self.extractor.stats()}")
+        return page_count
 
 if __name__ == "__main__":
     scraper = IndianLawScraper()
@@ -1,131 +1,293 @@
-# from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
-# from googleapiclient.discovery import build
-# from googleapiclient.errors import HttpError
-# from dotenv import load_dotenv
-# import os
-# import logging
-# import re
-
-# class YouTubeTranscriptLoader:
-#     """Loads transcripts of Indian law lecture videos from YouTube and saves them."""
-    
-#     def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-#         """Initialize with base path, YouTube API, and logging."""
-#         load_dotenv()  # Load .env file
-#         self.base_path = base_path
-#         self.output_path = os.path.join(base_path, r"raw\youtube_transcripts")
-#         self.logger = self._setup_logging()
-#         os.makedirs(self.output_path, exist_ok=True)
-#         self.youtube_api_key = os.getenv("YOUTUBE_API_KEY")
-#         if not self.youtube_api_key:
-#             raise ValueError("YOUTUBE_API_KEY not found in .env file.")
-#         self.youtube = build('youtube', 'v3', developerKey=self.youtube_api_key)
-#         self.search_terms = [
-#             "Indian law lecture",
-#             "Indian Constitution lecture",
-#             "Indian Penal Code lecture",
-#             "Indian Contract Act lecture",
-#             "Indian Evidence Act lecture",
-#             "Indian legal system lecture"
-#         ]
-
-#     def _setup_logging(self):
-#         """Configure logging for loader execution."""
-#         logging.basicConfig(
-#             level=logging.INFO,
-#             format="%(asctime)s - %(levelname)s - %(message)s",
-#             handlers=[
-#                 logging.FileHandler(os.path.join(self.base_path, "youtube_loader.log")),
-#                 logging.StreamHandler()
-#             ]
-#         )
-#         return logging.getLogger(__name__)
-
-#     def search_videos(self, max_results=10):
-#         """Search YouTube for Indian law lecture videos."""
-#         video_urls = []
-#         for term in self.search_terms:
-#             try:
-#                 self.logger.info(f"Searching YouTube for: {term}")
-#                 request = self.youtube.search().list(
-#                     part="id,snippet",
-#                     q=term,
-#                     type="video",
-#                     maxResults=max_results,
-#                     videoCaption="closedCaption"  # Only videos with captions
-#                 )
-#                 response = request.execute()
-#                 for item in response["items"]:
-#                     video_id = item["id"]["videoId"]
-#                     video_url = f"https://www.youtube.com/watch?v={video_id}"
-#                     video_urls.append(video_url)
-#                 self.logger.info(f"Found {len(response['items'])} videos for term: {term}")
-#                 time.sleep(1)  # Respect API rate limits
-#             except HttpError as e:
-#                 self.logger.error(f"Error searching YouTube for {term}: {str(e)}")
-#         return list(set(video_urls))  # Remove duplicates
-
-#     def is_indian_law_related(self, transcript):
-#         """Check if transcript contains Indian law-related keywords."""
-#         keywords = [
-#             "indian law", "constitution of india", "indian penal code", "contract act",
-#             "criminal procedure", "evidence act", "civil procedure", "supreme court of india",
-#             "high court", "legal system", "indian legislation", "jurisprudence"
-#         ]
-#         transcript_text = " ".join([entry["text"] for entry in transcript]).lower()
-#         return any(keyword in transcript_text for keyword in keywords)
-
-#     def get_video_id(self, url):
-#         """Extract video ID from YouTube URL."""
-#         try:
-#             video_id = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", url)
-#             return video_id.group(1) if video_id else None
-#         except Exception as e:
-#             self.logger.error(f"Invalid URL {url}: {str(e)}")
-#             return None
-
-#     def fetch_transcript(self, video_id):
-#         """Fetch transcript for a given video ID."""
-#         try:
-#             transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['en', 'en-IN'])
-#             if self.is_indian_law_related(transcript):
-#                 return transcript
-#             else:
-#                 self.logger.info(f"Video {video_id} not related to Indian law")
-#                 return None
-#         except (NoTranscriptFound, TranscriptsDisabled) as e:
-#             self.logger.error(f"No transcript available for video {video_id}: {str(e)}")
-#             return None
-#         except Exception as e:
-#             self.logger.error(f"Error fetching transcript for video {video_id}: {str(e)}")
-#             return None
-
-#     def save_transcript(self, transcript, video_id):
-#         """Save transcript to file."""
-#         try:
-#             transcript_text = "\n".join([entry["text"] for entry in transcript])
-#             file_path = os.path.join(self.output_path, f"{video_id}.txt")
-#             with open(file_path, "w", encoding="utf-8") as f:
-#                 f.write(transcript_text)
-#             self.logger.info(f"Saved transcript to {file_path}")
-#         except Exception as e:
-#             self.logger.error(f"Failed to save transcript for {video_id}: {str(e)}")
-
-#     def load_transcripts(self, max_results=10):
-#         """Search for Indian law lecture videos and load their transcripts."""
-#         self.logger.info("Starting YouTube transcript loading...")
-#         video_urls = self.search_videos(max_results)
-#         self.logger.info(f"Found {len(video_urls)} unique video URLs")
-        
-#         for url in video_urls:
-#             video_id = self.get_video_id(url)
-#             if not video_id:
-#                 continue
-#             transcript = self.fetch_transcript(video_id)
-#             if transcript:
-#                 self.save_transcript(transcript, video_id)
-#         self.logger.info("Transcript loading completed.")
-
-# if __name__ == "__main__":
-#     loader = YouTubeTranscriptLoader()
-#     loader.load_transcripts()
+from dotenv import load_dotenv
+from src.data_ingestion.rate_limiter import TokenBucket
+from src.utils.text_processing import KeywordMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import datetime
+import json
+import os
+import logging
+import re
+import threading
+import time
+
+SEARCH_TERMS = [
+    "Indian law lecture",
+    "Indian Constitution lecture",
+    "Indian Penal Code lecture",
+    "Indian Contract Act lecture",
+    "Indian Evidence Act lecture",
+    "Indian legal system lecture"
+]
+KEYWORDS = [
+    "indian law", "constitution of india", "indian penal code", "contract act",
+    "criminal procedure", "evidence act", "civil procedure", "supreme court of india",
+    "high court", "legal system", "indian legislation", "jurisprudence"
+]
+SEARCH_COST = 100  # YouTube Data API quota units per search.list call
+# Transcript errors that mean the video will never have a usable transcript, and ones that mean "slow down"
+UNAVAILABLE_ERRORS = {"NoTranscriptFound", "TranscriptsDisabled", "VideoUnavailable", "NoTranscriptAvailable"}
+THROTTLE_ERRORS = {"TooManyRequests", "RequestBlocked", "IpBlocked", "YouTubeRequestFailed"}
+
+class VideoCache:
+    """On-disk record of every video id already processed, search results and API quota use.
+
+    A video is recorded once fetched and saved, or rejected (unrelated or without a transcript),
+    so later runs never request it again; transient failures are not recorded and get retried.
+    """
+
+    def __init__(self, path, search_ttl=24 * 3600):
+        """Initialize with the JSON file path and how long search results stay fresh (seconds)."""
+        self.path = path
+        self.search_ttl = search_ttl
+        self._lock = threading.Lock()
+        self.state = {"videos": {}, "searches": {}, "quota": {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+
+    def __contains__(self, video_id):
+        return video_id in self.state["videos"]
+
+    def record_video(self, video_id, status, keywords=()):
+        """Record the outcome for a video ("saved", "unrelated" or "unavailable")."""
+        with self._lock:
+            self.state["videos"][video_id] = {"status": status, "keywords": sorted(keywords), "at": time.time()}
+
+    def search_results(self, term):
+        """Cached video ids for a search term, or None if missing or stale."""
+        entry = self.state["searches"].get(term)
+        if entry and time.time() - entry["at"] < self.search_ttl:
+            return entry["ids"]
+        return None
+
+    def record_search(self, term, ids):
+        """Record the video ids a search term returned."""
+        with self._lock:
+            self.state["searches"][term] = {"ids": list(ids), "at": time.time()}
+
+    def quota_used(self, day):
+        """Quota units spent on day (quota days reset at midnight Pacific time)."""
+        return self.state["quota"].get(day, 0)
+
+    def spend_quota(self, day, units):
+        """Add units to day's quota use (earlier days are dropped)."""
+        with self._lock:
+            self.state["quota"] = {day: self.state["quota"].get(day, 0) + units}
+
+    def save(self):
+        """Atomically write the cache to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with open(f"{self.path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+class YouTubeTranscriptLoader:
+    """Loads transcripts of Indian law lecture videos from YouTube and saves them."""
+
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 youtube=None, transcript_api=None, workers=8, search_workers=3, searches_per_second=2.0,
+                 transcripts_per_second=2.0, burst=2, daily_quota=10000, max_retries=3, backoff=2.0,
+                 search_terms=None, checkpoint_every=10):
+        """Initialize with base path, API clients, concurrency and rate limits, and setup logging.
+
+        youtube (a YouTube Data API resource) and transcript_api (with youtube_transcript_api's fetch or
+        get_transcript) replace the real clients, e.g. with fakes for offline runs. Searches and transcript
+        fetches each get their own token bucket; searches stop once daily_quota units would be exceeded.
+        Throttled transcript requests are retried max_retries times with exponential backoff.
+        """
+        load_dotenv()  # Load .env file
+        self.base_path = base_path
+        self.output_path = os.path.join(base_path, r"raw\youtube_transcripts")
+        self.logger = self._setup_logging()
+        os.makedirs(self.output_path, exist_ok=True)
+        self.youtube = youtube
+        if youtube is None:
+            youtube_api_key = os.getenv("YOUTUBE_API_KEY")
+            if not youtube_api_key:
+                raise ValueError("YOUTUBE_API_KEY not found in .env file.")
+            from googleapiclient.discovery import build  # Deferred: not needed with an injected client
+            self.youtube = build('youtube', 'v3', developerKey=youtube_api_key)
+        if transcript_api is None:
+            from youtube_transcript_api import YouTubeTranscriptApi
+            transcript_api = YouTubeTranscriptApi()
+        self.transcript_api = transcript_api
+        self.workers = workers
+        self.search_workers = search_workers
+        self.search_bucket = TokenBucket(searches_per_second, burst)
+        self.transcript_bucket = TokenBucket(transcripts_per_second, burst)
+        self.daily_quota = daily_quota
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint_every = checkpoint_every
+        self.search_terms = list(search_terms or SEARCH_TERMS)
+        self.matcher = KeywordMatcher(KEYWORDS)
+        self.cache = VideoCache(os.path.join(base_path, r"cache\youtube_videos.json"))
+        self._quota_lock = threading.Lock()
+        self._requests_lock = threading.Lock()
+        self.requests = {"search": 0, "transcript": 0}  # API calls made, for monitoring
+
+    def _setup_logging(self):
+        """Configure logging for loader execution."""
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.FileHandler(os.path.join(self.base_path, "youtube_loader.log")),
+                logging.StreamHandler()
+            ]
+        )
+        return logging.getLogger(__name__)
+
+    def _count(self, kind):
+        with self._requests_lock:
+            self.requests[kind] += 1
+
+    @staticmethod
+    def quota_day():
+        """The current API quota day (quota resets at midnight Pacific time, approximated as UTC-8)."""
+        return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=8)).date().isoformat()
+
+    def _reserve_quota(self, units):
+        """Reserve quota units for a call, or return False when the daily quota would be exceeded."""
+        with self._quota_lock:
+            day = self.quota_day()
+            if self.cache.quota_used(day) + units > self.daily_quota:
+                return False
+            self.cache.spend_quota(day, units)
+            return True
+
+    def search_term(self, term, max_results=10):
+        """Video ids for one search term, from the cache when fresh, else from the API."""
+        cached = self.cache.search_results(term)
+        if cached is not None:
+            self.logger.info(f"Using cached search results for: {term}")
+            return cached
+        if not self._reserve_quota(SEARCH_COST):
+            self.logger.warning(f"Daily YouTube API quota reached; skipping search for: {term}")
+            return []
+        try:
+            self.search_bucket.acquire()
+            self.logger.info(f"Searching YouTube for: {term}")
+            self._count("search")
+            request = self.youtube.search().list(
+                part="id",
+                q=term,
+                type="video",
+                maxResults=max_results,
+                videoCaption="closedCaption"  # Only videos with captions
+            )
+            response = request.execute()
+            ids = [item["id"]["videoId"] for item in response["items"]]
+            self.cache.record_search(term, ids)
+            self.logger.info(f"Found {len(ids)} videos for term: {term}")
+            return ids
+        except Exception as e:
+            if "quotaExceeded" in str(e):
+                self.cache.spend_quota(self.quota_day(), self.daily_quota)  # Stop searching until the quota resets
+            self.logger.error(f"Error searching YouTube for {term}: {str(e)}")
+            return []
+
+    def search_videos(self, max_results=10):
+        """Search YouTube for Indian law lecture videos concurrently; returns unique video ids in term order."""
+        with ThreadPoolExecutor(max_workers=self.search_workers) as executor:
+            results = list(executor.map(lambda term: self.search_term(term, max_results), self.search_terms))
+        return list(dict.fromkeys(video_id for ids in results for video_id in ids))  # Remove duplicates
+
+    def is_indian_law_related(self, transcript):
+        """Check if transcript contains Indian law-related keywords."""
+        return self.matcher.any_match(entry["text"] for entry in transcript)
+
+    def get_video_id(self, url):
+        """Extract video ID from YouTube URL."""
+        try:
+            video_id = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11}).*", url)
+            return video_id.group(1) if video_id else None
+        except Exception as e:
+            self.logger.error(f"Invalid URL {url}: {str(e)}")
+            return None
+
+    def _request_transcript(self, video_id):
+        """Transcript entries ({"text": ...} dicts) from either youtube_transcript_api interface."""
+        if hasattr(self.transcript_api, "fetch"):
+            fetched = self.transcript_api.fetch(video_id, languages=['en', 'en-IN'])
+            return fetched.to_raw_data() if hasattr(fetched, "to_raw_data") else list(fetched)
+        return self.transcript_api.get_transcript(video_id, languages=['en', 'en-IN'])
+
+    def fetch_transcript(self, video_id):
+        """Fetch transcript for a given video ID.
+
+        Returns (status, transcript, keywords): status is "saved" with the transcript when it is on topic,
+        "unrelated" or "unavailable" for rejected videos, and "error" for failures worth retrying later.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.transcript_bucket.acquire()
+                self._count("transcript")
+                transcript = self._request_transcript(video_id)
+                keywords = self.matcher.matches(entry["text"] for entry in transcript)
+                if keywords:
+                    return "saved", transcript, keywords
+                self.logger.info(f"Video {video_id} not related to Indian law")
+                return "unrelated", None, ()
+            except Exception as e:
+                error = type(e).__name__
+                if error in UNAVAILABLE_ERRORS:
+                    self.logger.info(f"No transcript available for video {video_id}: {error}")
+                    return "unavailable", None, ()
+                if error in THROTTLE_ERRORS and attempt < self.max_retries:
+                    delay = self.backoff * 2 ** attempt
+                    self.logger.warning(f"Throttled fetching {video_id} ({error}); retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                self.logger.error(f"Error fetching transcript for video {video_id}: {str(e)}")
+                return "error", None, ()
+
+    def save_transcript(self, transcript, video_id):
+        """Save transcript to file."""
+        try:
+            transcript_text = "\n".join([entry["text"] for entry in transcript])
+            file_path = os.path.join(self.output_path, f"{video_id}.txt")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(transcript_text)
+            self.logger.info(f"Saved transcript to {file_path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to save transcript for {video_id}: {str(e)}")
+            return False
+
+    def load_transcripts(self, max_results=10, video_urls=None):
+        """Search for Indian law lecture videos and load their transcripts concurrently.
+
+        video_urls adds specific videos to the search results. Videos already in the cache are skipped.
+        Returns counts per outcome, plus cached (skipped) videos.
+        """
+        self.logger.info("Starting YouTube transcript loading...")
+        video_ids = self.search_videos(max_results)
+        for url in video_urls or []:
+            video_id = self.get_video_id(url)
+            if video_id and video_id not in video_ids:
+                video_ids.append(video_id)
+        pending = [video_id for video_id in video_ids if video_id not in self.cache]
+        counts = {"saved": 0, "unrelated": 0, "unavailable": 0, "error": 0, "cached": len(video_ids) - len(pending)}
+        self.logger.info(f"Found {len(video_ids)} unique videos, {counts['cached']} already processed")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.fetch_transcript, video_id): video_id for video_id in pending}
+            for completed, future in enumerate(as_completed(futures), 1):
+                video_id = futures[future]
+                status, transcript, keywords = future.result()
+                if status == "saved" and not self.save_transcript(transcript, video_id):
+                    status = "error"
+                counts[status] += 1
+                if status != "error":
+                    self.cache.record_video(video_id, status, keywords)
+                if completed % self.checkpoint_every == 0:
+                    self.cache.save()
+        self.cache.save()
+        self.logger.info(f"Transcript loading completed: {counts}")
+        return counts
+
+if __name__ == "__main__":
+    loader = YouTubeTranscriptLoader()
+    loader.load_transcripts()
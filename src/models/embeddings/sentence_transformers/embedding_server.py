@@ -0,0 +1,145 @@
+import numpy as np
+from src.models.embeddings.sentence_transformers.model_registry import (
+    BACKENDS, DEFAULT_EMBEDDING_MODEL, SOCKET_ENV, backend_tag, get_sentence_transformer, resolve_backend
+)
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+# Wire format: 4-byte big-endian header length, JSON header, then header["payload_bytes"] raw bytes
+_HEADER = struct.Struct(">I")
+ENCODE_OPTIONS = ("batch_size", "normalize_embeddings")
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Embedding socket closed")
+        data.extend(chunk)
+    return bytes(data)
+
+def send_message(sock, header, payload=b""):
+    """Send a JSON header and optional binary payload."""
+    header = json.dumps(dict(header, payload_bytes=len(payload))).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(header)) + header + payload)
+
+def recv_message(sock):
+    """Receive a (header, payload) message."""
+    header = json.loads(_recv_exact(sock, _HEADER.unpack(_recv_exact(sock, _HEADER.size))[0]))
+    return header, _recv_exact(sock, header["payload_bytes"])
+
+class _EmbeddingHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                request, _ = recv_message(self.request)
+            except ConnectionError:
+                return
+            try:
+                if request["op"] == "ping":
+                    send_message(self.request, {"model": server.model_name, "backend": backend_tag(server.backend),
+                                                "dimension": server.model.get_sentence_embedding_dimension()})
+                    continue
+                options = {key: value for key, value in request.get("options", {}).items() if key in ENCODE_OPTIONS}
+                with server.encode_lock:
+                    embeddings = server.model.encode(request["texts"], show_progress_bar=False, **options)
+                embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+                send_message(self.request, {"shape": list(embeddings.shape)}, embeddings.tobytes())
+            except Exception as e:
+                send_message(self.request, {"error": str(e)})
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Long-lived local daemon that keeps one embedding model warm and serves encode calls over a Unix socket."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, model_name=DEFAULT_EMBEDDING_MODEL, backend=None, model=None):
+        """Load the model on its inference backend and bind the socket, replacing a stale socket file.
+
+        model replaces the loaded model (e.g. a StubEmbedder for offline tests); it is still announced
+        as model_name on backend.
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.model = model or get_sentence_transformer(model_name, self.backend)
+        self.encode_lock = threading.Lock()  # One encode at a time; each request is already a batch
+        super().__init__(socket_path, _EmbeddingHandler)
+
+class EmbeddingClient:
+    """Client for EmbeddingServer exposing the SentenceTransformer.encode interface used by the pipelines."""
+
+    def __init__(self, socket_path, expected_model=None, expected_backend=None, timeout=60):
+        """Initialize with the daemon's socket path and, optionally, the model and backend it must be serving."""
+        self.socket_path = socket_path
+        self.expected_model = expected_model
+        self.expected_backend = expected_backend
+        self.timeout = timeout
+        self.dimension = None
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Open the connection and check the daemon serves the expected model on the expected backend."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._sock = sock
+        info = self._call({"op": "ping"})[0]
+        if self.expected_model and info["model"] != self.expected_model:
+            self.close()
+            raise ValueError(f"Embedding daemon serves {info['model']}, not {self.expected_model}")
+        if self.expected_backend and info["backend"] != self.expected_backend:
+            self.close()
+            raise ValueError(f"Embedding daemon runs on {info['backend']}, not {self.expected_backend}")
+        self.dimension = info["dimension"]
+        return self
+
+    def _call(self, request):
+        with self._lock:
+            send_message(self._sock, request)
+            header, payload = recv_message(self._sock)
+        if "error" in header:
+            raise RuntimeError(f"Embedding daemon error: {header['error']}")
+        return header, payload
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, **kwargs):
+        """Encode sentences remotely; returns a float32 array (1-D for a single string)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        header, payload = self._call({"op": "encode", "texts": texts,
+                                      "options": {"batch_size": batch_size,
+                                                  "normalize_embeddings": normalize_embeddings}})
+        embeddings = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def close(self):
+        """Close the connection."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a warm embedding model over a Unix socket.")
+    parser.add_argument("--socket", default=os.getenv(SOCKET_ENV, "/tmp/legal_embeddings.sock"))
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backend", choices=BACKENDS, help="Inference backend (default LEGAL_EMBEDDING_BACKEND or torch)")
+    args = parser.parse_args()
+    server = EmbeddingServer(args.socket, args.model, args.backend)
+    print(f"Serving {args.model} ({server.backend}) on {args.socket} (set {SOCKET_ENV}={args.socket} for clients)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
@@ -0,0 +1,161 @@
+import os
+import platform
+import threading
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+SOCKET_ENV = "LEGAL_EMBEDDING_SOCKET"
+BACKEND_ENV = "LEGAL_EMBEDDING_BACKEND"
+CACHE_ENV = "LEGAL_MODEL_CACHE"
+INT8_CONFIG_ENV = "LEGAL_INT8_CONFIG"
+# Inference backends: PyTorch fp32, ONNX Runtime fp32, and ONNX Runtime with dynamic int8 quantization
+BACKENDS = ("torch", "onnx", "onnx-int8")
+# sentence-transformers' int8 quantization presets, each tuned for one CPU family
+INT8_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+_models = {}
+_lock = threading.Lock()
+
+def _load_once(key, loader):
+    with _lock:
+        if key not in _models:
+            _models[key] = loader()
+        return _models[key]
+
+def resolve_backend(backend=None):
+    """Return the inference backend to use: backend, else LEGAL_EMBEDDING_BACKEND, else torch."""
+    backend = backend or os.getenv(BACKEND_ENV) or "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}; choose one of {BACKENDS}")
+    return backend
+
+def _cpu_flags():
+    """Lower-case CPU feature flags from /proc/cpuinfo, else py-cpuinfo if installed, else an empty set."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    try:
+        import cpuinfo  # Optional: py-cpuinfo covers platforms without /proc/cpuinfo
+    except ImportError:
+        return set()
+    return {flag.lower() for flag in cpuinfo.get_cpu_info().get("flags", [])}
+
+def detect_int8_config():
+    """The int8 quantization preset matching this CPU: arm64, avx512_vnni, avx512, else the portable avx2."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    flags = _cpu_flags()
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+def resolve_int8_config(config=None):
+    """Return the int8 preset to use: config, else LEGAL_INT8_CONFIG, else the one detected for this CPU."""
+    config = config or os.getenv(INT8_CONFIG_ENV) or detect_int8_config()
+    if config not in INT8_CONFIGS:
+        raise ValueError(f"Unknown int8 quantization preset: {config}; choose one of {INT8_CONFIGS}")
+    return config
+
+def backend_tag(backend=None):
+    """The resolved backend, qualified with its quantization preset for onnx-int8 (e.g. onnx-int8:avx2)."""
+    backend = resolve_backend(backend)
+    return f"{backend}:{resolve_int8_config()}" if backend == "onnx-int8" else backend
+
+def embedding_space(name=DEFAULT_EMBEDDING_MODEL, backend=None):
+    """Tag of the vector space a model/backend pair embeds into; stores and indexes record it so spaces never mix.
+
+    int8 presets quantize differently, so onnx-int8 spaces include the preset.
+    """
+    return f"{name}@{backend_tag(backend)}"
+
+def export_dir(name, backend, cache_dir=None):
+    """Directory caching the ONNX export (and quantized model) of name for backend."""
+    root = cache_dir or os.getenv(CACHE_ENV) or os.path.join(os.path.expanduser("~"), ".cache", "legal_edu", "models")
+    return os.path.join(root, name.replace("/", "--"), backend)
+
+def _load_sentence_transformer(name, backend, cache_dir, kwargs):
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(name, **kwargs)
+    path = export_dir(name, backend, cache_dir)
+    int8_config = resolve_int8_config() if backend == "onnx-int8" else None
+    file_name = f"onnx/model_qint8_{int8_config}.onnx" if int8_config else "onnx/model.onnx"
+    if not os.path.exists(os.path.join(path, file_name)):
+        # First use: export to ONNX (and quantize) once, later processes load the cached files
+        model = SentenceTransformer(name, backend="onnx", **kwargs)
+        model.save_pretrained(path)
+        if backend == "onnx-int8":
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            export_dynamic_quantized_onnx_model(model, int8_config, path)
+    return SentenceTransformer(path, backend="onnx", model_kwargs={"file_name": file_name}, **kwargs)
+
+def get_sentence_transformer(name=DEFAULT_EMBEDDING_MODEL, backend=None, cache_dir=None, **kwargs):
+    """Return the process-wide SentenceTransformer for name on backend, importing and loading it on first use.
+
+    The onnx and onnx-int8 backends export (and quantize) the model on first use and cache it under
+    cache_dir (default LEGAL_MODEL_CACHE or ~/.cache/legal_edu/models). onnx-int8 uses the preset of
+    resolve_int8_config (LEGAL_INT8_CONFIG, or detected from the CPU).
+    """
+    backend = resolve_backend(backend)
+    return _load_once(("sentence_transformer", name, backend_tag(backend), tuple(sorted(kwargs.items()))),
+                      lambda: _load_sentence_transformer(name, backend, cache_dir, kwargs))
+
+def get_cross_encoder(name, **kwargs):
+    """Return the process-wide CrossEncoder for name, importing and loading it on first use."""
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(name, **kwargs)
+    return _load_once(("cross_encoder", name, tuple(sorted(kwargs.items()))), load)
+
+class LazyModel:
+    """Stand-in that resolves the real model on first attribute access, so constructors stay cheap."""
+
+    def __init__(self, loader, description):
+        """Initialize with a zero-argument loader and a description used in repr."""
+        self._loader = loader
+        self._description = description
+        self._model = None
+        self._resolve_lock = threading.Lock()
+
+    def resolve(self):
+        """Load (or fetch from the registry) the underlying model."""
+        if self._model is None:
+            with self._resolve_lock:
+                if self._model is None:
+                    self._model = self._loader()
+        return self._model
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        state = "loaded" if self._model is not None else "not loaded"
+        return f"LazyModel({self._description}, {state})"
+
+def embedding_model(name=DEFAULT_EMBEDDING_MODEL, socket_path=None, backend=None, **kwargs):
+    """Lazy embedding model: served by the embedding daemon if one is listening, otherwise loaded in-process.
+
+    socket_path defaults to the LEGAL_EMBEDDING_SOCKET environment variable and backend to
+    LEGAL_EMBEDDING_BACKEND. The daemon is only used when it runs the same model on the same backend.
+    """
+    backend = resolve_backend(backend)
+
+    def load():
+        path = socket_path or os.getenv(SOCKET_ENV)
+        if path and os.path.exists(path):
+            from src.models.embeddings.sentence_transformers.embedding_server import EmbeddingClient
+            try:
+                return EmbeddingClient(path, expected_model=name, expected_backend=backend_tag(backend)).connect()
+            except (OSError, ValueError):
+                pass  # Daemon not usable; fall back to an in-process model
+        return get_sentence_transformer(name, backend, **kwargs)
+    return LazyModel(load, embedding_space(name, backend))
+
+def cross_encoder_model(name, **kwargs):
+    """Lazy, process-wide CrossEncoder."""
+    return LazyModel(lambda: get_cross_encoder(name, **kwargs), name)
@@ -0,0 +1,35 @@
+import numpy as np
+import re
+import time
+import zlib
+
+class StubEmbedder:
+    """Offline stand-in for SentenceTransformer for benchmarks: hashed bag-of-words unit vectors.
+
+    Texts sharing words get similar vectors, so retrieval over a synthetic corpus behaves plausibly
+    without downloading a model. seconds_per_text adds simulated model cost.
+    """
+
+    embedding_space = "stub-hashed-bow"
+
+    def __init__(self, dimension=384, seconds_per_text=0.0):
+        """Initialize with the vector dimension and simulated encode cost per text."""
+        self.dimension = dimension
+        self.seconds_per_text = seconds_per_text
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=None, normalize_embeddings=False, **kwargs):
+        """Encode sentences; returns a float32 array (1-D for a single string)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = zlib.crc32(word.encode('utf-8'))
+                embeddings[row, digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
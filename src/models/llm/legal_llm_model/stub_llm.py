@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+class _Choice:
+    def __init__(self, message=None, delta=None):
+        self.message = message
+        self.delta = delta
+
+class _Response:
+    def __init__(self, choices):
+        self.choices = choices
+
+class _StubCompletions:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def create(self, model=None, messages=None, max_tokens=1024, stream=False, **kwargs):
+        tokens = self.llm.tokens(messages, max_tokens)
+        time.sleep(self.llm.latency)
+        if not stream:
+            time.sleep(len(tokens) / self.llm.tokens_per_second)
+            return _Response([_Choice(message=_Message("".join(tokens)))])
+        return self._stream(tokens)
+
+    def _stream(self, tokens):
+        for token in tokens:
+            time.sleep(1 / self.llm.tokens_per_second)
+            yield _Response([_Choice(delta=_Message(token))])
+
+class _AsyncStubCompletions(_StubCompletions):
+    async def create(self, model=None, messages=None, max_tokens=1024, stream=False, **kwargs):
+        tokens = self.llm.tokens(messages, max_tokens)
+        await asyncio.sleep(self.llm.latency)
+        if not stream:
+            await asyncio.sleep(len(tokens) / self.llm.tokens_per_second)
+            return _Response([_Choice(message=_Message("".join(tokens)))])
+        return self._astream(tokens)
+
+    async def _astream(self, tokens):
+        for token in tokens:
+            await asyncio.sleep(1 / self.llm.tokens_per_second)
+            yield _Response([_Choice(delta=_Message(token))])
+
+class _Chat:
+    def __init__(self, completions):
+        self.completions = completions
+
+class StubLLM:
+    """Offline stand-in for the Groq client with configurable latency, for load tests and benchmarks."""
+
+    def __init__(self, latency=0.3, tokens_per_second=250, answer_tokens=120):
+        """Initialize with time-to-first-token (s), generation speed and answer length in tokens."""
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.chat = _Chat(_StubCompletions(self))
+
+    def tokens(self, messages, max_tokens):
+        """Build a deterministic answer from the prompt, split into word tokens."""
+        prompt = messages[-1]["content"] if messages else ""
+        question = prompt.rsplit("Question:", 1)[-1].split("\n")[0].strip()
+        words = f"Stub answer to: {question}. This is a lesson on Indian law.".split()
+        count = min(self.answer_tokens, max_tokens)
+        return [f"{words[i % len(words)]} " for i in range(count)]
+
+class AsyncStubLLM(StubLLM):
+    """Async variant of StubLLM matching the AsyncGroq client interface."""
+
+    def __init__(self, latency=0.3, tokens_per_second=250, answer_tokens=120):
+        super().__init__(latency, tokens_per_second, answer_tokens)
+        self.chat = _Chat(_AsyncStubCompletions(self))
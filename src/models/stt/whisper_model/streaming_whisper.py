@@ -0,0 +1,171 @@
+from src.utils.audio_processing import TARGET_SAMPLE_RATE, StreamingResampler, VADSegmenter, WavReader
+import numpy as np
+import argparse
+import threading
+import time
+
+DEFAULT_WHISPER_MODEL = "base.en"
+LEGAL_PROMPT = "Indian Constitution, IPC, CrPC, Article 21, bail, writ petition, Supreme Court, High Court."
+
+_models = {}
+_lock = threading.Lock()
+
+def get_whisper_model(size=DEFAULT_WHISPER_MODEL, compute_type="int8", cpu_threads=0):
+    """Return the process-wide faster-whisper CPU model, importing and loading it on first use."""
+    key = (size, compute_type, cpu_threads)
+    with _lock:
+        if key not in _models:
+            from faster_whisper import WhisperModel  # Optional dependency, only needed for speech input
+            _models[key] = WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        return _models[key]
+
+def common_prefix(a, b):
+    """Number of leading words two hypotheses agree on (case and trailing punctuation ignored)."""
+    count = 0
+    for x, y in zip(a, b):
+        if x.lower().strip(".,?!") != y.lower().strip(".,?!"):
+            break
+        count += 1
+    return count
+
+class StreamingWhisper:
+    """Streaming speech-to-text on a local CPU Whisper model (faster-whisper, int8).
+
+    Audio is resampled to 16 kHz and cut into utterances by an energy VAD. While an utterance is
+    in progress its audio is re-decoded every step_s seconds; words that two consecutive decodes
+    agree on are stable and are emitted as a "partial" event as soon as the stable prefix grows.
+    A pause of pause_ms triggers an early decode whose whole hypothesis counts as stable, since
+    nothing newer can revise it; usually it already equals the "final" event decoded once the VAD
+    closes the utterance, which lets consumers start work on it before the utterance ends.
+    Events are dicts with type, text, utterance, audio_s (stream position) and decode_ms.
+    """
+
+    def __init__(self, model_size=DEFAULT_WHISPER_MODEL, compute_type="int8", cpu_threads=0, model=None,
+                 step_s=1.0, pause_ms=300, max_utterance_s=30.0, segmenter=None, language="en", beam_size=1,
+                 initial_prompt=LEGAL_PROMPT):
+        """Initialize the decoder settings; the model loads on first decode.
+
+        model replaces the faster-whisper model (anything with a compatible transcribe()). step_s is the
+        re-decode interval for partials and pause_ms the silence that triggers an early decode (keep it below
+        the segmenter's end_ms); utterances longer than max_utterance_s are cut and finalized.
+        """
+        self._model = model
+        self.model_size, self.compute_type, self.cpu_threads = model_size, compute_type, cpu_threads
+        self.step_samples = int(step_s * TARGET_SAMPLE_RATE)
+        self.pause_ms = pause_ms
+        self.segmenter = segmenter or VADSegmenter()
+        self.language, self.beam_size, self.initial_prompt = language, beam_size, initial_prompt
+        self._audio = np.empty(int(max_utterance_s * TARGET_SAMPLE_RATE), dtype=np.float32)  # Reused per utterance
+        self.reset()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_whisper_model(self.model_size, self.compute_type, self.cpu_threads)
+        return self._model
+
+    def reset(self):
+        """Forget the stream position and any utterance in progress."""
+        self._length = 0
+        self._decoded_at = 0
+        self._pause_decoded = False
+        self._previous_words = []
+        self._stable_words = []
+        self._active = False
+        self._resampler = None
+        self.utterance = 0
+        self.position = 0  # 16 kHz samples consumed
+
+    def decode(self, audio):
+        """Transcribe 16 kHz float32 audio to text."""
+        segments, _ = self.model.transcribe(
+            audio, language=self.language, beam_size=self.beam_size, initial_prompt=self.initial_prompt,
+            condition_on_previous_text=False, without_timestamps=True, vad_filter=False
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def _event(self, kind, text, decode_seconds):
+        return {"type": kind, "text": text, "utterance": self.utterance,
+                "audio_s": self.position / TARGET_SAMPLE_RATE, "decode_ms": decode_seconds * 1000}
+
+    def _append(self, audio):
+        """Copy audio into the utterance buffer, returning how many samples fit."""
+        count = min(len(self._audio) - self._length, len(audio))
+        self._audio[self._length:self._length + count] = audio[:count]
+        self._length += count
+        return count
+
+    def _partial(self, paused=False):
+        self._decoded_at = self._length
+        start = time.perf_counter()
+        words = self.decode(self._audio[:self._length]).split()
+        elapsed = time.perf_counter() - start
+        # LocalAgreement: a word is stable once two consecutive hypotheses contain it at the same place
+        agreed = words if paused else words[:common_prefix(words, self._previous_words)]
+        self._previous_words = words
+        if len(agreed) > len(self._stable_words) and common_prefix(agreed, self._stable_words) == len(self._stable_words):
+            self._stable_words = agreed
+            return [self._event("partial", " ".join(agreed), elapsed)]
+        return []
+
+    def _final(self):
+        start = time.perf_counter()
+        text = self.decode(self._audio[:self._length]) if self._length else ""
+        event = self._event("final", text, time.perf_counter() - start)
+        self._length, self._decoded_at, self._previous_words, self._stable_words = 0, 0, [], []
+        self._active = False
+        self.utterance += 1
+        return [event] if text else []
+
+    def feed(self, block, sample_rate=TARGET_SAMPLE_RATE):
+        """Consume a block of mono float32 samples at sample_rate and return the events it produced."""
+        if self._resampler is None or self._resampler.source_rate != sample_rate:
+            self._resampler = StreamingResampler(sample_rate)
+        block = self._resampler.process(block)
+        self.position += len(block)
+        events = []
+        for kind, audio in self.segmenter.process(block):
+            if kind == "end":
+                events.extend(self._final())
+                continue
+            self._active = True
+            consumed = self._append(audio)
+            if consumed < len(audio):
+                events.extend(self._final())  # Too long: finalize what fits and carry on as a new utterance
+                self._active = True
+                self._append(audio[consumed:])
+        silence = self.segmenter.trailing_silence_ms
+        if silence < self.pause_ms:
+            self._pause_decoded = False
+        if self._active:
+            if silence >= self.pause_ms and not self._pause_decoded:
+                self._pause_decoded = True
+                events.extend(self._partial(paused=True))
+            elif self._length - self._decoded_at >= self.step_samples:
+                events.extend(self._partial())
+        return events
+
+    def finish(self):
+        """Finalize an utterance still in progress at the end of the stream."""
+        self.segmenter.flush()
+        return self._final() if self._active else []
+
+    def transcribe_stream(self, blocks, sample_rate=TARGET_SAMPLE_RATE):
+        """Yield events for an iterable of sample blocks, then finalize."""
+        for block in blocks:
+            yield from self.feed(block, sample_rate)
+        yield from self.finish()
+
+    def transcribe_file(self, path, block_ms=100):
+        """Yield events for a WAV file streamed in block_ms blocks."""
+        with WavReader(path, block_ms) as reader:
+            yield from self.transcribe_stream(reader, reader.sample_rate)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a WAV file through the local Whisper model.")
+    parser.add_argument("wav")
+    parser.add_argument("--model", default=DEFAULT_WHISPER_MODEL)
+    args = parser.parse_args()
+
+    for event in StreamingWhisper(args.model).transcribe_file(args.wav):
+        print(f"[{event['audio_s']:6.2f}s] {event['type']:7s} ({event['decode_ms']:.0f} ms): {event['text']}")
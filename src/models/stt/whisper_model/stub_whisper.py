@@ -0,0 +1,32 @@
+from src.utils.audio_processing import TARGET_SAMPLE_RATE
+import time
+
+class _Segment:
+    def __init__(self, text):
+        self.text = text
+
+class StubWhisperModel:
+    """Offline stand-in for faster-whisper's WhisperModel, for benchmarks.
+
+    Each decode "hears" the scripted utterances in order: the words spoken so far, at words_per_second
+    of audio, of the current script line. seconds_per_audio_second adds simulated decode cost.
+    """
+
+    def __init__(self, script, words_per_second=2.5, seconds_per_audio_second=0.0):
+        """Initialize with the utterance texts in spoken order."""
+        self.script = list(script)
+        self.words_per_second = words_per_second
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self._line = 0
+        self._previous = 0
+
+    def transcribe(self, audio, **kwargs):
+        """Return (segments, info) like WhisperModel.transcribe."""
+        if len(audio) < self._previous:
+            self._line += 1  # A shorter buffer means a new utterance began
+        self._previous = len(audio)
+        seconds = len(audio) / TARGET_SAMPLE_RATE
+        if self.seconds_per_audio_second:
+            time.sleep(seconds * self.seconds_per_audio_second)
+        words = self.script[self._line % len(self.script)].split()
+        return [_Segment(" ".join(words[:int(seconds * self.words_per_second) + 1]))], None
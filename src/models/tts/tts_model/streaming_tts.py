@@ -0,0 +1,282 @@
+from src.utils.profiling import StageTimer
+from concurrent.futures import Future, ThreadPoolExecutor
+import argparse
+import hashlib
+import io
+import os
+import queue
+import re
+import threading
+import time
+import wave
+
+VOICE_ENV = "LEGAL_TTS_VOICE"
+# Ends of sentences: terminal punctuation (plus closing quotes/brackets) followed by a space, or a line break
+SENTENCE_END = re.compile(r"(?P<stop>(?<=[.!?])[\"')\]]*[ \t]+)|(?P<line>[ \t]*\n\s*)")
+# Words whose trailing period does not end a sentence ("State v. Kumar", "Sec. 302", "Art. 21"); dotted
+# abbreviations with an internal period ("I.P.C.", "Cr.P.C.") are recognized by DOTTED
+DOTTED = re.compile(r"[a-z]\.[a-z]")
+ABBREVIATIONS = {"v", "vs", "no", "nos", "sec", "secs", "s", "ss", "art", "arts", "cl", "para", "mr", "mrs", "ms",
+                 "dr", "ltd", "co", "govt", "hon'ble", "i.e", "e.g", "etc", "viz", "cf", "u/s", "ch", "st", "rs"}
+
+def sentence_end(text):
+    """Index just past the first complete sentence of text, or None if it has not ended yet."""
+    for match in SENTENCE_END.finditer(text):
+        if match.lastgroup == "stop" and text[match.start() - 1] == ".":
+            before = text[:match.start() - 1].split()
+            word = before[-1].lower().lstrip("(\"'") if before else ""
+            # Abbreviations, initials and a leading list number ("1. Introduction") do not end a sentence
+            if (word in ABBREVIATIONS or DOTTED.search(word) or (len(word) == 1 and word.isalpha())
+                    or (word.isdigit() and len(before) == 1)):
+                continue
+        return match.end()
+    return None
+
+def iter_sentences(tokens, max_chars=300):
+    """Group a stream of text tokens into sentences, yielding each as soon as it is complete.
+
+    Sentences longer than max_chars are cut at the last comma or space so audio never waits too long.
+    """
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        while True:
+            cut = sentence_end(buffer)
+            if cut is None and len(buffer) > max_chars:
+                split = max(buffer.rfind(", ", 0, max_chars), buffer.rfind(" ", 0, max_chars))
+                cut = split + 1 if split > 0 else max_chars
+            if cut is None:
+                break
+            sentence, buffer = buffer[:cut].strip(), buffer[cut:]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+class AudioCache:
+    """Content-addressed on-disk cache of synthesized sentences.
+
+    Each entry is a WAV file named by the SHA-256 of the voice id and the whitespace-normalized
+    sentence, so repeated sentences are synthesized once per voice across answers and processes.
+    """
+
+    def __init__(self, path):
+        """Initialize with the cache directory (created on first write)."""
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, voice_id, text):
+        """Cache key of text spoken by voice_id."""
+        return hashlib.sha256(f"{voice_id}\0{' '.join(text.split())}".encode('utf-8')).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], f"{key}.wav")
+
+    def get(self, key):
+        """Return the cached WAV bytes for key, or None."""
+        try:
+            with open(self._file(key), 'rb') as f:
+                audio = f.read()
+        except FileNotFoundError:
+            audio = None
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return audio
+
+    def set(self, key, audio):
+        """Store WAV bytes under key (atomically, so concurrent readers never see partial files)."""
+        file_path = self._file(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(temp_path, file_path)
+
+    def prune(self, max_bytes):
+        """Delete the least recently modified entries until the cache is at most max_bytes."""
+        entries = []
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".wav"):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= max_bytes:
+                break
+            os.remove(file_path)
+            total -= size
+
+    def stats(self):
+        """Return hit/miss counts and hit rate."""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+class PiperSynthesizer:
+    """Local CPU text-to-speech with a Piper ONNX voice, returning WAV bytes per text."""
+
+    def __init__(self, model_path=None, length_scale=None):
+        """Initialize with the voice's .onnx path (default LEGAL_TTS_VOICE); the voice loads on first use."""
+        self.model_path = model_path or os.getenv(VOICE_ENV)
+        if not self.model_path:
+            raise ValueError(f"No Piper voice given; pass model_path or set {VOICE_ENV}.")
+        self.length_scale = length_scale
+        self.voice_id = f"piper:{os.path.basename(self.model_path)}:{length_scale}"
+        self._voice = None
+        self._lock = threading.Lock()
+
+    @property
+    def voice(self):
+        with self._lock:
+            if self._voice is None:
+                from piper import PiperVoice  # Optional dependency, only needed for spoken answers
+                self._voice = PiperVoice.load(self.model_path)
+        return self._voice
+
+    def synthesize(self, text):
+        """Speak text and return it as WAV bytes."""
+        kwargs = {}
+        if self.length_scale is not None:
+            from piper import SynthesisConfig
+            kwargs["syn_config"] = SynthesisConfig(length_scale=self.length_scale)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            self.voice.synthesize_wav(text, wav, **kwargs)
+        return buffer.getvalue()
+
+class StreamingTTS:
+    """Speaks a stream of LLM tokens sentence by sentence.
+
+    Tokens are read on a producer thread, and sentences are cut from them as soon as they end and
+    synthesized on a worker pool, looked up first in an AudioCache. Audio chunks are emitted in
+    sentence order as soon as each is ready, independently of how fast the LLM streams, so playback
+    starts after the first sentence rather than the whole answer.
+    """
+
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 synthesizer=None, use_cache=True, workers=2, max_pending=8, max_chars=300, timer=None):
+        """Initialize with a synthesizer (default: the Piper voice in LEGAL_TTS_VOICE) and the cache under base_path.
+
+        workers synthesize in parallel; at most max_pending sentences are queued ahead of playback.
+        timer (a StageTimer) collects synthesize and time_to_first_audio spans.
+        """
+        self.synthesizer = synthesizer or PiperSynthesizer()
+        self.cache = AudioCache(os.path.join(base_path, r"cache\tts")) if use_cache else None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.max_pending = max_pending
+        self.max_chars = max_chars
+        self.timer = timer or StageTimer()
+        self.sentences = 0
+        self.time_to_first_audio = None
+
+    def _synthesize(self, key, text):
+        with self.timer.span("synthesize"):
+            audio = self.synthesizer.synthesize(text)
+        if self.cache is not None:
+            self.cache.set(key, audio)
+        return audio
+
+    def _submit(self, text, in_flight):
+        """Future of (audio, cached) for text, reusing cache entries and identical in-flight sentences."""
+        key = self.cache.key(self.synthesizer.voice_id, text) if self.cache else text
+        if key in in_flight:
+            return in_flight[key]
+        audio = self.cache.get(key) if self.cache else None
+        if audio is not None:
+            future = Future()
+            future.set_result((audio, True))
+        else:
+            future = self.executor.submit(lambda: (self._synthesize(key, text), False))
+        in_flight[key] = future
+        return future
+
+    def _produce(self, tokens, pending, stop):
+        """Cut sentences from tokens and queue (index, text, future) for each, then None (or the error)."""
+        in_flight = {}
+        try:
+            for index, text in enumerate(iter_sentences(tokens, self.max_chars)):
+                item = (index, text, self._submit(text, in_flight))
+                self.sentences += 1
+                while not stop.is_set():
+                    try:
+                        pending.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    item[2].cancel()
+                    return
+            pending.put(None)
+        except Exception as e:
+            pending.put(e)
+
+    def speak(self, tokens):
+        """Yield audio chunks for a token stream, in order, each as soon as it and its predecessors are ready.
+
+        Chunks are dicts with index, text, audio (WAV bytes) and cached. Errors from the token
+        stream are re-raised here after the sentences before them have been spoken.
+        """
+        start = time.perf_counter()
+        self.time_to_first_audio = None
+        pending, stop = queue.Queue(maxsize=self.max_pending), threading.Event()
+        producer = threading.Thread(target=self._produce, args=(tokens, pending, stop), name="tts-tokens",
+                                    daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                index, text, future = item
+                audio, cached = future.result()
+                if self.time_to_first_audio is None:
+                    self.time_to_first_audio = time.perf_counter() - start
+                    self.timer.record("time_to_first_audio", self.time_to_first_audio)
+                yield {"index": index, "text": text, "audio": audio, "cached": cached}
+        finally:
+            stop.set()
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple):
+                    item[2].cancel()
+
+    def stats(self):
+        """Sentences spoken, cache hit rate and the last time to first audio in milliseconds."""
+        stats = {"sentences": self.sentences, "time_to_first_audio_ms":
+                 self.time_to_first_audio * 1000 if self.time_to_first_audio is not None else None}
+        if self.cache is not None:
+            stats.update(self.cache.stats())
+        return stats
+
+    def close(self):
+        """Stop the synthesis workers."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    from src.pipelines.retrieval_pipeline import RetrievalPipeline
+
+    parser = argparse.ArgumentParser(description="Answer a query and speak the answer as it streams.")
+    parser.add_argument("query")
+    parser.add_argument("--out", default="spoken_answer", help="Directory for the sentence WAV files")
+    args = parser.parse_args()
+
+    pipeline = RetrievalPipeline()
+    tts = StreamingTTS()
+    retrieved_docs, _ = pipeline.retrieve(args.query)
+    os.makedirs(args.out, exist_ok=True)
+    for chunk in tts.speak(pipeline.stream_response(args.query, retrieved_docs)):
+        with open(os.path.join(args.out, f"{chunk['index']:03d}.wav"), 'wb') as f:
+            f.write(chunk["audio"])
+        print(f"{chunk['index']:3d} {'(cached) ' if chunk['cached'] else ''}{chunk['text']}")
+    print(tts.stats())
+    tts.close()
@@ -0,0 +1,27 @@
+from src.utils.audio_processing import write_wav
+import numpy as np
+import io
+import time
+
+class StubSynthesizer:
+    """Offline stand-in for a TTS voice, for benchmarks: a quiet tone as long as the text would take to say.
+
+    seconds_per_char adds simulated synthesis cost.
+    """
+
+    voice_id = "stub-tone"
+
+    def __init__(self, seconds_per_char=0.0, chars_per_second=15.0, sample_rate=16000):
+        """Initialize with simulated synthesis cost, speaking rate and output sample rate."""
+        self.seconds_per_char = seconds_per_char
+        self.chars_per_second = chars_per_second
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text):
+        """Return WAV bytes for text."""
+        if self.seconds_per_char:
+            time.sleep(len(text) * self.seconds_per_char)
+        t = np.arange(int(len(text) / self.chars_per_second * self.sample_rate)) / self.sample_rate
+        buffer = io.BytesIO()
+        write_wav(buffer, 0.1 * np.sin(2 * np.pi * 220 * t), self.sample_rate)
+        return buffer.getvalue()
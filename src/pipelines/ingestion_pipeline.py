@@ -1,4 +1,8 @@
 from src.data_ingestion.text_cleaner import TextCleaner
+from src.data_ingestion.manifest import IngestionManifest
+from src.retrieval.bm25_index import BM25Index
+from src.retrieval.vector_db.chromadb_handler import sync_embeddings_to_chromadb
+from src.utils.profiling import StageTimer
 from notebooks.experiments.embedding_generation import EmbeddingGenerator
 import logging
 import os
@@ -6,12 +10,27 @@ import os
 class IngestionPipeline:
     """Orchestrates data ingestion: cleaning raw data and generating embeddings."""
     
-    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-        """Initialize with base data path and set up logging."""
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 vector_backend="chroma", faiss_index_type="hnsw", partitioned=False, embedding_socket=None,
+                 embedding_backend=None, embedder=None, timer=None):
+        """Initialize with base data path and set up logging; a "faiss" backend also rebuilds the FAISS index.
+
+        partitioned writes each data type to its own Chroma collection. embedding_socket points at a warm
+        embedding daemon (defaults to LEGAL_EMBEDDING_SOCKET); otherwise the model loads on first use.
+        embedding_backend selects torch, onnx or onnx-int8 inference (defaults to LEGAL_EMBEDDING_BACKEND).
+        embedder replaces the embedding model; timer (a StageTimer) collects a span per stage.
+        """
         self.base_path = base_path
+        self.partitioned = partitioned
+        self.vector_backend = vector_backend
+        self.faiss_index_type = faiss_index_type
         self.logger = self._setup_logging()
         self.text_cleaner = TextCleaner(base_path)
-        self.embedding_generator = EmbeddingGenerator(base_path)
+        self.embedding_generator = EmbeddingGenerator(
+            base_path, embedding_socket=embedding_socket, embedding_backend=embedding_backend, embedder=embedder
+        )
+        self.timer = timer or StageTimer()
+        self.manifest_path = os.path.join(base_path, r"processed\metadata\ingestion_manifest.json")
 
     def _setup_logging(self):
         """Configure logging for pipeline execution."""
@@ -26,21 +45,50 @@ class IngestionPipeline:
         return logging.getLogger(__name__)
 
     def run(self):
-        """Execute the full ingestion pipeline."""
+        """Execute the ingestion pipeline, reprocessing only new, changed or removed files."""
         self.logger.info("Starting ingestion pipeline...")
+        manifest = IngestionManifest(self.manifest_path)
         
         try:
-            # Step 1: Clean raw data
+            # Step 1: Clean new or changed raw data
             self.logger.info("Cleaning raw data...")
-            self.text_cleaner.clean_all_data()
+            with self.timer.span("clean"):
+                self.text_cleaner.clean_all_data(manifest)
             self.logger.info("Data cleaning completed.")
             
-            # Step 2: Generate embeddings
+            # Step 2: Generate embeddings for new or changed cleaned text
             self.logger.info("Generating embeddings...")
-            self.embedding_generator.process_and_store_embeddings()
+            with self.timer.span("embed"):
+                changes = self.embedding_generator.process_and_store_embeddings(manifest)
             self.logger.info("Embedding generation completed.")
             
+            # Step 3: Upsert changed vectors and delete removed ones
+            self.logger.info(f"Syncing vector store for {len(changes)} changed data types...")
+            with self.timer.span("vector_sync"):
+                sync_embeddings_to_chromadb(changes, self.base_path, self.partitioned)
+            self.logger.info("Vector store sync completed.")
+            
+            if self.vector_backend == "faiss" and changes:
+                from src.retrieval.vector_db.faiss_index_manager import FaissIndexManager
+                self.logger.info("Rebuilding FAISS index...")
+                with self.timer.span("faiss_build"):
+                    FaissIndexManager(self.base_path, index_type=self.faiss_index_type).build()
+            
+            if changes:
+                self.logger.info("Rebuilding BM25 index...")
+                with self.timer.span("bm25_build"):
+                    BM25Index(os.path.join(self.base_path, r"vector_db\bm25")).build_from_store(
+                        self.embedding_generator.store
+                    )
+            
+            # Only persist the manifest once every stage has succeeded
+            manifest.save()
+            self.logger.info(f"Stage timings: {self.timer.format()}")
             self.logger.info("Ingestion pipeline completed successfully.")
         except Exception as e:
             self.logger.error(f"Pipeline failed: {str(e)}")
             raise
+
+    def stage_stats(self):
+        """Return per-stage span counts and durations (clean, embed, vector_sync, faiss_build, bm25_build)."""
+        return self.timer.summary()
@@ -1,25 +1,95 @@
-from sentence_transformers import SentenceTransformer
-import chromadb
-from groq import Groq
 from dotenv import load_dotenv
+from src.models.embeddings.sentence_transformers.model_registry import embedding_model, embedding_space
+from src.retrieval.batching import MicroBatcher
+from src.retrieval.bm25_index import BM25Index
+from src.retrieval.cache import QueryCache, embedding_key, normalize_query
+from src.retrieval.context_builder import ContextBuilder
+from src.retrieval.ranker import CrossEncoderReranker, HybridRanker
+from src.retrieval.vector_db.chromadb_handler import (
+    PartitionedCollection, collection_space, generation_path, get_client
+)
+from src.retrieval.vector_db.embedding_store import check_embedding_space
+from src.utils.profiling import StageTimer
+import asyncio
+import json
 import logging
 import os
+import weakref
 
 class RetrievalPipeline:
     """Handles query embedding, document retrieval, and LLM response generation."""
     
-    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-        """Initialize with base path, embedding model, ChromaDB, and Groq client."""
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                 use_cache=True, semantic_threshold=None, llm_client=None, async_llm_client=None,
+                 max_concurrent_llm=16, max_batch_size=32, max_wait_ms=5, vector_backend="chroma",
+                 faiss_index_type="hnsw", hybrid=False, reranker=None,
+                 context_tokens=1500, partitioned=False, embedding_socket=None,
+                 embedding_backend=None, embedder=None, timer=None):
+        """Initialize with base path, embedding model, ChromaDB, LLM clients and optional query cache.
+
+        semantic_threshold enables semantic answer-cache hits above that cosine similarity.
+        llm_client/async_llm_client replace the Groq clients (e.g. with a StubLLM for offline load
+        tests). max_batch_size and max_wait_ms control micro-batching of concurrent async queries.
+        vector_backend selects "chroma" (default) or a prebuilt "faiss" index of faiss_index_type;
+        partitioned reads the per-data-type Chroma collections written by a partitioned ingestion.
+        hybrid fuses dense results with the BM25 index built at ingestion (reciprocal rank fusion).
+        reranker (a CrossEncoderReranker) over-fetches candidates and keeps the best n_results for the prompt.
+        context_tokens caps the prompt context, packed by a ContextBuilder; None joins every chunk.
+        Models load on first use; embedding_socket (or LEGAL_EMBEDDING_SOCKET) points at a warm embedding daemon.
+        embedding_backend (torch, onnx or onnx-int8; default LEGAL_EMBEDDING_BACKEND) must match the index's.
+        embedder replaces the embedding model (e.g. a StubEmbedder for offline benchmarks); its
+        embedding_space attribute must match the index. timer (a StageTimer) collects per-stage spans.
+        """
         load_dotenv()  # Load .env file
         self.base_path = base_path
         self.logger = self._setup_logging()
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.client = chromadb.PersistentClient(path=os.path.join(base_path, r"vector_db"))
-        self.collection = self.client.get_or_create_collection("legal_docs")
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        if not groq_api_key:
-            raise ValueError("GROQ_API_KEY not found in .env file.")
-        self.groq = Groq(api_key=groq_api_key)
+        self.timer = timer or StageTimer()
+        if embedder is None:
+            self.model = embedding_model('all-MiniLM-L6-v2', socket_path=embedding_socket, backend=embedding_backend)
+            self.embedding_space = embedding_space('all-MiniLM-L6-v2', embedding_backend)
+        else:
+            self.model = embedder
+            self.embedding_space = getattr(embedder, "embedding_space", None)
+        if vector_backend == "faiss":
+            # Optional dependency, only needed when the FAISS backend is selected
+            from src.retrieval.vector_db.faiss_index_manager import FaissIndexManager
+            self.collection = FaissIndexManager(base_path, index_type=faiss_index_type).load()
+        else:
+            self.client = get_client(base_path)
+            if partitioned:
+                self.collection = PartitionedCollection(self.client)
+            else:
+                self.collection = self.client.get_or_create_collection("legal_docs")
+        index_space = self.collection.embedding_space if vector_backend == "faiss" else collection_space(self.collection)
+        check_embedding_space(index_space, self.embedding_space, f"The {vector_backend} index")
+        self.context_builder = ContextBuilder(context_tokens) if context_tokens else None
+        token_counter = self.context_builder.count_tokens if self.context_builder else None
+        self.reranker = CrossEncoderReranker(token_counter=token_counter) if reranker is True else reranker or None
+        self.hybrid_ranker = None
+        if hybrid:
+            self.hybrid_ranker = HybridRanker(
+                self.collection, BM25Index(os.path.join(base_path, r"vector_db\bm25")).load()
+            )
+        self.groq, self.async_groq = llm_client, async_llm_client
+        if llm_client is None:
+            groq_api_key = os.getenv("GROQ_API_KEY")
+            if not groq_api_key:
+                raise ValueError("GROQ_API_KEY not found in .env file.")
+            from groq import AsyncGroq, Groq  # Deferred: not needed with an injected client
+            self.groq = Groq(api_key=groq_api_key)
+            self.async_groq = async_llm_client or AsyncGroq(api_key=groq_api_key)
+        self.max_concurrent_llm = max_concurrent_llm
+        self._llm_semaphores = weakref.WeakKeyDictionary()  # Event loop -> its LLM concurrency semaphore
+        self.encode_batcher = MicroBatcher(self._encode_batch, max_batch_size, max_wait_ms)
+        self.query_batcher = MicroBatcher(self._query_batch, max_batch_size, max_wait_ms)
+        self.cache = None
+        if use_cache:
+            self.cache = QueryCache(
+                answer_path=os.path.join(base_path, r"cache\answers.sqlite"),
+                generation_path=generation_path(base_path),
+                similarity_threshold=semantic_threshold,
+                config=self._answer_config(vector_backend, faiss_index_type, partitioned, context_tokens)
+            )
 
     def _setup_logging(self):
         """Configure logging for pipeline execution."""
@@ -33,29 +103,123 @@ class RetrievalPipeline:
         )
         return logging.getLogger(__name__)
 
-    def retrieve(self, query, n_results=10):
-        """Embed query and retrieve top documents from ChromaDB."""
+    def _answer_config(self, vector_backend, faiss_index_type, partitioned, context_tokens):
+        """Settings cached answers depend on; pipelines that differ in any of them never share answers."""
+        reranker = None
+        if self.reranker:
+            reranker = {"model": getattr(self.reranker, "model_name", type(self.reranker).__name__),
+                        "fetch_multiplier": self.reranker.fetch_multiplier, "max_tokens": self.reranker.max_tokens}
+        llm = {key: value for key, value in self._completion_kwargs("").items() if key not in ("messages", "stream")}
+        return {"embedding_space": self.embedding_space, "vector_backend": vector_backend,
+                "faiss_index_type": faiss_index_type if vector_backend == "faiss" else None,
+                "partitioned": partitioned, "hybrid": self.hybrid_ranker is not None, "reranker": reranker,
+                "context_tokens": context_tokens, "llm": llm}
+
+    def embed_query(self, query):
+        """Embed a query, reusing cached embeddings of previously seen normalized queries."""
+        if self.cache is None:
+            with self.timer.span("encode"):
+                return self.model.encode([query])[0]
+        key = normalize_query(query)
+        query_embedding = self.cache.embeddings.get(key)
+        if query_embedding is None:
+            with self.timer.span("encode"):
+                query_embedding = self.model.encode([key])[0]
+            self.cache.embeddings.set(key, query_embedding)
+        return query_embedding
+
+    def _search(self, query, query_embedding, n_results, where=None):
+        """Run dense (or hybrid dense + BM25) search, returning ids, metadatas and documents."""
+        with self.timer.span("vector_search"):
+            if self.hybrid_ranker is not None:
+                return self.hybrid_ranker.retrieve(query, query_embedding, n_results, where)
+            results = self.collection.query(query_embeddings=[query_embedding], n_results=n_results, where=where)
+        return results["ids"][0], results["metadatas"][0], results["documents"][0]
+
+    def _retrieval_key(self, query_embedding, n_results, where):
+        return embedding_key(query_embedding, n_results, self.hybrid_ranker is not None,
+                             json.dumps(where, sort_keys=True) if where else None)
+
+    def _query_collection(self, query, query_embedding, n_results, where=None):
+        """Query the vector store, serving repeated (embedding, n_results, where) lookups from cached ids."""
+        if self.cache is None:
+            _, metadatas, documents = self._search(query, query_embedding, n_results, where)
+            return metadatas, documents
+        self.cache.sync_generation()
+        key = self._retrieval_key(query_embedding, n_results, where)
+        ids = self.cache.retrievals.get(key)
+        if ids is None:
+            ids, metadatas, documents = self._search(query, query_embedding, n_results, where)
+            self.cache.retrievals.set(key, ids)
+            return metadatas, documents
+        return self._get_by_ids(ids)
+
+    def _get_by_ids(self, ids):
+        """Fetch metadatas and documents for ids, preserving their order."""
+        with self.timer.span("fetch_by_id"):
+            results = self.collection.get(ids=ids, include=["metadatas", "documents"])
+        rows = {id_: (meta, doc) for id_, meta, doc in zip(results["ids"], results["metadatas"], results["documents"])}
+        ordered = [rows[id_] for id_ in ids if id_ in rows]
+        return [meta for meta, _ in ordered], [doc for _, doc in ordered]
+
+    def _with_chunks(self, metadatas, documents):
+        """Restore each row's chunk text from the documents stored alongside the metadata."""
+        for meta, document in zip(metadatas, documents):
+            if document is not None:
+                meta.setdefault("chunk", document)
+        return metadatas, documents
+
+    def _fetch_count(self, n_results):
+        """Number of candidates to retrieve, over-fetching when a reranker is configured."""
+        return n_results * self.reranker.fetch_multiplier if self.reranker else n_results
+
+    def retrieve(self, query, n_results=10, query_embedding=None, where=None):
+        """Embed query and retrieve top documents from ChromaDB.
+
+        where is a ChromaDB-style metadata filter (e.g. {"data_type": "previous_year_docs"}) that is
+        pushed down into the vector search.
+        """
         try:
             self.logger.info(f"Processing query: {query}")
-            query_embedding = self.model.encode([query])[0]
-            results = self.collection.query(query_embeddings=[query_embedding], n_results=n_results)
-            self.logger.info(f"Retrieved {len(results['metadatas'][0])} documents")
-            return results["metadatas"][0], results["documents"][0]
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            metadatas, documents = self._with_chunks(
+                *self._query_collection(query, query_embedding, self._fetch_count(n_results), where)
+            )
+            if self.reranker:
+                with self.timer.span("rerank"):
+                    metadatas, documents = self.reranker.rerank(query, metadatas, documents, n_results)
+            self.logger.info(f"Retrieved {len(metadatas)} documents")
+            return metadatas, documents
         except Exception as e:
             self.logger.error(f"Retrieval failed: {str(e)}")
             raise
 
+    def _build_prompt(self, query, retrieved_docs):
+        """Build the LLM prompt from the query and retrieved documents."""
+        with self.timer.span("context"):
+            if self.context_builder is None:
+                context = "\n".join([doc["chunk"] for doc in retrieved_docs])
+            else:
+                context = self.context_builder.build(retrieved_docs)
+                self.logger.debug(f"Context stats: {self.context_builder.last_stats}")
+        return f"Context: {context}\n\nQuestion: {query}\nAnswer concisely:"
+
+    def _completion_kwargs(self, prompt, stream=False):
+        return {
+            "model": "llama3-70b-8192",  # Updated to supported model
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 1024,
+            "stream": stream
+        }
+
     def generate_response(self, query, retrieved_docs):
         """Generate LLM response using Groq with retrieved documents as context."""
         try:
-            context = "\n".join([doc["chunk"] for doc in retrieved_docs])
-            prompt = f"Context: {context}\n\nQuestion: {query}\nAnswer concisely:"
+            prompt = self._build_prompt(query, retrieved_docs)
             self.logger.info("Generating LLM response...")
-            response = self.groq.chat.completions.create(
-                model="llama3-70b-8192",  # Updated to supported model
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1024
-            )
+            with self.timer.span("llm"):
+                response = self.groq.chat.completions.create(**self._completion_kwargs(prompt))
             answer = response.choices[0].message.content.strip()
             self.logger.info("Response generated successfully")
             return answer
@@ -63,12 +227,179 @@ class RetrievalPipeline:
             self.logger.error(f"LLM response generation failed: {str(e)}")
             raise
 
-    def run(self, query, n_results=10):
+    def stream_response(self, query, retrieved_docs):
+        """Yield LLM response tokens as they are generated."""
+        prompt = self._build_prompt(query, retrieved_docs)
+        self.logger.info("Streaming LLM response...")
+        for chunk in self.groq.chat.completions.create(**self._completion_kwargs(prompt, stream=True)):
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+    def run(self, query, n_results=10, where=None):
         """Execute full retrieval pipeline: retrieve documents and generate response."""
         self.logger.info("Starting retrieval pipeline...")
-        retrieved_docs, documents = self.retrieve(query, n_results)
+        with self.timer.span("run"):
+            return self._run(query, n_results, where)
+
+    def _run(self, query, n_results, where):
+        if self.cache is None or where:
+            # Scoped queries skip the answer tier, which is keyed by query text only
+            retrieved_docs, documents = self.retrieve(query, n_results, where=where)
+            response = self.generate_response(query, retrieved_docs)
+            return {"query": query, "documents": documents, "response": response}
+
+        generation = self.cache.sync_generation()
+        query_embedding = self.embed_query(query)
+        cached = self.cache.answers.get(query, query_embedding, n_results, generation)
+        if cached is not None:
+            self.logger.info("Answer served from cache")
+            return dict(cached, query=query)
+        retrieved_docs, documents = self.retrieve(query, n_results, query_embedding)
         response = self.generate_response(query, retrieved_docs)
-        return {"query": query, "documents": documents, "response": response}
+        result = {"query": query, "documents": documents, "response": response}
+        self.cache.answers.set(query, query_embedding, n_results, generation, result)
+        self.logger.debug(f"Cache stats: {self.cache.stats()}")
+        return result
+
+    def cache_stats(self):
+        """Return per-tier cache hit rates, or None when caching is disabled."""
+        return self.cache.stats() if self.cache else None
+
+    def rerank_stats(self):
+        """Return reranker counters, or None when reranking is disabled."""
+        return self.reranker.stats() if self.reranker else None
+
+    def stage_stats(self):
+        """Return per-stage span counts and latency percentiles (encode, vector_search, rerank, context, llm, run)."""
+        return self.timer.summary()
+
+    def _encode_batch(self, queries):
+        """Encode a micro-batch of queries in one model call."""
+        with self.timer.span("encode"):
+            return list(self.model.encode(queries, batch_size=len(queries)))
+
+    def _query_batch(self, requests):
+        """Run one multi-embedding query per distinct filter for a micro-batch of (embedding, n_results, where)."""
+        groups = {}
+        for i, (_, _, where) in enumerate(requests):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        outputs = [None] * len(requests)
+        for indices in groups.values():
+            n_results = max(requests[i][1] for i in indices)
+            with self.timer.span("vector_search"):
+                results = self.collection.query(query_embeddings=[requests[i][0] for i in indices],
+                                                n_results=n_results, where=requests[indices[0]][2])
+            for row, i in enumerate(indices):
+                n = requests[i][1]
+                outputs[i] = (results["ids"][row][:n], results["metadatas"][row][:n], results["documents"][row][:n])
+        return outputs
+
+    async def aembed_query(self, query):
+        """Embed a query, micro-batching concurrent requests into shared encode calls."""
+        key = normalize_query(query)
+        if self.cache is not None:
+            query_embedding = self.cache.embeddings.get(key)
+            if query_embedding is not None:
+                return query_embedding
+        query_embedding = await self.encode_batcher.submit(key)
+        if self.cache is not None:
+            self.cache.embeddings.set(key, query_embedding)
+        return query_embedding
+
+    async def aretrieve(self, query, n_results=10, query_embedding=None, where=None):
+        """Async retrieve: concurrent queries share batched encode and ChromaDB query calls."""
+        try:
+            if query_embedding is None:
+                query_embedding = await self.aembed_query(query)
+            metadatas, documents = self._with_chunks(
+                *await self._aquery_collection(query, query_embedding, self._fetch_count(n_results), where)
+            )
+            if self.reranker:
+                with self.timer.span("rerank"):
+                    metadatas, documents = await asyncio.to_thread(
+                        self.reranker.rerank, query, metadatas, documents, n_results
+                    )
+            return metadatas, documents
+        except Exception as e:
+            self.logger.error(f"Async retrieval failed: {str(e)}")
+            raise
+
+    async def _aquery_collection(self, query, query_embedding, n_results, where=None):
+        """Async counterpart of _query_collection that micro-batches dense queries."""
+        key = None
+        if self.cache is not None:
+            self.cache.sync_generation()
+            key = self._retrieval_key(query_embedding, n_results, where)
+            ids = self.cache.retrievals.get(key)
+            if ids is not None:
+                return await asyncio.to_thread(self._get_by_ids, ids)
+        if self.hybrid_ranker is not None:
+            ids, metadatas, documents = await asyncio.to_thread(
+                self._search, query, query_embedding, n_results, where
+            )
+        else:
+            ids, metadatas, documents = await self.query_batcher.submit((query_embedding, n_results, where))
+        if key is not None:
+            self.cache.retrievals.set(key, ids)
+        return metadatas, documents
+
+    @property
+    def llm_semaphore(self):
+        """The LLM concurrency semaphore of the running event loop; asyncio primitives bind to one loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._llm_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._llm_semaphores[loop] = asyncio.Semaphore(self.max_concurrent_llm)
+        return semaphore
+
+    async def agenerate_response(self, query, retrieved_docs):
+        """Generate an LLM response asynchronously, bounded by the LLM concurrency semaphore."""
+        async with self.llm_semaphore:
+            if self.async_groq is None:
+                return await asyncio.to_thread(self.generate_response, query, retrieved_docs)
+            prompt = self._build_prompt(query, retrieved_docs)
+            with self.timer.span("llm"):
+                response = await self.async_groq.chat.completions.create(**self._completion_kwargs(prompt))
+            return response.choices[0].message.content.strip()
+
+    async def astream_response(self, query, retrieved_docs):
+        """Yield LLM response tokens asynchronously as they are generated."""
+        async with self.llm_semaphore:
+            if self.async_groq is None:
+                tokens = self.stream_response(query, retrieved_docs)
+                while (token := await asyncio.to_thread(next, tokens, None)) is not None:
+                    yield token
+                return
+            prompt = self._build_prompt(query, retrieved_docs)
+            stream = await self.async_groq.chat.completions.create(**self._completion_kwargs(prompt, stream=True))
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+
+    async def arun(self, query, n_results=10, where=None):
+        """Async full pipeline; many concurrent calls can share one process."""
+        with self.timer.span("run"):
+            return await self._arun(query, n_results, where)
+
+    async def _arun(self, query, n_results, where):
+        if self.cache is None or where:
+            retrieved_docs, documents = await self.aretrieve(query, n_results, where=where)
+            response = await self.agenerate_response(query, retrieved_docs)
+            return {"query": query, "documents": documents, "response": response}
+
+        generation = self.cache.sync_generation()
+        query_embedding = await self.aembed_query(query)
+        # SQLite reads and the semantic matrix product stay off the event loop
+        cached = await asyncio.to_thread(self.cache.answers.get, query, query_embedding, n_results, generation)
+        if cached is not None:
+            return dict(cached, query=query)
+        retrieved_docs, documents = await self.aretrieve(query, n_results, query_embedding)
+        response = await self.agenerate_response(query, retrieved_docs)
+        result = {"query": query, "documents": documents, "response": response}
+        await asyncio.to_thread(self.cache.answers.set, query, query_embedding, n_results, generation, result)
+        return result
 
 if __name__ == "__main__":
     pipeline = RetrievalPipeline()
@@ -0,0 +1,149 @@
+from src.models.stt.whisper_model.streaming_whisper import StreamingWhisper
+from src.pipelines.retrieval_pipeline import RetrievalPipeline
+from src.retrieval.cache import normalize_query
+from src.utils.audio_processing import TARGET_SAMPLE_RATE, WavReader
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import time
+
+class VoiceQueryPipeline:
+    """Answers spoken questions, overlapping speech recognition with retrieval.
+
+    Each stable partial transcript from StreamingWhisper is retrieved speculatively on a background
+    thread while the speaker is still talking. When the final transcript matches a prefetched one
+    (after query normalization) its documents are reused, so mostly the LLM call remains after speech ends.
+    """
+
+    def __init__(self, retrieval_pipeline=None, transcriber=None, n_results=10, where=None,
+                 min_prefetch_words=3, prefetch_workers=1, tts=None):
+        """Initialize with a RetrievalPipeline and a StreamingWhisper (defaults to the standard ones).
+
+        Partials shorter than min_prefetch_words are not prefetched; where is passed to every retrieval.
+        tts (a StreamingTTS) speaks answers as they stream.
+        """
+        self.pipeline = retrieval_pipeline or RetrievalPipeline()
+        self.transcriber = transcriber or StreamingWhisper()
+        self.tts = tts
+        self.n_results = n_results
+        self.where = where
+        self.min_prefetch_words = min_prefetch_words
+        self.executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="voice-prefetch")
+        self._prefetched = {}  # Normalized partial transcript -> future of (metadatas, documents)
+        self.stats = {"prefetches": 0, "hits": 0, "misses": 0}
+
+    def _retrieve(self, query):
+        return self.pipeline.retrieve(query, self.n_results, where=self.where)
+
+    def _prefetch(self, text):
+        """Start retrieving a stable partial transcript in the background."""
+        key = normalize_query(text)
+        if len(key.split()) >= self.min_prefetch_words and key not in self._prefetched:
+            self._prefetched[key] = self.executor.submit(self._retrieve, text)
+            self.stats["prefetches"] += 1
+
+    def _documents(self, query):
+        """Documents for the final transcript, from a matching prefetch when there is one."""
+        future = self._prefetched.pop(normalize_query(query), None)
+        for stale in self._prefetched.values():
+            stale.cancel()
+        self._prefetched.clear()
+        if future is not None:
+            try:
+                result = future.result()  # Usually done already; otherwise only the remainder is waited for
+                self.stats["hits"] += 1
+                return result, True
+            except Exception as e:
+                self.pipeline.logger.warning(f"Prefetched retrieval failed, retrying: {str(e)}")
+        self.stats["misses"] += 1
+        return self._retrieve(query), False
+
+    def _answer(self, event, stream):
+        """Yield the retrieval and answer events for a final transcript."""
+        received = time.perf_counter()
+        query = event["text"]
+        with self.pipeline.timer.span("retrieval_wait"):
+            (retrieved_docs, documents), prefetched = self._documents(query)
+        yield {"type": "retrieved", "query": query, "documents": documents, "prefetched": prefetched,
+               "utterance": event["utterance"]}
+
+        def since_speech():
+            # Latencies are from the end of speech: the final decode plus everything after it
+            return event["decode_ms"] / 1000 + time.perf_counter() - received
+
+        first_audio = None
+        if self.tts is not None:
+            tokens = []
+            for chunk in self.tts.speak(self._collect(self.pipeline.stream_response(query, retrieved_docs), tokens)):
+                if first_audio is None:
+                    first_audio = since_speech()
+                    self.pipeline.timer.record("speech_to_first_audio", first_audio)
+                yield dict(chunk, type="audio", utterance=event["utterance"])
+            response = "".join(tokens).strip()
+        elif stream:
+            tokens = []
+            for token in self.pipeline.stream_response(query, retrieved_docs):
+                tokens.append(token)
+                yield {"type": "token", "text": token, "utterance": event["utterance"]}
+            response = "".join(tokens).strip()
+        else:
+            response = self.pipeline.generate_response(query, retrieved_docs)
+        latency = since_speech()
+        self.pipeline.timer.record("speech_to_answer", latency)
+        answer = {"type": "answer", "query": query, "documents": documents, "response": response,
+                  "utterance": event["utterance"], "speech_to_answer_ms": latency * 1000}
+        if first_audio is not None:
+            answer["speech_to_first_audio_ms"] = first_audio * 1000
+        yield answer
+
+    def _collect(self, tokens, collected):
+        """Pass tokens through, keeping a copy for the full response."""
+        for token in tokens:
+            collected.append(token)
+            yield token
+
+    def ask(self, blocks, sample_rate=TARGET_SAMPLE_RATE, stream=False):
+        """Yield events for an audio stream of mono float32 blocks.
+
+        Transcript events ("partial", "final") come from the transcriber; each final transcript is
+        followed by "retrieved" and "answer" events, with "token" events in between when stream is True,
+        or in-order "audio" chunks (see StreamingTTS.speak) when the pipeline has a tts.
+        """
+        for event in self.transcriber.transcribe_stream(blocks, sample_rate):
+            yield event
+            if event["type"] == "partial":
+                self._prefetch(event["text"])
+            elif event["type"] == "final":
+                self.pipeline.timer.record("stt_final", event["decode_ms"] / 1000)
+                yield from self._answer(event, stream)
+
+    def ask_file(self, path, block_ms=100, stream=False):
+        """Yield events for a WAV file streamed in block_ms blocks."""
+        with WavReader(path, block_ms) as reader:
+            yield from self.ask(reader, reader.sample_rate, stream)
+
+    def prefetch_stats(self):
+        """Prefetch counters and the share of final transcripts served from a prefetch."""
+        answered = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, hit_ratio=self.stats["hits"] / answered if answered else 0.0)
+
+    def close(self):
+        """Stop the prefetch (and speech synthesis) workers."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.tts is not None:
+            self.tts.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask a spoken question from a WAV file.")
+    parser.add_argument("wav")
+    args = parser.parse_args()
+
+    voice = VoiceQueryPipeline()
+    for event in voice.ask_file(args.wav, stream=True):
+        if event["type"] == "token":
+            print(event["text"], end="", flush=True)
+        elif event["type"] in ("partial", "final"):
+            print(f"[{event['type']}] {event['text']}")
+        elif event["type"] == "answer":
+            print(f"\n({event['speech_to_answer_ms']:.0f} ms from end of speech)")
+    print(voice.prefetch_stats())
+    voice.close()
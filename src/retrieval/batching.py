@@ -0,0 +1,56 @@
+import asyncio
+
+class MicroBatcher:
+    """Collects concurrent async requests into batches for a blocking batch function run off the event loop."""
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=5, executor=None):
+        """Initialize with a function mapping a list of items to a list of results, and batching limits."""
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._queue = []
+        self._timer = None
+        self._tasks = set()  # asyncio only weakly references tasks, so pending flushes are held here
+
+    async def submit(self, item):
+        """Queue an item and wait for its result from the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+        if len(self._queue) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, loop)
+        return await future
+
+    def _flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+            task = loop.create_task(self._run(loop, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """Return the number of batches run and their mean size."""
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0}
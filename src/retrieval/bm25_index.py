@@ -0,0 +1,124 @@
+import numpy as np
+from src.retrieval.filters import FieldIndex
+from collections import Counter
+import json
+import os
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lowercase text and split it into alphanumeric terms (numbers kept for section references)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """Persistent BM25 inverted index over chunk text, stored as compact numpy postings arrays.
+
+    Each term's postings are a contiguous slice of doc_ids/impacts. Impacts are the full BM25
+    term weights, precomputed from IDF and document length at build time, so scoring a query
+    is a sum of slices.
+    """
+
+    _ARRAYS = ("offsets", "doc_ids", "impacts", "doc_lengths", "idf")
+
+    def __init__(self, index_dir, k1=1.2, b=0.75):
+        """Initialize with the index directory and BM25 parameters."""
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.ids = []
+        self.offsets = self.doc_ids = self.impacts = self.doc_lengths = self.idf = None
+        self.fields = FieldIndex()
+
+    def build(self, rows):
+        """Build the index from metadata rows carrying "id" and "chunk", then save it."""
+        vocab, postings, ids, doc_lengths = {}, [], [], []
+        self.fields = FieldIndex()
+        for row in rows:
+            self.fields.add(row)
+            counts = Counter(tokenize(row["chunk"]))
+            doc = len(ids)
+            ids.append(row["id"])
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc, tf))
+
+        n_docs = len(ids)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = float(self.doc_lengths.mean()) if n_docs else 0.0
+        df = np.asarray([len(p) for p in postings], dtype=np.float32)
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(p) for p in postings])
+        self.doc_ids = np.empty(self.offsets[-1], dtype=np.int32)
+        tfs = np.empty(self.offsets[-1], dtype=np.float32)
+        for term_id, term_postings in enumerate(postings):
+            start = self.offsets[term_id]
+            self.doc_ids[start:start + len(term_postings)] = [doc for doc, _ in term_postings]
+            tfs[start:start + len(term_postings)] = [tf for _, tf in term_postings]
+        norms = self.k1 * (1 - self.b + self.b * self.doc_lengths[self.doc_ids] / max(avg_length, 1e-9))
+        term_of_posting = np.repeat(np.arange(len(postings)), np.diff(self.offsets))
+        self.impacts = (self.idf[term_of_posting] * tfs * (self.k1 + 1) / (tfs + norms)).astype(np.float32)
+        self.vocab, self.ids = vocab, ids
+        self.fields.finalize()
+        self.save()
+        return self
+
+    def build_from_store(self, store):
+        """Build the index from every shard sidecar of an EmbeddingStore."""
+        data_types = sorted(name for name in os.listdir(store.root)
+                            if os.path.isdir(os.path.join(store.root, name))) if os.path.isdir(store.root) else []
+        rows = (dict(row, data_type=data_type) for data_type in data_types for source in store.sources(data_type)
+                for row in store.iter_metadata(data_type, source))
+        return self.build(rows)
+
+    def save(self):
+        """Write postings arrays, vocabulary and ids to the index directory.
+
+        Files are staged under temporary names and swapped in with os.replace, vocab.json last, so
+        readers that memory-mapped the previous arrays keep a consistent view.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        paths = [os.path.join(self.index_dir, f"{name}.npy") for name in self._ARRAYS]
+        for name, path in zip(self._ARRAYS, paths):
+            with open(f"{path}.tmp", 'wb') as f:
+                np.save(f, getattr(self, name))
+        vocab_path = os.path.join(self.index_dir, "vocab.json")
+        with open(f"{vocab_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"k1": self.k1, "b": self.b, "vocab": self.vocab, "ids": self.ids}, f)
+        self.fields.save(self.index_dir)
+        for path in paths + [vocab_path]:
+            os.replace(f"{path}.tmp", path)
+
+    def load(self):
+        """Load the index, memory-mapping the postings arrays."""
+        for name in self._ARRAYS:
+            setattr(self, name, np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode="r"))
+        with open(os.path.join(self.index_dir, "vocab.json"), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.k1, self.b, self.vocab, self.ids = data["k1"], data["b"], data["vocab"], data["ids"]
+        self.fields = FieldIndex().load(self.index_dir)
+        return self
+
+    def search(self, query, k=10, where=None):
+        """Return up to k (id, score) pairs ranked by BM25 score, restricted to rows matching where."""
+        term_ids = {self.vocab[term] for term in tokenize(query) if term in self.vocab}
+        if not term_ids:
+            return []
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.impacts[s] for s in slices])
+        scores = np.bincount(docs, weights=weights, minlength=len(self.ids))
+        mask = self.fields.mask(where)
+        if mask is not None:
+            scores[~mask] = 0
+        k = min(k, np.count_nonzero(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[doc], float(scores[doc])) for doc in top]
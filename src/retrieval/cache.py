@@ -0,0 +1,228 @@
+import numpy as np
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def normalize_query(query):
+    """Normalize a query for cache lookups: lowercase with collapsed whitespace."""
+    return " ".join(query.lower().split())
+
+def config_fingerprint(config):
+    """Short stable digest of a JSON-serializable settings dict, used to keep caches of different setups apart."""
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def embedding_key(embedding, *extra):
+    """Build a hashable cache key from an embedding's bytes and extra fields."""
+    digest = hashlib.sha1(np.ascontiguousarray(embedding, dtype=np.float32).tobytes()).hexdigest()
+    return (digest,) + extra
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with an optional per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """Initialize with maximum entries and TTL in seconds (None keeps entries until evicted)."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return a cached value and mark it recently used, or default on miss or expiry."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (self.ttl is None or time.monotonic() - item[1] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Return hit/miss counts, hit rate and current size."""
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data)}
+
+class AnswerCache:
+    """Persistent SQLite cache of generated answers, with optional semantic (cosine) matching."""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=10000, similarity_threshold=None, namespace=""):
+        """Initialize with database path, TTL in seconds, size bound and optional cosine threshold.
+
+        namespace (e.g. a config_fingerprint of the pipeline settings) prefixes every key, so pipelines
+        sharing the database only see answers produced under their own settings.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix = None  # (keys, normalized embeddings, created) for semantic lookups, rebuilt after writes
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, n_results INTEGER, embedding BLOB, "
+            "answer TEXT, generation TEXT, created REAL, accessed REAL)"
+        )
+        self._db.commit()
+
+    def _key(self, query, n_results):
+        return f"{self.namespace}:{n_results}:{normalize_query(query)}"
+
+    def get(self, query, embedding, n_results, generation):
+        """Return a cached answer for an identical (or, if enabled, semantically similar) query."""
+        now = time.time()
+        with self._lock:
+            key = self._key(query, n_results)
+            row = self._db.execute(
+                "SELECT answer FROM answers WHERE key = ? AND generation = ? AND created > ?",
+                (key, generation, now - self.ttl)
+            ).fetchone()
+            if row is None and self.similarity_threshold is not None:
+                key = self._nearest(embedding, n_results, generation, now)
+                if key is not None:
+                    row = self._db.execute(
+                        "SELECT answer FROM answers WHERE key = ? AND generation = ? AND created > ?",
+                        (key, generation, now - self.ttl)
+                    ).fetchone()
+                    self.semantic_hits += row is not None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE answers SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def _nearest(self, embedding, n_results, generation, now):
+        if self._matrix is None:
+            prefix = f"{self.namespace}:"
+            rows = self._db.execute(
+                "SELECT key, embedding, created FROM answers "
+                "WHERE n_results = ? AND generation = ? AND created > ? AND substr(key, 1, ?) = ?",
+                (n_results, generation, now - self.ttl, len(prefix), prefix)
+            ).fetchall()
+            if not rows:
+                return None
+            matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            created = np.array([row[2] for row in rows])
+            self._matrix = ([key for key, _, _ in rows], matrix, created, n_results, generation)
+        keys, matrix, created, cached_n, cached_generation = self._matrix
+        if cached_n != n_results or cached_generation != generation:
+            self._matrix = None
+            return self._nearest(embedding, n_results, generation, now)
+        live = created > now - self.ttl
+        if not live.all():
+            # Entries expire between writes, so drop them from the matrix rather than serve them
+            keys, matrix, created = [key for key, alive in zip(keys, live) if alive], matrix[live], created[live]
+            self._matrix = (keys, matrix, created, cached_n, cached_generation) if keys else None
+            if not keys:
+                return None
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = matrix @ (query / (np.linalg.norm(query) + 1e-12))
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
+
+    def set(self, query, embedding, n_results, generation, answer):
+        """Store an answer and evict the least recently accessed entries beyond max_entries."""
+        now = time.time()
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._key(query, n_results), n_results, blob, json.dumps(answer), generation, now, now)
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE created <= ? OR key IN (SELECT key FROM answers "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries)
+            )
+            self._db.commit()
+            self._matrix = None
+
+    def invalidate(self, generation):
+        """Delete answers produced against any other collection generation."""
+        with self._lock:
+            self._db.execute("DELETE FROM answers WHERE generation != ?", (generation,))
+            self._db.commit()
+            self._matrix = None
+
+    def stats(self):
+        """Return hit/miss counts, semantic hits, hit rate and current size."""
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        total = self.hits + self.misses
+        return {"hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0, "size": size}
+
+class QueryCache:
+    """Layered retrieval cache: query embeddings, retrieved ids and persistent answers.
+
+    Tiers 2 and 3 are tied to the vector collection's generation marker and are dropped
+    whenever the collection is rewritten.
+    """
+
+    def __init__(self, answer_path, generation_path, embedding_cache_size=4096, retrieval_cache_size=4096,
+                 ttl=3600, answer_ttl=7 * 24 * 3600, max_answers=10000, similarity_threshold=None, config=None):
+        """Initialize the three tiers and the path of the collection's generation marker.
+
+        config describes the settings answers depend on (ranking, context, LLM); answers are only shared
+        between caches with the same config.
+        """
+        self.embeddings = LRUCache(embedding_cache_size)  # Tier 1: normalized query -> embedding
+        self.retrievals = LRUCache(retrieval_cache_size, ttl)  # Tier 2: (embedding, n_results) -> ids
+        self.answers = AnswerCache(answer_path, answer_ttl, max_answers, similarity_threshold,
+                                   config_fingerprint(config or {}))  # Tier 3
+        self.generation_path = generation_path
+        self.generation = None
+        self._generation_mtime = None
+        self.sync_generation()
+
+    def sync_generation(self):
+        """Re-read the collection generation marker and invalidate dependent tiers if it changed."""
+        try:
+            mtime = os.stat(self.generation_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._generation_mtime and self.generation is not None:
+            return self.generation
+        self._generation_mtime = mtime
+        generation = ""
+        if mtime is not None:
+            with open(self.generation_path, 'r', encoding='utf-8') as f:
+                generation = f.read().strip()
+        if generation != self.generation:
+            self.generation = generation
+            self.retrievals.clear()
+            self.answers.invalidate(generation)
+        return self.generation
+
+    def stats(self):
+        """Return per-tier hit statistics."""
+        return {"embeddings": self.embeddings.stats(), "retrievals": self.retrievals.stats(),
+                "answers": self.answers.stats()}
@@ -0,0 +1,120 @@
+from src.utils.text_processing import hamming_distance, simhash
+import logging
+import os
+import threading
+
+TOKENIZER_ENV = "LEGAL_TOKENIZER"
+# Ungated copy of the Llama 3 tokenizer (shared by the Llama 3 8B and 70B models served by Groq)
+DEFAULT_TOKENIZER = "NousResearch/Meta-Llama-3-8B"
+
+class ContextBuilder:
+    """Packs retrieved chunks into an LLM context: drops near-duplicates, merges neighbours, enforces a token budget."""
+
+    def __init__(self, max_tokens=1500, tokenizer_name=None, max_hamming=6, separator="\n\n", tokenizer=None):
+        """Initialize with the context token budget, tokenizer and near-duplicate SimHash distance.
+
+        tokenizer_name is a Hugging Face repo or local directory, defaulting to LEGAL_TOKENIZER or an
+        ungated copy of the Llama 3 tokenizer used by the served model. If it cannot be loaded, an error
+        is logged and token counts fall back to a whitespace estimate.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_tokens = max_tokens
+        self.max_hamming = max_hamming
+        self.separator = separator
+        # Loaded on first use
+        self.tokenizer_name = (tokenizer_name or os.getenv(TOKENIZER_ENV) or DEFAULT_TOKENIZER) if tokenizer is None else None
+        self._tokenizer = tokenizer
+        self._tokenizer_lock = threading.Lock()
+        self.last_stats = {}
+
+    @property
+    def tokenizer(self):
+        """The tokenizer, loaded on first use so constructing a builder stays cheap."""
+        if self.tokenizer_name:
+            with self._tokenizer_lock:
+                if self.tokenizer_name:
+                    try:
+                        # Deferred: importing transformers alone takes seconds
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                    except Exception as e:
+                        self.logger.error(f"Tokenizer {self.tokenizer_name} unavailable, the context budget is only "
+                                          f"estimated from whitespace words: {str(e)}")
+                    self.tokenizer_name = None
+        return self._tokenizer
+
+    def encode(self, texts):
+        """Return token ids (or whitespace words without a tokenizer) for each text."""
+        if self.tokenizer is None:
+            return [text.split() for text in texts]
+        return self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+
+    def count_tokens(self, text):
+        """Count tokens in a single text."""
+        return len(self.encode([text])[0])
+
+    def _truncate(self, text, tokens, limit):
+        if self.tokenizer is None:
+            return " ".join(tokens[:limit])
+        return self.tokenizer.decode(tokens[:limit])
+
+    def deduplicate(self, docs):
+        """Drop chunks whose SimHash is within max_hamming bits of a higher-ranked chunk."""
+        kept, fingerprints = [], []
+        for doc in docs:
+            fingerprint = doc.get("simhash") or simhash(doc["chunk"])
+            if any(hamming_distance(fingerprint, other) <= self.max_hamming for other in fingerprints):
+                continue
+            kept.append(doc)
+            fingerprints.append(fingerprint)
+        return kept
+
+    def merge_adjacent(self, docs):
+        """Merge consecutive chunks of the same source, trimming their overlap; passages keep their best rank."""
+        groups = {}
+        for rank, doc in enumerate(docs):
+            key = (doc.get("data_type"), doc.get("source"))
+            groups.setdefault(key, []).append((rank, doc))
+
+        passages = []
+        for members in groups.values():
+            members.sort(key=lambda item: item[1].get("chunk_index", 0))
+            current = None
+            for rank, doc in members:
+                index = doc.get("chunk_index")
+                if current and index is not None and index == current["last_index"] + 1:
+                    start = doc.get("start", current["end"])
+                    overlap = current["end"] - start
+                    if overlap <= 0:
+                        current["text"] += " " + doc["chunk"]
+                    elif overlap < len(doc["chunk"]):
+                        current["text"] += doc["chunk"][overlap:]
+                    # else: the chunk lies entirely within the passage already
+                    current["end"] = max(current["end"], start + len(doc["chunk"]))
+                    current["rank"] = min(current["rank"], rank)
+                    current["last_index"] = index
+                    continue
+                current = {"text": doc["chunk"], "rank": rank, "last_index": index if index is not None else -2,
+                           "end": doc.get("start", 0) + len(doc["chunk"])}
+                passages.append(current)
+        passages.sort(key=lambda passage: passage["rank"])
+        return [passage["text"] for passage in passages]
+
+    def build(self, retrieved_docs):
+        """Return the packed context string for ranked retrieved metadata rows."""
+        docs = self.deduplicate(retrieved_docs)
+        passages = self.merge_adjacent(docs)
+        packed, used = [], 0
+        separator_tokens = self.count_tokens(self.separator) if self.separator.strip() else 0
+        for passage, tokens in zip(passages, self.encode(passages)):
+            cost = len(tokens) + (separator_tokens if packed else 0)
+            if used + cost <= self.max_tokens:
+                packed.append(passage)
+                used += cost
+            elif not packed:
+                # Always keep a truncated top passage rather than an empty context
+                packed.append(self._truncate(passage, tokens, self.max_tokens))
+                used = self.max_tokens
+        self.last_stats = {"retrieved": len(retrieved_docs), "after_dedup": len(docs),
+                           "passages": len(passages), "packed": len(packed), "tokens": used}
+        return self.separator.join(packed)
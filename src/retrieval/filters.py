@@ -0,0 +1,150 @@
+import numpy as np
+import json
+import operator
+import os
+
+FILTER_FIELDS = ("data_type", "source", "act", "page")
+
+def _compare(op):
+    def test(candidate, value):
+        try:
+            return candidate is not None and op(candidate, value)
+        except TypeError:
+            return False  # e.g. a range over a field holding strings
+    return test
+
+# ChromaDB's field operators, as predicates over one stored value; rows without the field never match a range
+OPERATORS = {"$eq": operator.eq, "$ne": operator.ne, "$in": lambda candidate, values: candidate in values,
+             "$nin": lambda candidate, values: candidate not in values, "$gt": _compare(operator.gt),
+             "$gte": _compare(operator.ge), "$lt": _compare(operator.lt), "$lte": _compare(operator.le)}
+
+def parse_where(where):
+    """Flatten a conjunctive ChromaDB-style where filter into {field: allowed values}.
+
+    Supports field equality, $eq, $in and $and; raises ValueError for filters that cannot be
+    flattened ($or, $ne, $nin, ranges), which FieldIndex.mask evaluates instead.
+    """
+    conditions = {}
+    if not where:
+        return conditions
+    clauses = where["$and"] if "$and" in where else [{field: condition} for field, condition in where.items()]
+    for clause in clauses:
+        for field, values in (parse_where(clause) if "$and" in clause else _parse_clause(clause)).items():
+            conditions[field] = conditions[field] & values if field in conditions else values
+    return conditions
+
+def _parse_clause(clause):
+    (field, condition), = clause.items()
+    if field.startswith("$"):
+        raise ValueError(f"Unsupported filter operator: {field}")
+    if not isinstance(condition, dict):
+        return {field: {condition}}
+    (op, value), = condition.items()
+    if op == "$eq":
+        return {field: {value}}
+    if op == "$in":
+        return {field: set(value)}
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+def build_where(conditions):
+    """Inverse of parse_where: turn {field: allowed values} back into a ChromaDB where filter."""
+    clauses = [{field: {"$in": sorted(values)}} for field, values in sorted(conditions.items())]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+class FieldIndex:
+    """Per-row integer codes of the filterable metadata fields, for pushing where filters into FAISS and BM25."""
+
+    def __init__(self, fields=FILTER_FIELDS):
+        """Initialize an empty index over the given metadata fields."""
+        self.fields = fields
+        self.values = {field: [] for field in fields}
+        self.codes = {field: [] for field in fields}
+        self._lookup = {field: {} for field in fields}
+
+    def __len__(self):
+        return len(self.codes[self.fields[0]])
+
+    def add(self, meta):
+        """Append one row's field values."""
+        for field in self.fields:
+            value = meta.get(field)
+            lookup = self._lookup[field]
+            if value not in lookup:
+                lookup[value] = len(self.values[field])
+                self.values[field].append(value)
+            self.codes[field].append(lookup[value])
+
+    def finalize(self):
+        """Convert the collected codes to compact numpy arrays."""
+        self.codes = {field: np.asarray(codes, dtype=np.int32) for field, codes in self.codes.items()}
+        return self
+
+    def save(self, directory):
+        """Write the codes and value tables to directory, replacing each file atomically."""
+        for field in self.fields:
+            path = os.path.join(directory, f"field_{field}.npy")
+            with open(f"{path}.tmp", 'wb') as f:
+                np.save(f, self.codes[field])
+            os.replace(f"{path}.tmp", path)
+        path = os.path.join(directory, "fields.json")
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.values, f)
+        os.replace(f"{path}.tmp", path)
+
+    def load(self, directory):
+        """Load codes and value tables written by save, if present."""
+        values_path = os.path.join(directory, "fields.json")
+        if not os.path.exists(values_path):
+            return self
+        with open(values_path, 'r', encoding='utf-8') as f:
+            self.values = json.load(f)
+        self.fields = tuple(self.values)
+        self.codes = {field: np.load(os.path.join(directory, f"field_{field}.npy")) for field in self.fields}
+        self._lookup = {field: {value: code for code, value in enumerate(values)}
+                        for field, values in self.values.items()}
+        return self
+
+    def mask(self, where):
+        """Boolean row mask for a ChromaDB-style where filter, or None when there is nothing to filter.
+
+        Supports $and, $or and the field operators $eq, $ne, $in, $nin, $gt, $gte, $lt and $lte.
+        Each operator is evaluated once per distinct field value, then mapped to rows by code.
+        """
+        if not where:
+            return None
+        return self._mask(where)
+
+    def _mask(self, where):
+        mask = np.ones(len(self), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                matched = np.zeros(len(self), dtype=bool)
+                for clause in condition:
+                    matched |= self._mask(clause)
+                mask &= matched
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported filter operator: {key}")
+            else:
+                mask &= self._field_mask(key, condition)
+        return mask
+
+    def _field_mask(self, field, condition):
+        if field not in self._lookup:
+            raise ValueError(f"Cannot filter on {field}; indexed fields are {list(self.fields)}")
+        mask = np.ones(len(self), dtype=bool)
+        for op, value in (condition.items() if isinstance(condition, dict) else [("$eq", condition)]):
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            lookup = self._lookup[field]
+            if op in ("$eq", "$in"):
+                codes = [lookup[v] for v in ([value] if op == "$eq" else value) if v in lookup]
+            else:
+                test = OPERATORS[op]
+                codes = [code for code, candidate in enumerate(self.values[field]) if test(candidate, value)]
+            mask &= np.isin(self.codes[field], codes)
+        return mask
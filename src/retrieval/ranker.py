@@ -0,0 +1,148 @@
+from src.models.embeddings.sentence_transformers.model_registry import cross_encoder_model
+from src.retrieval.cache import LRUCache, normalize_query
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import hashlib
+import threading
+import time
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None):
+    """Fuse ranked id lists with reciprocal rank fusion, returning ids ordered by fused score."""
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, id_ in enumerate(ranking):
+            scores[id_] = scores.get(id_, 0.0) + weight / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+class HybridRanker:
+    """Runs dense vector search and BM25 search in parallel and fuses them with reciprocal rank fusion."""
+
+    def __init__(self, collection, bm25_index, rrf_k=60, fetch_multiplier=2, weights=None, max_workers=8):
+        """Initialize with a ChromaDB-compatible collection, a loaded BM25Index and fusion settings."""
+        self.collection = collection
+        self.bm25_index = bm25_index
+        self.rrf_k = rrf_k
+        self.fetch_multiplier = fetch_multiplier  # Candidates fetched from each retriever per result
+        self.weights = weights  # Optional [dense, sparse] fusion weights
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def retrieve(self, query, query_embedding, n_results=10, where=None):
+        """Return fused (ids, metadatas, documents) for a query and its embedding, both searches filtered by where."""
+        fetch = n_results * self.fetch_multiplier
+        dense_future = self.executor.submit(self.collection.query, query_embeddings=[query_embedding],
+                                            n_results=fetch, where=where)
+        sparse_future = self.executor.submit(self.bm25_index.search, query, fetch, where)
+        dense = dense_future.result()
+        sparse_ids = [id_ for id_, _ in sparse_future.result()]
+
+        fused = reciprocal_rank_fusion([dense["ids"][0], sparse_ids], self.rrf_k, self.weights)[:n_results]
+        rows = {id_: (meta, doc) for id_, meta, doc in zip(dense["ids"][0], dense["metadatas"][0], dense["documents"][0])}
+        missing = [id_ for id_ in fused if id_ not in rows]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["metadatas", "documents"])
+            rows.update({id_: (meta, doc) for id_, meta, doc in
+                         zip(fetched["ids"], fetched["metadatas"], fetched["documents"])})
+        fused = [id_ for id_ in fused if id_ in rows]
+        return fused, [rows[id_][0] for id_ in fused], [rows[id_][1] for id_ in fused]
+
+class CrossEncoderReranker:
+    """Rescores over-fetched candidates with a cross-encoder and keeps the best chunks within a token budget.
+
+    Scores are cached per (normalized query, chunk digest). When scoring exceeds the latency budget the
+    candidates keep their dense order; a scoring call already running finishes in the background and fills
+    the cache, a queued one is cancelled. While every worker is busy, new requests skip scoring and keep
+    their dense order straight away, so sustained overload never builds a backlog of abandoned work.
+    """
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", fetch_multiplier=3, max_tokens=1500,
+                 latency_budget_ms=200, batch_size=32, cache_size=50000, token_counter=None, model=None, workers=2):
+        """Initialize with the cross-encoder, candidate over-fetch factor, prompt token budget and latency cap.
+
+        token_counter measures chunks against max_tokens; it defaults to the cross-encoder's tokenizer.
+        """
+        self.model_name = model_name
+        self.model = model or cross_encoder_model(model_name)  # Loaded on first rerank, shared per process
+        self.fetch_multiplier = fetch_multiplier  # Candidates retrieved per result kept
+        self.max_tokens = max_tokens
+        self.latency_budget = latency_budget_ms / 1000 if latency_budget_ms else None
+        self.batch_size = batch_size
+        self.token_counter = token_counter or self.count_tokens
+        self.scores = LRUCache(cache_size)
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = 0  # Scoring tasks submitted and not yet finished
+        self._pending_lock = threading.Lock()
+        self.reranked = 0
+        self.fallbacks = 0
+        self.skipped = 0
+        self.last_latency_ms = None
+
+    def count_tokens(self, text):
+        """Tokens in text under the cross-encoder's tokenizer (whitespace words if the model has none)."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return len(text.split())
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def score(self, query, chunks):
+        """Return cross-encoder scores for chunks, predicting only uncached pairs in one batch."""
+        query = normalize_query(query)
+        keys = [(query, hashlib.sha1(chunk.encode('utf-8')).hexdigest()) for chunk in chunks]
+        scores = [self.scores.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = self.model.predict([(query, chunks[i]) for i in missing], batch_size=self.batch_size)
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                self.scores.set(keys[i], scores[i])
+        return scores
+
+    def _task_done(self, future):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _submit(self, query, chunks):
+        """Future of the scores for chunks, or None when a latency budget is set and every worker is busy."""
+        with self._pending_lock:
+            if self.latency_budget is not None and self._pending >= self.workers:
+                return None
+            self._pending += 1
+        future = self.executor.submit(self.score, query, chunks)
+        future.add_done_callback(self._task_done)
+        return future
+
+    def rerank(self, query, metadatas, documents, top_k=5):
+        """Return the top_k (metadatas, documents) by cross-encoder score that fit under the token budget."""
+        start = time.perf_counter()
+        future = self._submit(query, [meta["chunk"] for meta in metadatas])
+        scores = None
+        if future is None:
+            self.skipped += 1
+        else:
+            try:
+                scores = future.result(timeout=self.latency_budget)
+            except TimeoutError:
+                future.cancel()  # Drops the task if it has not started; a running one still fills the cache
+        if scores is not None:
+            order = sorted(range(len(metadatas)), key=lambda i: scores[i], reverse=True)
+            self.reranked += 1
+        else:
+            order = list(range(len(metadatas)))  # Keep dense order
+            self.fallbacks += 1
+
+        kept, tokens = [], 0
+        for i in order:
+            if len(kept) == top_k:
+                break
+            chunk_tokens = self.token_counter(metadatas[i]["chunk"])
+            if kept and tokens + chunk_tokens > self.max_tokens:
+                continue
+            kept.append(i)
+            tokens += chunk_tokens
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        return [metadatas[i] for i in kept], [documents[i] for i in kept]
+
+    def stats(self):
+        """Return rerank/fallback counts (skipped: fallbacks without scoring) and score cache hit rate."""
+        return {"reranked": self.reranked, "fallbacks": self.fallbacks, "skipped": self.skipped,
+                "score_cache": self.scores.stats()}
@@ -1,39 +1,278 @@
-import chromadb
-import pickle
+from src.retrieval.filters import build_where, parse_where
+from src.retrieval.vector_db.embedding_store import LEGACY_EMBEDDING_SPACE, EmbeddingStore, check_embedding_space
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import json
 import os
+import time
+import uuid
 
-def load_embeddings_to_chromadb(base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
-    """Load embeddings from data/processed/embeddings/ into ChromaDB in batches."""
-    client = chromadb.PersistentClient(path=os.path.join(base_path, r"vector_db"))
-    collection = client.get_or_create_collection("legal_docs")
-    batch_size = 5000  # Set to a safe value below ChromaDB's limit (5461)
-
-    for data_type in ["legal_texts", "previous_year_docs", "youtube_transcripts"]:
-        file_path = os.path.join(base_path, r"processed\embeddings", f"{data_type}_embeddings.pkl")
-        if os.path.exists(file_path):
-            print(f"Processing {file_path}...")
-            with open(file_path, "rb") as f:
-                data = pickle.load(f)
-                embeddings = data["embeddings"]
-                metadata = data["metadata"]
-                ids = [f"{data_type}_{i}" for i in range(len(embeddings))]
-
-                # Process in batches
-                for i in range(0, len(embeddings), batch_size):
-                    batch_embeddings = embeddings[i:i + batch_size]
-                    batch_metadata = metadata[i:i + batch_size]
-                    batch_ids = ids[i:i + batch_size]
-                    try:
-                        collection.add(
-                            embeddings=batch_embeddings,
-                            metadatas=batch_metadata,
-                            ids=batch_ids
-                        )
-                        print(f"Added batch {i//batch_size + 1} for {data_type}")
-                    except Exception as e:
-                        print(f"Error adding batch for {data_type}: {str(e)}")
-        else:
-            print(f"No embeddings found for {data_type} at {file_path}")
+DATA_TYPES = ("legal_texts", "previous_year_docs", "youtube_transcripts")
+
+def partition_name(data_type):
+    """Name of the per-data-type collection used when the store is partitioned."""
+    return f"legal_docs_{data_type}"
+
+def get_collection(client, data_type=None, partitioned=False, embedding_space=None):
+    """Return the collection holding a data type's vectors: its own partition, or the shared legal_docs.
+
+    With embedding_space, the collection is tagged with it and refused if it already holds another space.
+    """
+    collection = client.get_or_create_collection(partition_name(data_type) if partitioned else "legal_docs")
+    if embedding_space is not None:
+        check_embedding_space(collection_space(collection), embedding_space, f"Collection {collection.name}")
+        if not (collection.metadata or {}).get("embedding_space"):
+            collection.modify(metadata=dict(collection.metadata or {}, embedding_space=embedding_space))
+    return collection
+
+def collection_space(collection):
+    """Embedding space recorded on a collection (or shared by a PartitionedCollection), None while empty."""
+    if isinstance(collection, PartitionedCollection):
+        spaces = {collection_space(partition) for partition in collection.partitions.values()} - {None}
+        if len(spaces) > 1:
+            raise ValueError(f"Partitions hold embeddings from different spaces: {sorted(spaces)}")
+        return spaces.pop() if spaces else None
+    space = (collection.metadata or {}).get("embedding_space")
+    if space is None and collection.count():
+        return LEGACY_EMBEDDING_SPACE  # Loaded before spaces were recorded
+    return space
+
+class PartitionedCollection:
+    """Collection-like view over the per-data-type partitions.
+
+    A data_type condition in a conjunctive where filter selects the partitions to search, so scoped
+    queries only scan their own partitions; the remaining conditions are pushed down to ChromaDB.
+    Other filters ($or, $ne, ranges) are passed to every partition as they are.
+    """
+
+    def __init__(self, client, data_types=DATA_TYPES):
+        """Open (or create) one collection per data type."""
+        self.partitions = {data_type: get_collection(client, data_type, True) for data_type in data_types}
+
+    def _route(self, where):
+        try:
+            conditions = parse_where(where)
+        except ValueError:
+            return list(self.partitions), where
+        data_types = conditions.pop("data_type", None)
+        targets = [data_type for data_type in self.partitions if data_types is None or data_type in data_types]
+        return targets, build_where(conditions)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None, **kwargs):
+        """Query the matching partitions and merge their hits by distance, returning the fields in include."""
+        targets, where = self._route(where)
+        include = list(include) if include is not None else ["metadatas", "documents", "distances"]
+        fields = [field for field in include if field != "distances"]
+        merged = [[] for _ in query_embeddings]
+        for data_type in targets:
+            partition = self.partitions[data_type]
+            # Distances are always fetched, since merging across partitions needs them
+            results = partition.query(query_embeddings=query_embeddings, n_results=n_results, where=where,
+                                      include=fields + ["distances"], **kwargs)
+            for q, hits in enumerate(merged):
+                hits.extend(zip(results["distances"][q], results["ids"][q],
+                                *(results[field][q] for field in fields)))
+        results = {"ids": []}
+        results.update({field: [] for field in include})
+        for hits in merged:
+            hits = sorted(hits, key=lambda hit: hit[0])[:n_results]
+            results["ids"].append([hit[1] for hit in hits])
+            for position, field in enumerate(fields, start=2):
+                results[field].append([hit[position] for hit in hits])
+            if "distances" in include:
+                results["distances"].append([hit[0] for hit in hits])
+        return results
+
+    def get(self, ids, include=None, **kwargs):
+        """Fetch rows by id from the partitions their data-type prefix names, returning the fields in include."""
+        include = list(include) if include is not None else ["metadatas", "documents"]
+        results = {"ids": []}
+        results.update({field: [] for field in include})
+        for data_type, partition in self.partitions.items():
+            partition_ids = [id_ for id_ in ids if id_.startswith(f"{data_type}_")]
+            if partition_ids:
+                found = partition.get(ids=partition_ids, include=include, **kwargs)
+                for key in results:
+                    results[key].extend(found[key])
+        return results
+
+    def count(self):
+        """Total number of vectors across partitions."""
+        return sum(partition.count() for partition in self.partitions.values())
+
+def generation_path(base_path):
+    """Path of the marker file that changes whenever the legal_docs collection is written."""
+    return os.path.join(base_path, r"vector_db", "legal_docs.generation")
+
+def bump_collection_generation(base_path):
+    """Record a new collection generation so caches built on the old contents are invalidated."""
+    path = generation_path(base_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(f"{path}.tmp", path)
+
+def max_batch_size(client, default=5000):
+    """Largest batch the client accepts, falling back to a safe default for clients without the API."""
+    try:
+        return client.get_max_batch_size()
+    except AttributeError:
+        return default
+
+def _split_rows(metadata, data_type):
+    """Separate stored row ids and chunk texts (sent as documents) from the metadata sent to ChromaDB."""
+    ids = [meta.pop("id") for meta in metadata]
+    documents = [meta.pop("chunk") for meta in metadata]
+    for meta in metadata:
+        meta.setdefault("data_type", data_type)  # Shards written before data_type was recorded
+    return ids, documents, metadata
+
+def upsert_with_retry(collection, embeddings, ids, documents, metadatas, max_retries=3, backoff=1.0):
+    """Upsert a batch, retrying with exponential backoff and splitting it in half if it keeps failing."""
+    for attempt in range(max_retries):
+        try:
+            collection.upsert(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+            return
+        except Exception as e:
+            error = e
+            if attempt + 1 < max_retries:
+                time.sleep(backoff * 2 ** attempt)
+    if len(ids) == 1:
+        raise error
+    print(f"Batch of {len(ids)} failed {max_retries} times ({str(error)}), retrying in halves")
+    mid = len(ids) // 2
+    upsert_with_retry(collection, embeddings[:mid], ids[:mid], documents[:mid], metadatas[:mid], max_retries, backoff)
+    upsert_with_retry(collection, embeddings[mid:], ids[mid:], documents[mid:], metadatas[mid:], max_retries, backoff)
+
+def _shard_signature(store, data_type, source):
+    stat = os.stat(store.shard_paths(data_type, source)[1])
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _purge_unknown_ids(collection, store, data_type, batch_size):
+    """Delete a data type's rows whose ids the store did not produce; returns how many were deleted.
+
+    This catches positional ids left by the pickle-based loader and rows of sources removed before
+    the checkpoint recorded them.
+    """
+    produced = {meta["id"] for source in store.sources(data_type) for meta in store.iter_metadata(data_type, source)}
+    stale = [id_ for id_ in collection.get(include=[])["ids"]
+             if id_.startswith(f"{data_type}_") and id_ not in produced]
+    for start in range(0, len(stale), batch_size):
+        collection.delete(ids=stale[start:start + batch_size])
+    return len(stale)
+
+def _save_checkpoint(path, loaded):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(loaded, f)
+    os.replace(f"{path}.tmp", path)
+
+def get_client(base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data"):
+    """Open the persistent ChromaDB client under data/vector_db/."""
+    import chromadb  # Deferred: chromadb is slow to import and not needed by the FAISS backend
+    return chromadb.PersistentClient(path=os.path.join(base_path, r"vector_db"))
+
+def load_embeddings_to_chromadb(base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                                workers=4, max_retries=3, resume=True, partitioned=False):
+    """Bulk upsert embedding shards from data/processed/embeddings/ into ChromaDB with parallel writers.
+
+    Batches are sized to the client's max batch size and failed batches are retried. Fully loaded
+    shards are checkpointed, so an interrupted load resumes with the remaining shards and unchanged
+    shards are skipped on later runs; resume=False reloads everything. A changed shard's old rows are
+    deleted before it is reloaded and removed shards' rows are deleted; on the first load into a
+    collection (or without a checkpoint), every row the store did not produce is purged. partitioned writes each data type to its own collection.
+    """
+    client = get_client(base_path)
+    store = EmbeddingStore(os.path.join(base_path, r"processed\embeddings"))
+    batch_size = max_batch_size(client)
+    space = store.embedding_space()
+    checkpoint_path = os.path.join(base_path, r"vector_db", "bulk_load_checkpoint.json")
+    loaded = {}
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for data_type in DATA_TYPES:
+                collection = get_collection(client, data_type, partitioned, space)
+                prefix = f"{collection.name}/{data_type}/"
+                stored = store.sources(data_type)
+                checkpointed = [key[len(prefix):] for key in loaded if key.startswith(prefix)]
+                sources = [source for source in stored
+                           if loaded.get(f"{prefix}{source}") != _shard_signature(store, data_type, source)]
+                if not loaded.get(prefix[:-1]):
+                    # First load into this collection (or resume=False): nothing records what it already holds
+                    purged = _purge_unknown_ids(collection, store, data_type, batch_size)
+                    if purged:
+                        print(f"Deleted {purged} {data_type} vectors the store no longer holds")
+                    loaded[prefix[:-1]] = True
+                    _save_checkpoint(checkpoint_path, loaded)
+                removed = [source for source in checkpointed if source not in stored]
+                # Old rows of changed shards go first, so chunks that were edited away are not left behind
+                for source in removed + sources:
+                    collection.delete(where={"$and": [{"source": source}, {"data_type": data_type}]})
+                    loaded.pop(f"{prefix}{source}", None)
+                if removed:
+                    print(f"Deleted vectors of {len(removed)} removed sources for {data_type}")
+                    _save_checkpoint(checkpoint_path, loaded)
+                if not sources:
+                    print(f"No new embeddings to load for {data_type} in {store.root}")
+                    continue
+                remaining = {source: len(store.open_embeddings(data_type, source)) for source in sources}
+                total = sum(remaining.values())
+                print(f"Loading {total} {data_type} vectors from {len(sources)} shards in batches of {batch_size}...")
+                in_flight = {}
+
+                def finish(done):
+                    for future in done:
+                        counts = in_flight.pop(future)
+                        future.result()  # Re-raise a batch that failed every retry; finished shards stay checkpointed
+                        for source, count in counts.items():
+                            remaining[source] -= count
+                            if remaining[source] == 0:
+                                loaded[f"{prefix}{source}"] = _shard_signature(store, data_type, source)
+                    _save_checkpoint(checkpoint_path, loaded)
+
+                for batch_embeddings, batch_metadata in store.iter_batches(data_type, batch_size, sources):
+                    counts = Counter(meta["source"] for meta in batch_metadata)
+                    batch_ids, batch_documents, batch_metadata = _split_rows(batch_metadata, data_type)
+                    future = executor.submit(upsert_with_retry, collection, batch_embeddings, batch_ids,
+                                             batch_documents, batch_metadata, max_retries)
+                    in_flight[future] = counts
+                    if len(in_flight) >= 2 * workers:
+                        finish(wait(in_flight, return_when=FIRST_COMPLETED)[0])
+                finish(wait(in_flight)[0])
+                print(f"Loaded {total} vectors for {data_type}")
+    finally:
+        bump_collection_generation(base_path)
+
+def sync_embeddings_to_chromadb(changes, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data",
+                                partitioned=False):
+    """Upsert vectors of updated sources and delete vectors of removed sources in ChromaDB."""
+    client = get_client(base_path)
+    store = EmbeddingStore(os.path.join(base_path, r"processed\embeddings"))
+    batch_size = max_batch_size(client)
+    space = store.embedding_space()
+
+    for data_type, change in changes.items():
+        collection = get_collection(client, data_type, partitioned, space)
+        updated, removed = sorted(change["updated"]), change["removed"]
+        for source in updated + removed:
+            collection.delete(where={"$and": [{"source": source}, {"data_type": data_type}]})
+        if removed:
+            print(f"Deleted vectors of {len(removed)} removed sources for {data_type}")
+
+        stored = set(store.sources(data_type))
+        sources = [source for source in updated if source in stored]
+        total = 0
+        for batch_embeddings, batch_metadata in store.iter_batches(data_type, batch_size, sources):
+            batch_ids, batch_documents, batch_metadata = _split_rows(batch_metadata, data_type)
+            upsert_with_retry(collection, batch_embeddings, batch_ids, batch_documents, batch_metadata)
+            total += len(batch_ids)
+        if updated:
+            print(f"Upserted {total} vectors from {len(updated)} sources for {data_type}")
+    if changes:
+        bump_collection_generation(base_path)
 
 if __name__ == "__main__":
-    load_embeddings_to_chromadb()
+    load_embeddings_to_chromadb()
\ No newline at end of file
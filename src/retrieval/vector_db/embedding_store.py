@@ -0,0 +1,118 @@
+import numpy as np
+import hashlib
+import json
+import os
+
+# Stores written before embedding spaces were recorded hold fp32 PyTorch MiniLM vectors
+LEGACY_EMBEDDING_SPACE = "all-MiniLM-L6-v2@torch"
+
+def check_embedding_space(found, expected, where):
+    """Raise if vectors in one space would be mixed with (or searched by) vectors from another."""
+    if found is not None and expected is not None and found != expected:
+        raise ValueError(f"{where} holds {found} embeddings, not {expected}; re-embed (or rebuild) it "
+                         f"before switching the embedding model or backend")
+
+def chunk_id(data_type, source, text, occurrence=0):
+    """Build a content-derived id: the same chunk text in the same source always maps to the same id.
+
+    occurrence numbers repeated identical chunks within one source so their ids stay distinct.
+    """
+    digest = hashlib.sha1(f"{data_type}\0{source}\0{text}".encode('utf-8')).hexdigest()[:24]
+    return f"{data_type}_{digest}" if occurrence == 0 else f"{data_type}_{digest}_{occurrence}"
+
+class EmbeddingStore:
+    """On-disk embedding shards: one contiguous .npy matrix plus a JSONL metadata sidecar per source file."""
+
+    def __init__(self, root, dtype="float32"):
+        """Initialize with the store root directory and on-disk vector dtype (float32 or float16)."""
+        self.root = root
+        self.dtype = np.dtype(dtype)
+
+    def embedding_space(self):
+        """Embedding space of the stored vectors, or None while the store is empty."""
+        path = os.path.join(self.root, "embedding_space.json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)["embedding_space"]
+        has_shards = any(name.endswith(".npy") for _, _, files in os.walk(self.root) for name in files)
+        return LEGACY_EMBEDDING_SPACE if has_shards else None
+
+    def claim_space(self, space):
+        """Record the store's embedding space, refusing to add vectors from a different one."""
+        check_embedding_space(self.embedding_space(), space, f"Embedding store {self.root}")
+        path = os.path.join(self.root, "embedding_space.json")
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"embedding_space": space}, f)
+
+    def shard_paths(self, data_type, source):
+        """Return the (.npy, .jsonl) paths of a source's shard."""
+        base = os.path.join(self.root, data_type, source)
+        return f"{base}.npy", f"{base}.jsonl"
+
+    def sources(self, data_type):
+        """List sources that have a stored shard for a data type."""
+        shard_dir = os.path.join(self.root, data_type)
+        if not os.path.isdir(shard_dir):
+            return []
+        return sorted(name[:-4] for name in os.listdir(shard_dir) if name.endswith(".npy"))
+
+    def write_shard(self, data_type, source, embeddings, metadata):
+        """Write a source's embeddings and metadata rows, replacing any previous shard.
+
+        Each file is replaced atomically, the .npy first and the JSONL last: the shard signature the
+        ChromaDB checkpoint compares is taken from the JSONL, so an interrupted write is reloaded.
+        """
+        if not metadata:
+            self.remove_shard(data_type, source)
+            return
+        npy_path, jsonl_path = self.shard_paths(data_type, source)
+        os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+        matrix = np.asarray(embeddings, dtype=self.dtype)
+        with open(f"{npy_path}.tmp", 'wb') as f:
+            np.save(f, matrix)
+        with open(f"{jsonl_path}.tmp", 'w', encoding='utf-8') as f:
+            seen = {}
+            for meta in metadata:
+                occurrence = seen[meta["chunk"]] = seen.get(meta["chunk"], -1) + 1
+                row = {"id": chunk_id(data_type, source, meta["chunk"], occurrence)}
+                row.update(meta)
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(f"{npy_path}.tmp", npy_path)
+        os.replace(f"{jsonl_path}.tmp", jsonl_path)
+
+    def remove_shard(self, data_type, source):
+        """Delete a source's shard if it exists."""
+        for path in self.shard_paths(data_type, source):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def open_embeddings(self, data_type, source):
+        """Memory-map a source's embedding matrix read-only."""
+        return np.load(self.shard_paths(data_type, source)[0], mmap_mode="r")
+
+    def iter_metadata(self, data_type, source):
+        """Yield a source's metadata rows one line at a time."""
+        with open(self.shard_paths(data_type, source)[1], 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def iter_batches(self, data_type, batch_size, sources=None):
+        """Stream (float32 embeddings, metadata rows) batches across shards without loading whole shards."""
+        vectors, metadata, pending = [], [], 0
+        for source in (self.sources(data_type) if sources is None else sources):
+            matrix = self.open_embeddings(data_type, source)
+            rows = self.iter_metadata(data_type, source)
+            start = 0
+            while start < len(matrix):
+                end = min(start + batch_size - pending, len(matrix))
+                vectors.append(matrix[start:end])
+                metadata.extend(next(rows) for _ in range(end - start))
+                pending += end - start
+                start = end
+                if pending == batch_size:
+                    yield np.concatenate(vectors).astype(np.float32, copy=False), metadata
+                    vectors, metadata, pending = [], [], 0
+        if pending:
+            yield np.concatenate(vectors).astype(np.float32, copy=False), metadata
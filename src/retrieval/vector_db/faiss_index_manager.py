@@ -0,0 +1,216 @@
+import faiss
+import numpy as np
+from src.retrieval.filters import FieldIndex
+from src.retrieval.vector_db.chromadb_handler import bump_collection_generation
+from src.retrieval.vector_db.embedding_store import LEGACY_EMBEDDING_SPACE, EmbeddingStore
+import json
+import os
+
+class FaissIndexManager:
+    """Builds, persists and searches a FAISS index over the stored embedding shards.
+
+    query() and get() return ChromaDB-shaped results, so the manager can stand in for the
+    legal_docs collection in RetrievalPipeline. Distances are squared L2, as in ChromaDB. where
+    filters are pushed into the search as an IDSelector over the matching rows.
+    """
+
+    def __init__(self, base_path=r"C:\Users\bhati\OneDrive\Desktop\my_legal_ai_project\data", index_type="hnsw",
+                 pq_m=None, nlist=1024, hnsw_m=32, ef_search=64, nprobe=16, train_size=100000, index_dir=None):
+        """Initialize with index type (flat, ivf or hnsw), optional PQ sub-quantizers and search parameters.
+
+        index_dir writes the index elsewhere (e.g. for experiments); only a build at the default location
+        under base_path invalidates the retrieval pipeline's caches.
+        """
+        self.base_path = base_path
+        self.default_index_dir = os.path.join(base_path, r"vector_db\faiss")
+        self.index_dir = index_dir or self.default_index_dir
+        self.store = EmbeddingStore(os.path.join(base_path, r"processed\embeddings"))
+        self.index_type = index_type
+        self.pq_m = pq_m  # Sub-quantizers for product quantization; None stores full vectors
+        self.nlist = nlist
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.index = None
+        self._offsets = None
+        self._rows_by_id = None
+        self.fields = FieldIndex()
+        self.embedding_space = None
+
+    def factory_string(self, count):
+        """Return the FAISS index_factory description for the configured index type."""
+        codec = f"PQ{self.pq_m}" if self.pq_m else "Flat"
+        if self.index_type == "flat":
+            return codec
+        if self.index_type == "ivf":
+            # Keep enough training points per list on small corpora
+            nlist = max(1, min(self.nlist, count // 39))
+            return f"IVF{nlist},{codec}"
+        if self.index_type == "hnsw":
+            return f"HNSW{self.hnsw_m}_PQ{self.pq_m}" if self.pq_m else f"HNSW{self.hnsw_m}"
+        raise ValueError(f"Unknown FAISS index type: {self.index_type}")
+
+    def _data_types(self):
+        return [name for name in sorted(os.listdir(self.store.root))
+                if os.path.isdir(os.path.join(self.store.root, name))] if os.path.isdir(self.store.root) else []
+
+    def _iter_batches(self, batch_size=10000):
+        for data_type in self._data_types():
+            for vectors, metadata in self.store.iter_batches(data_type, batch_size):
+                yield vectors, [dict(meta, data_type=data_type) for meta in metadata]
+
+    def _training_sample(self, count):
+        stride = max(1, count // self.train_size)
+        return np.concatenate([vectors[::stride] for vectors, _ in self._iter_batches()])[:self.train_size]
+
+    def build(self):
+        """Build the index from every embedding shard and write it with its metadata to disk."""
+        count = sum(len(self.store.open_embeddings(data_type, source))
+                    for data_type in self._data_types() for source in self.store.sources(data_type))
+        if count == 0:
+            raise ValueError(f"No embeddings found in {self.store.root}")
+        sample = self._training_sample(count)
+        index = faiss.index_factory(sample.shape[1], self.factory_string(count), faiss.METRIC_L2)
+        if not index.is_trained:
+            print(f"Training {self.factory_string(count)} on {len(sample)} vectors...")
+            index.train(sample)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        metadata_path = os.path.join(self.index_dir, "metadata.jsonl")
+        offsets = np.empty(count + 1, dtype=np.int64)
+        row = 0
+        fields = FieldIndex()
+        with open(f"{metadata_path}.tmp", 'wb') as f:
+            offsets[0] = 0
+            for vectors, metadata in self._iter_batches():
+                index.add(vectors)
+                for meta in metadata:
+                    fields.add(meta)
+                    f.write((json.dumps(meta, ensure_ascii=False) + "\n").encode('utf-8'))
+                    row += 1
+                    offsets[row] = f.tell()
+        # Every file is staged and swapped in with os.replace; index.faiss goes last, so a crash or a
+        # concurrent load never sees a new index paired with old metadata
+        index_path = os.path.join(self.index_dir, "index.faiss")
+        offsets_path = os.path.join(self.index_dir, "offsets.npy")
+        space_path = os.path.join(self.index_dir, "embedding_space.json")
+        faiss.write_index(index, f"{index_path}.tmp")
+        with open(f"{offsets_path}.tmp", 'wb') as f:
+            np.save(f, offsets)
+        with open(f"{space_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"embedding_space": self.store.embedding_space()}, f)
+        fields.finalize().save(self.index_dir)
+        os.replace(f"{offsets_path}.tmp", offsets_path)
+        os.replace(f"{space_path}.tmp", space_path)
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+        os.replace(f"{index_path}.tmp", index_path)
+        if os.path.abspath(self.index_dir) == os.path.abspath(self.default_index_dir):
+            bump_collection_generation(self.base_path)
+        print(f"Built {self.factory_string(count)} FAISS index with {count} vectors in {self.index_dir}")
+        return self.load()
+
+    def load(self):
+        """Load the persisted index, memory-mapping it when the index type supports it."""
+        index_path = os.path.join(self.index_dir, "index.faiss")
+        try:
+            self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            self.index = faiss.read_index(index_path)
+        params = faiss.ParameterSpace()
+        for name, value in (("nprobe", self.nprobe), ("efSearch", self.ef_search)):
+            try:
+                params.set_index_parameter(self.index, name, value)
+            except RuntimeError:
+                pass  # Parameter does not apply to this index type
+        self._offsets = np.load(os.path.join(self.index_dir, "offsets.npy"), mmap_mode="r")
+        self._rows_by_id = None
+        self.fields = FieldIndex().load(self.index_dir)
+        self.embedding_space = LEGACY_EMBEDDING_SPACE  # Indexes built before spaces were recorded
+        space_path = os.path.join(self.index_dir, "embedding_space.json")
+        if os.path.exists(space_path):
+            with open(space_path, 'r', encoding='utf-8') as f:
+                self.embedding_space = json.load(f)["embedding_space"]
+        return self
+
+    def _read_rows(self, rows):
+        """Read metadata rows by position using the byte offsets table."""
+        metadata = []
+        with open(os.path.join(self.index_dir, "metadata.jsonl"), 'rb') as f:
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                metadata.append(json.loads(f.read(int(self._offsets[row + 1] - self._offsets[row]))))
+        return metadata
+
+    def _search_params(self, mask):
+        """Search parameters restricting the search to the rows set in mask."""
+        rows = np.flatnonzero(mask)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            selector = faiss.IDSelectorRange(int(rows[0]), int(rows[-1]) + 1)  # e.g. one data type's rows
+        else:
+            selector = faiss.IDSelectorBatch(rows.astype(np.int64))
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        if self.index_type == "ivf":
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        return faiss.SearchParameters(sel=selector)
+
+    def _post_filtered_search(self, queries, k, mask):
+        """Filter by over-fetching, for index types (flat PQ) that do not accept an IDSelector."""
+        fetch = k
+        while True:
+            fetch = min(self.index.ntotal, fetch * 8)
+            distances, rows = self.index.search(queries, fetch)
+            keep = [[i for i, row in enumerate(query_rows) if row >= 0 and mask[row]][:k] for query_rows in rows]
+            if fetch == self.index.ntotal or all(len(kept) == k for kept in keep):
+                break
+        out_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        out_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for q, kept in enumerate(keep):
+            out_distances[q, :len(kept)] = distances[q, kept]
+            out_rows[q, :len(kept)] = rows[q, kept]
+        return out_distances, out_rows
+
+    def search(self, query_embeddings, k=10, where=None):
+        """Batched nearest-neighbour search returning (distances, row positions) arrays."""
+        queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        mask = self.fields.mask(where)
+        if mask is None:
+            return self.index.search(queries, k)
+        if self.index_type == "flat" and self.pq_m:
+            return self._post_filtered_search(queries, k, mask)
+        return self.index.search(queries, k, params=self._search_params(mask))
+
+    def _result_row(self, meta):
+        meta = dict(meta)
+        return meta.pop("id"), meta, meta.get("chunk")
+
+    def query(self, query_embeddings, n_results=10, include=None, where=None, **kwargs):
+        """ChromaDB-compatible batched query."""
+        distances, rows = self.search(query_embeddings, n_results, where)
+        results = {"ids": [], "metadatas": [], "documents": [], "distances": []}
+        for query_distances, query_rows in zip(distances, rows):
+            valid = [i for i, row in enumerate(query_rows) if row >= 0]
+            found = [self._result_row(meta) for meta in self._read_rows([int(query_rows[i]) for i in valid])]
+            results["ids"].append([id_ for id_, _, _ in found])
+            results["metadatas"].append([meta for _, meta, _ in found])
+            results["documents"].append([doc for _, _, doc in found])
+            results["distances"].append([float(query_distances[i]) for i in valid])
+        return results
+
+    def get(self, ids, include=None, **kwargs):
+        """ChromaDB-compatible lookup of metadata and documents by id."""
+        if self._rows_by_id is None:
+            with open(os.path.join(self.index_dir, "metadata.jsonl"), 'r', encoding='utf-8') as f:
+                self._rows_by_id = {json.loads(line)["id"]: row for row, line in enumerate(f)}
+        rows = [self._rows_by_id[id_] for id_ in ids if id_ in self._rows_by_id]
+        found = [self._result_row(meta) for meta in self._read_rows(rows)]
+        return {"ids": [id_ for id_, _, _ in found], "metadatas": [meta for _, meta, _ in found],
+                "documents": [doc for _, _, doc in found]}
+
+    def count(self):
+        """Return the number of indexed vectors."""
+        return self.index.ntotal
+
+if __name__ == "__main__":
+    FaissIndexManager().build()
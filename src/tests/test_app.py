@@ -0,0 +1,182 @@
+from src.models.embeddings.sentence_transformers import model_registry
+from src.models.embeddings.sentence_transformers.embedding_server import EmbeddingClient, EmbeddingServer
+from src.models.embeddings.sentence_transformers.stub_embedder import StubEmbedder
+from src.models.tts.tts_model.streaming_tts import StreamingTTS, iter_sentences
+from src.models.tts.tts_model.stub_tts import StubSynthesizer
+from src.utils.audio_processing import EnergyVAD, StreamingResampler, VADSegmenter
+from src.utils.profiling import StageTimer, percentile
+import numpy as np
+import threading
+import time
+import pytest
+
+def tone(seconds, sample_rate, frequency=220.0, amplitude=0.3):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def noise(seconds, sample_rate=16000, amplitude=0.002, seed=0):
+    return (amplitude * np.random.default_rng(seed).standard_normal(int(seconds * sample_rate))).astype(np.float32)
+
+def blocks(samples, size):
+    return [samples[i:i + size] for i in range(0, len(samples), size)]
+
+@pytest.mark.parametrize("source_rate, block", [(44100, 441), (48000, 1000), (8000, 160), (22050, 777)])
+def test_resampler_is_seamless_across_blocks(source_rate, block):
+    signal = tone(1.0, source_rate, frequency=440.0)
+    whole = StreamingResampler(source_rate).process(signal).copy()
+    resampler = StreamingResampler(source_rate)
+    streamed = np.concatenate([resampler.process(part).copy() for part in blocks(signal, block)])
+    assert len(whole) == len(streamed) == pytest.approx(16000, abs=2)
+    np.testing.assert_allclose(streamed, whole, atol=1e-5)
+
+def test_resampler_filters_aliasing_frequencies():
+    # 10 kHz is above the 8 kHz Nyquist limit at 16 kHz and would alias to 6 kHz without the low-pass
+    kept = StreamingResampler(48000).process(tone(1.0, 48000, frequency=1000.0))
+    removed = StreamingResampler(48000).process(tone(1.0, 48000, frequency=10000.0))
+    assert np.std(kept[200:]) > 0.2
+    assert np.std(removed[200:]) < 0.01
+    assert StreamingResampler(16000).process(tone(0.1, 16000)) is not None
+
+def segment(samples, block=1600, **kwargs):
+    segmenter = VADSegmenter(**kwargs)
+    events = []
+    for part in blocks(samples, block):
+        events.extend(kind for kind, _ in segmenter.process(part))
+    return events + [kind for kind, _ in segmenter.flush()]
+
+def test_vad_detects_speech_at_the_start_of_the_stream():
+    events = segment(np.concatenate([tone(1.0, 16000), noise(1.0)]))
+    assert events.count("start") == events.count("end") == 1
+    assert events[0] == "start"
+
+def test_vad_segments_utterances_between_pauses():
+    speech = [noise(0.5), tone(0.6, 16000), noise(1.0, seed=1), tone(0.6, 16000), noise(1.0, seed=2)]
+    events = segment(np.concatenate(speech))
+    assert [kind for kind in events if kind != "audio"] == ["start", "end", "start", "end"]
+    # An utterance still in progress at the end of the stream is closed by flush()
+    assert segment(np.concatenate([noise(0.5), tone(1.0, 16000)]))[-1] == "end"
+    assert segment(noise(2.0)) == []
+
+def test_vad_start_includes_pre_roll():
+    segmenter = VADSegmenter(pre_roll_ms=240)
+    events = segmenter.process(np.concatenate([noise(1.0), tone(0.5, 16000)]))
+    start = [audio for kind, audio in events if kind == "start"][0]
+    assert len(start) == segmenter._pre_roll.maxlen * segmenter.vad.frame_length
+    assert EnergyVAD().frame_levels(np.zeros((1, 480), dtype=np.float32))[0] == pytest.approx(-100)
+
+@pytest.mark.parametrize("text, sentences", [
+    ("Murder is defined in Sec. 300 of the I.P.C. and punished under Sec. 302. Bail is governed by the Cr.P.C. "
+     "in such cases. ", ["Murder is defined in Sec. 300 of the I.P.C. and punished under Sec. 302.",
+                         "Bail is governed by the Cr.P.C. in such cases."]),
+    ("In State v. Kumar the court held so. Art. 21 applies! Does it? ",
+     ["In State v. Kumar the court held so.", "Art. 21 applies!", "Does it?"]),
+    ("1. Introduction\n2. Facts of the case. Then", ["1. Introduction", "2. Facts of the case.", "Then"]),
+    ('He said "stop." Then left (quietly.) End', ['He said "stop."', "Then left (quietly.)", "End"]),
+])
+def test_iter_sentences_keeps_abbreviations_together(text, sentences):
+    assert list(iter_sentences(text)) == sentences
+    # The result does not depend on how the LLM tokenized the text
+    assert list(iter_sentences(iter(text))) == sentences
+
+def test_iter_sentences_cuts_long_sentences():
+    text = ", ".join(["the accused was present"] * 30) + "."
+    sentences = list(iter_sentences(text, max_chars=100))
+    assert len(sentences) > 1 and all(len(sentence) <= 100 for sentence in sentences)
+    assert " ".join(sentences).replace(", ", ",").replace(" ", "") == text.replace(", ", ",").replace(" ", "")
+
+def slow_tokens(sentences, pause):
+    """Token stream that pauses after the first sentence, like a slow LLM."""
+    for i, sentence in enumerate(sentences):
+        if i:
+            time.sleep(pause)
+        for word in sentence.split(" "):
+            yield word + " "
+
+def test_streaming_tts_speaks_in_order_and_caches(tmp_path):
+    sentences = ["Section 302 punishes murder.", "Bail is discretionary.", "Section 302 punishes murder."]
+    tts = StreamingTTS(str(tmp_path), synthesizer=StubSynthesizer(seconds_per_char=0.001), workers=3)
+    chunks = list(tts.speak(slow_tokens(sentences, 0)))
+    assert [chunk["index"] for chunk in chunks] == [0, 1, 2]
+    assert [chunk["text"] for chunk in chunks] == sentences
+    assert chunks[0]["audio"] == chunks[2]["audio"] and chunks[0]["audio"][:4] == b"RIFF"
+    assert [chunk["cached"] for chunk in list(tts.speak(slow_tokens(sentences, 0)))] == [True] * 3
+    tts.close()
+
+def test_streaming_tts_does_not_wait_for_the_token_stream(tmp_path):
+    tts = StreamingTTS(str(tmp_path), synthesizer=StubSynthesizer(), use_cache=False)
+    stream = tts.speak(slow_tokens(["First sentence.", "Second sentence."], pause=1.0))
+    start = time.perf_counter()
+    first = next(stream)
+    assert first["text"] == "First sentence."
+    assert time.perf_counter() - start < 0.5
+    stream.close()
+    tts.close()
+
+def test_streaming_tts_reraises_token_stream_errors(tmp_path):
+    def failing_tokens():
+        yield "Spoken first. "
+        raise RuntimeError("LLM disconnected")
+
+    tts = StreamingTTS(str(tmp_path), synthesizer=StubSynthesizer(), use_cache=False)
+    stream = tts.speak(failing_tokens())
+    assert next(stream)["text"] == "Spoken first."
+    with pytest.raises(RuntimeError):
+        next(stream)
+    tts.close()
+
+def test_stage_timer_summarizes_bounded_spans():
+    timer = StageTimer(max_samples=5)
+    for ms in range(1, 11):
+        timer.record("retrieve", ms / 1000)
+    with timer.span("rerank"):
+        pass
+    summary = timer.summary()
+    # Totals cover every span; percentiles only the most recent max_samples
+    assert summary["retrieve"]["count"] == 10
+    assert summary["retrieve"]["total_s"] == pytest.approx(0.055)
+    assert summary["retrieve"]["p50_ms"] == pytest.approx(8.0)
+    assert summary["retrieve"]["max_ms"] == pytest.approx(10.0)
+    assert summary["rerank"]["count"] == 1
+    assert "retrieve 0.06s/10" in timer.format()
+    timer.reset()
+    assert timer.summary() == {}
+    assert percentile([], 95) == 0.0
+
+@pytest.mark.parametrize("flags, config", [(set(), "avx2"), ({"avx2", "avx512f"}, "avx512"),
+                                           ({"avx512f", "avx512_vnni"}, "avx512_vnni")])
+def test_int8_config_follows_cpu_flags(monkeypatch, flags, config):
+    monkeypatch.setattr(model_registry.platform, "machine", lambda: "x86_64")
+    monkeypatch.setattr(model_registry, "_cpu_flags", lambda: flags)
+    assert model_registry.detect_int8_config() == config
+
+@pytest.fixture
+def embedding_server(tmp_path, monkeypatch):
+    monkeypatch.delenv(model_registry.BACKEND_ENV, raising=False)
+    monkeypatch.delenv(model_registry.INT8_CONFIG_ENV, raising=False)
+    server = EmbeddingServer(str(tmp_path / "embeddings.sock"), model=StubEmbedder(dimension=8))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_embedding_client_round_trip(embedding_server):
+    client = EmbeddingClient(embedding_server.server_address, expected_model=model_registry.DEFAULT_EMBEDDING_MODEL,
+                             expected_backend="torch").connect()
+    try:
+        texts = ["Article 21 protects life", "Section 302 IPC"]
+        np.testing.assert_array_equal(client.encode(texts), StubEmbedder(dimension=8).encode(texts))
+        assert client.encode("Article 21").shape == (8,)
+        assert client.get_sentence_embedding_dimension() == 8
+        with pytest.raises(RuntimeError):
+            client.encode([None])  # Server-side errors are reported, and the connection stays usable
+        assert client.encode(texts).shape == (2, 8)
+    finally:
+        client.close()
+
+@pytest.mark.parametrize("expected", [{"expected_model": "other-model"}, {"expected_backend": "onnx"}])
+def test_embedding_client_refuses_a_mismatched_daemon(embedding_server, expected):
+    client = EmbeddingClient(embedding_server.server_address, **expected)
+    with pytest.raises(ValueError):
+        client.connect()
+    assert client._sock is None
@@ -0,0 +1,454 @@
+from src.models.embeddings.sentence_transformers.stub_embedder import StubEmbedder
+from src.models.llm.legal_llm_model.stub_llm import AsyncStubLLM, StubLLM
+from src.pipelines.retrieval_pipeline import RetrievalPipeline
+from src.retrieval.batching import MicroBatcher
+from src.retrieval.bm25_index import BM25Index, tokenize
+from src.retrieval.context_builder import ContextBuilder
+from src.retrieval.cache import AnswerCache, LRUCache, QueryCache
+from src.retrieval.ranker import CrossEncoderReranker, HybridRanker, reciprocal_rank_fusion
+from src.retrieval.filters import FieldIndex, build_where, parse_where
+from src.retrieval.vector_db.chromadb_handler import (PartitionedCollection, generation_path, get_client,
+                                                      load_embeddings_to_chromadb, sync_embeddings_to_chromadb)
+from src.retrieval.vector_db.embedding_store import EmbeddingStore
+import asyncio
+import gc
+import math
+import threading
+import time
+import numpy as np
+import os
+import pytest
+
+def write_store(base_path, rows=20, dim=8):
+    """An embedding store with two shards per data type, both data types sharing the file name doc.txt."""
+    store = EmbeddingStore(os.path.join(base_path, r"processed\embeddings"))
+    rng = np.random.default_rng(0)
+    for data_type in ("legal_texts", "previous_year_docs"):
+        for source in ("doc.txt", "other.txt"):
+            metadata = [{"chunk": f"{data_type} {source} chunk {i}", "source": source, "page": i % 5}
+                        for i in range(rows)]
+            store.write_shard(data_type, source, rng.standard_normal((rows, dim)), metadata)
+    return store
+
+def read_generation(base_path):
+    path = generation_path(base_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def test_faiss_build_outside_index_dir_keeps_cache_generation(tmp_path):
+    faiss_index_manager = pytest.importorskip("src.retrieval.vector_db.faiss_index_manager")
+    base_path = str(tmp_path)
+    write_store(base_path)
+    experiment = faiss_index_manager.FaissIndexManager(base_path, index_type="flat",
+                                                       index_dir=str(tmp_path / "experiment"))
+    assert experiment.build().count() == 80
+    assert read_generation(base_path) is None
+    faiss_index_manager.FaissIndexManager(base_path, index_type="flat").build()
+    generation = read_generation(base_path)
+    assert generation is not None
+    experiment.build()
+    assert read_generation(base_path) == generation
+
+def test_sync_only_replaces_the_changed_data_type(tmp_path):
+    base_path = str(tmp_path)
+    write_store(base_path)
+    load_embeddings_to_chromadb(base_path)
+    collection = get_client(base_path).get_collection("legal_docs")
+    assert collection.count() == 80
+    # The same file name re-ingested under one data type leaves the other's vectors alone
+    sync_embeddings_to_chromadb({"legal_texts": {"updated": ["doc.txt"], "removed": []}}, base_path)
+    assert collection.count() == 80
+    sync_embeddings_to_chromadb({"legal_texts": {"updated": [], "removed": ["doc.txt"]}}, base_path)
+    assert len(collection.get(where={"data_type": "legal_texts"})["ids"]) == 20
+    assert len(collection.get(where={"data_type": "previous_year_docs"})["ids"]) == 40
+
+def test_reload_replaces_changed_and_removed_shards(tmp_path):
+    base_path = str(tmp_path)
+    store = write_store(base_path)
+    collection = get_client(base_path).get_or_create_collection("legal_docs")
+    # Positional rows written by the pickle-based loader are purged on the first load
+    collection.add(ids=["legal_texts_0", "legal_texts_1"], embeddings=np.zeros((2, 8)).tolist(),
+                   metadatas=[{"chunk": "old"}, {"chunk": "old"}])
+    load_embeddings_to_chromadb(base_path)
+    assert collection.count() == 80
+
+    rng = np.random.default_rng(1)
+    metadata = [{"chunk": f"rewritten chunk {i}", "source": "doc.txt", "page": 0} for i in range(5)]
+    store.write_shard("legal_texts", "doc.txt", rng.standard_normal((5, 8)), metadata)
+    load_embeddings_to_chromadb(base_path)
+    assert collection.count() == 65
+    documents = collection.get(where={"$and": [{"source": "doc.txt"}, {"data_type": "legal_texts"}]})["documents"]
+    assert sorted(documents) == sorted(meta["chunk"] for meta in metadata)
+
+    store.remove_shard("legal_texts", "doc.txt")
+    load_embeddings_to_chromadb(base_path)
+    assert collection.count() == 60
+    assert not collection.get(where={"$and": [{"source": "doc.txt"}, {"data_type": "legal_texts"}]})["ids"]
+
+def test_partitioned_collection_honours_include(tmp_path):
+    base_path = str(tmp_path)
+    store = write_store(base_path)
+    load_embeddings_to_chromadb(base_path, partitioned=True)
+    collection = PartitionedCollection(get_client(base_path))
+    query = np.asarray(store.open_embeddings("legal_texts", "doc.txt")[:1])
+    full = collection.query(query, n_results=5)
+    assert set(full) == {"ids", "metadatas", "documents", "distances"}
+    assert full["distances"][0] == sorted(full["distances"][0]) and full["distances"][0][0] < 1e-6
+
+    documents = collection.query(query, n_results=5, include=["documents"])
+    assert set(documents) == {"ids", "documents"}
+    assert documents["ids"] == full["ids"] and documents["documents"] == full["documents"]
+    found = collection.get(ids=full["ids"][0], include=["metadatas"])
+    assert set(found) == {"ids", "metadatas"} and sorted(found["ids"]) == sorted(full["ids"][0])
+
+WHERE_FILTERS = [
+    {"data_type": "legal_texts"},
+    {"$and": [{"data_type": {"$in": ["legal_texts", "previous_year_docs"]}}, {"source": {"$eq": "doc.txt"}}]},
+    {"$or": [{"source": "other.txt"}, {"page": {"$gte": 3}}]},
+    {"data_type": {"$ne": "legal_texts"}},
+    {"source": {"$nin": ["doc.txt"]}},
+    {"$and": [{"page": {"$gt": 0}}, {"page": {"$lt": 3}}]},
+    {"$and": [{"page": {"$lte": 1}}, {"$or": [{"data_type": "legal_texts"}, {"source": {"$ne": "doc.txt"}}]}]},
+    {"source": "missing.txt"},
+]
+
+def test_parse_where_flattens_conjunctions():
+    where = {"$and": [{"data_type": {"$in": ["a", "b"]}}, {"$and": [{"data_type": "b"}, {"source": {"$eq": "x"}}]}]}
+    assert parse_where(where) == {"data_type": {"b"}, "source": {"x"}}
+    assert parse_where(build_where({"source": {"x", "y"}})) == {"source": {"x", "y"}}
+    assert parse_where(None) == {}
+    for where in ({"$or": [{"source": "x"}, {"source": "y"}]}, {"page": {"$gt": 2}}):
+        with pytest.raises(ValueError):
+            parse_where(where)
+
+def test_field_index_matches_chroma_filters(tmp_path):
+    base_path = str(tmp_path)
+    write_store(base_path)
+    load_embeddings_to_chromadb(base_path)
+    collection = get_client(base_path).get_collection("legal_docs")
+    rows = collection.get(include=["metadatas"])
+    fields = FieldIndex()
+    for meta in rows["metadatas"]:
+        fields.add(meta)
+    fields.finalize().save(base_path)
+    fields = FieldIndex().load(base_path)
+    assert fields.mask(None) is None
+    for where in WHERE_FILTERS:
+        expected = set(collection.get(where=where)["ids"])
+        found = {id_ for id_, keep in zip(rows["ids"], fields.mask(where)) if keep}
+        assert found == expected, where
+
+def test_field_index_rejects_unknown_fields_and_operators():
+    fields = FieldIndex()
+    fields.add({"data_type": "legal_texts", "source": "doc.txt", "page": 1})
+    fields.finalize()
+    with pytest.raises(ValueError):
+        fields.mask({"author": "x"})
+    with pytest.raises(ValueError):
+        fields.mask({"source": {"$contains": "doc"}})
+
+def test_faiss_query_accepts_every_filter(tmp_path):
+    faiss_index_manager = pytest.importorskip("src.retrieval.vector_db.faiss_index_manager")
+    base_path = str(tmp_path)
+    store = write_store(base_path)
+    index = faiss_index_manager.FaissIndexManager(base_path, index_type="hnsw").build()
+    query = np.asarray(store.open_embeddings("legal_texts", "doc.txt")[:1])
+    results = index.query(query, n_results=10, where={"$or": [{"source": "other.txt"}, {"page": {"$gte": 3}}]})
+    assert len(results["ids"][0]) == 10
+    assert all(meta["source"] == "other.txt" or meta["page"] >= 3 for meta in results["metadatas"][0])
+
+def test_faiss_rebuild_interrupted_before_the_swap_keeps_the_old_index(tmp_path, monkeypatch):
+    faiss_index_manager = pytest.importorskip("src.retrieval.vector_db.faiss_index_manager")
+    base_path = str(tmp_path)
+    store = write_store(base_path)
+    faiss_index_manager.FaissIndexManager(base_path, index_type="flat").build()
+    rng = np.random.default_rng(2)
+    store.write_shard("legal_texts", "new.txt", rng.standard_normal((30, 8)),
+                      [{"chunk": f"new chunk {i}", "source": "new.txt", "page": 0} for i in range(30)])
+
+    def crash(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(faiss_index_manager.FieldIndex, "finalize", crash)
+    with pytest.raises(OSError):
+        faiss_index_manager.FaissIndexManager(base_path, index_type="flat").build()
+    index = faiss_index_manager.FaissIndexManager(base_path, index_type="flat").load()
+    assert index.count() == 80 and len(index._offsets) == 81 and len(index.fields.codes["source"]) == 80
+
+def test_micro_batcher_keeps_pending_flushes_alive():
+    def double(items):
+        gc.collect()  # Pending flush tasks must survive a collection while the batch runs
+        return [2 * item for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=1)
+        results = await asyncio.gather(*(batcher.submit(n) for n in range(10)))
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == [2 * n for n in range(10)]
+    assert batcher.stats()["batches"] == 3
+    assert not batcher._tasks
+
+def test_lru_cache_evicts_least_recently_used_and_expires():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+    cache = LRUCache(ttl=0.05)
+    cache.set("a", 1)
+    time.sleep(0.1)
+    assert cache.get("a", "expired") == "expired"
+    assert cache.stats()["size"] == 0
+
+class Clock:
+    """Stand-in for time.time so answer TTLs can be tested without sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_answer_cache_exact_and_semantic_hits(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), ttl=60, similarity_threshold=0.9)
+    cache.set("What is Article 21?", [1.0, 0.0], 5, "g1", {"response": "life"})
+    assert cache.get("  what is  ARTICLE 21? ", [0.0, 1.0], 5, "g1") == {"response": "life"}
+    assert cache.get("Right to life?", [1.0, 0.0], 10, "g1") is None
+    assert cache.get("What is Article 21?", [1.0, 0.0], 5, "g2") is None
+    assert cache.get("Right to life?", [0.0, 1.0], 5, "g1") is None
+    assert cache.get("Right to life?", [0.99, 0.05], 5, "g1") == {"response": "life"}
+    assert cache.semantic_hits == 1
+
+    # Expired answers are not served, including from the in-memory semantic matrix
+    clock.now += 61
+    assert cache.get("What is Article 21?", [1.0, 0.0], 5, "g1") is None
+    assert cache.get("Right to life?", [0.99, 0.05], 5, "g1") is None
+
+def test_answer_cache_evicts_least_recently_accessed(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), max_entries=2)
+    for n, query in enumerate(["a", "b"]):
+        clock.now += 1
+        cache.set(query, [1.0, float(n)], 5, "g", {"response": query})
+    clock.now += 1
+    assert cache.get("a", [1.0, 0.0], 5, "g") is not None
+    clock.now += 1
+    cache.set("c", [0.0, 1.0], 5, "g", {"response": "c"})
+    assert cache.get("b", [1.0, 1.0], 5, "g") is None
+    assert cache.get("a", [1.0, 0.0], 5, "g") is not None and cache.stats()["size"] == 2
+
+def test_answer_cache_keeps_pipeline_configs_apart(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    plain = AnswerCache(path, similarity_threshold=0.9, namespace="plain")
+    reranked = AnswerCache(path, similarity_threshold=0.9, namespace="reranked")
+    plain.set("What is Article 21?", [1.0, 0.0], 5, "g", {"response": "plain"})
+    assert reranked.get("What is Article 21?", [1.0, 0.0], 5, "g") is None
+    assert plain.get("What is Article 21?", [1.0, 0.0], 5, "g") == {"response": "plain"}
+
+def test_query_cache_drops_answers_when_the_generation_changes(tmp_path):
+    marker = tmp_path / "legal_docs.generation"
+    marker.write_text("g1", encoding="utf-8")
+    cache = QueryCache(str(tmp_path / "answers.sqlite"), str(marker), config={"hybrid": False})
+    cache.retrievals.set("key", ["id"])
+    cache.answers.set("q", [1.0], 5, cache.sync_generation(), {"response": "old"})
+    assert cache.sync_generation() == "g1" and cache.retrievals.get("key") == ["id"]
+
+    marker.write_text("g2", encoding="utf-8")
+    os.utime(marker, ns=(0, time.time_ns() + 10 ** 9))  # Coarse mtime clocks may not tick between writes
+    assert cache.sync_generation() == "g2"
+    assert cache.retrievals.get("key") is None
+    assert cache.answers.get("q", [1.0], 5, "g1") is None and cache.answers.stats()["size"] == 0
+
+def test_async_pipeline_runs_under_successive_event_loops(tmp_path):
+    pipeline = RetrievalPipeline(str(tmp_path), embedder=StubEmbedder(dimension=8), context_tokens=None,
+                                 llm_client=StubLLM(latency=0), async_llm_client=AsyncStubLLM(latency=0.01),
+                                 max_concurrent_llm=1)
+
+    async def ask(*queries):
+        return await asyncio.gather(*(pipeline.arun(query, 2) for query in queries))
+
+    # Queries contend for the LLM semaphore in both runs; the second must not reuse the first loop's
+    first = asyncio.run(ask("What is Article 21?", "What is Article 22?"))
+    second = asyncio.run(ask("What is Article 14?", "What is Article 15?"))
+    assert [result["response"].split(".")[0] for result in first + second] == [
+        f"Stub answer to: What is Article {n}?" for n in (21, 22, 14, 15)]
+    assert asyncio.run(ask("What is Article 21?"))[0]["response"] == first[0]["response"]
+    assert pipeline.cache_stats()["answers"]["hits"] == 1
+
+BM25_ROWS = [
+    {"id": "a", "chunk": "Article 21 protects life and personal liberty", "data_type": "legal_texts"},
+    {"id": "b", "chunk": "Section 302 IPC punishes murder; murder is a grave offence", "data_type": "legal_texts"},
+    {"id": "c", "chunk": "Liberty of the press under Article 19", "data_type": "previous_year_docs"},
+    {"id": "d", "chunk": "The court discussed murder and liberty", "data_type": "previous_year_docs"},
+]
+
+def reference_bm25(rows, query, k1=1.2, b=0.75):
+    """Textbook BM25 scores of every row with a positive score."""
+    docs = [tokenize(row["chunk"]) for row in rows]
+    avg_length = sum(map(len, docs)) / len(docs)
+    scores = {}
+    for row, doc in zip(rows, docs):
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf, df = doc.count(term), sum(term in other for other in docs)
+            if tf:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_length))
+        if score > 0:
+            scores[row["id"]] = score
+    return scores
+
+def test_bm25_matches_reference_scores_and_survives_a_round_trip(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25")).build(BM25_ROWS)
+    for query in ["murder liberty", "Article 21", "liberty liberty", "unknown words"]:
+        expected = reference_bm25(BM25_ROWS, query)
+        results = index.search(query, k=10)
+        assert [id_ for id_, _ in results] == sorted(expected, key=expected.get, reverse=True)
+        assert all(score == pytest.approx(expected[id_], rel=1e-5) for id_, score in results)
+        assert BM25Index(index.index_dir).load().search(query, k=10) == results
+    assert index.search("murder liberty", k=1) == index.search("murder liberty", k=10)[:1]
+    assert not [name for name in os.listdir(index.index_dir) if name.endswith(".tmp")]
+
+def test_bm25_where_filter_masks_rows(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25")).build(BM25_ROWS)
+    scoped = index.search("murder liberty", k=10, where={"data_type": "previous_year_docs"})
+    assert [id_ for id_, _ in scoped] == ["d", "c"]
+    assert dict(scoped) == pytest.approx({id_: score for id_, score in index.search("murder liberty", k=10)
+                                          if id_ in ("c", "d")})
+    assert index.search("murder", k=10, where={"data_type": {"$nin": ["legal_texts", "previous_year_docs"]}}) == []
+
+def test_reciprocal_rank_fusion_orders_by_fused_score():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]]) == ["c", "a", "b", "d"]
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], weights=[1.0, 0.0]) == ["a", "b", "c", "d"]
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]], k=1) == ["a", "b"]
+
+class FakeCollection:
+    """Dense retriever returning a fixed ranking, with a get() for ids only BM25 found."""
+
+    def __init__(self, ranking):
+        self.ranking = ranking
+        self.fetched = []
+
+    def query(self, query_embeddings, n_results, where=None):
+        ids = self.ranking[:n_results]
+        return {"ids": [ids], "metadatas": [[{"chunk": id_} for id_ in ids]], "documents": [list(ids)]}
+
+    def get(self, ids, include=None):
+        self.fetched.extend(ids)
+        return {"ids": list(ids), "metadatas": [{"chunk": id_} for id_ in ids], "documents": list(ids)}
+
+def test_hybrid_ranker_fuses_dense_and_bm25_results(tmp_path):
+    bm25 = BM25Index(str(tmp_path / "bm25")).build(BM25_ROWS)
+    collection = FakeCollection(["a", "c", "x"])
+    ids, metadatas, documents = HybridRanker(collection, bm25).retrieve("murder liberty", [0.0], n_results=3)
+    sparse = [id_ for id_, _ in bm25.search("murder liberty", k=6)]
+    assert ids == reciprocal_rank_fusion([["a", "c", "x"], sparse])[:3]
+    assert [meta["chunk"] for meta in metadatas] == documents == ids
+    assert set(collection.fetched) == set(ids) - {"a", "c", "x"}
+
+class FakeCrossEncoder:
+    """Scores a chunk by its word count; predict waits on gate, when given, to simulate a slow model."""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.pairs.extend(pairs)
+        return [float(len(chunk.split())) for _, chunk in pairs]
+
+def candidates(*chunks):
+    return [{"chunk": chunk} for chunk in chunks], [f"doc {n}" for n in range(len(chunks))]
+
+def test_reranker_orders_by_score_and_caches_scores():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, latency_budget_ms=None)
+    metadatas, documents = candidates("one", "one two three", "one two")
+    kept, kept_documents = reranker.rerank("Query", metadatas, documents, top_k=2)
+    assert [meta["chunk"] for meta in kept] == ["one two three", "one two"]
+    assert kept_documents == ["doc 1", "doc 2"]
+    # The same (normalized query, chunk) pairs are served from the score cache
+    reranker.rerank("  query ", metadatas, documents, top_k=2)
+    reranker.rerank("query", *candidates("one", "four"), top_k=2)
+    assert model.pairs == [("query", "one"), ("query", "one two three"), ("query", "one two"), ("query", "four")]
+    assert reranker.stats()["reranked"] == 3 and reranker.stats()["score_cache"]["hits"] == 4
+
+def test_reranker_keeps_chunks_within_the_token_budget():
+    reranker = CrossEncoderReranker(model=FakeCrossEncoder(), max_tokens=5, latency_budget_ms=None)
+    kept, _ = reranker.rerank("q", *candidates("a b c d e f g", "a b c", "a b", "a"), top_k=3)
+    # The top chunk is kept even over budget; later chunks that would overflow it are skipped
+    assert [meta["chunk"] for meta in kept] == ["a b c d e f g"]
+    kept, _ = reranker.rerank("q", *candidates("a b c", "a b c d", "a", "a b"), top_k=3)
+    assert [meta["chunk"] for meta in kept] == ["a b c d", "a"]
+
+def test_reranker_falls_back_to_dense_order_over_the_latency_budget():
+    gate = threading.Event()
+    model = FakeCrossEncoder(gate)
+    reranker = CrossEncoderReranker(model=model, latency_budget_ms=20, workers=1)
+    metadatas, documents = candidates("one", "one two three")
+    kept, _ = reranker.rerank("q", metadatas, documents, top_k=2)
+    assert [meta["chunk"] for meta in kept] == ["one", "one two three"]
+    assert reranker.stats()["fallbacks"] == 1 and reranker.stats()["skipped"] == 0
+
+    # The only worker is still busy, so the next request skips scoring instead of queueing
+    kept, _ = reranker.rerank("q", *candidates("a", "a b"), top_k=2)
+    assert [meta["chunk"] for meta in kept] == ["a", "a b"]
+    assert reranker.stats()["skipped"] == 1
+
+    # The abandoned call finishes in the background and fills the score cache
+    gate.set()
+    reranker.executor.shutdown(wait=True)
+    assert reranker.score("q", ["one", "one two three"]) == [1.0, 3.0]
+    assert len(model.pairs) == 2
+
+class WordTokenizer:
+    """Whitespace tokenizer with the Hugging Face call/decode interface used by ContextBuilder."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+SOURCE_TEXT = "The Constitution of India guarantees the right to life and personal liberty under Article 21."
+
+def source_chunk(index, start, end, source="constitution.txt"):
+    return {"chunk": SOURCE_TEXT[start:end], "chunk_index": index, "start": start, "source": source,
+            "data_type": "legal_texts"}
+
+def test_context_builder_merges_adjacent_chunks_and_trims_overlap():
+    builder = ContextBuilder(max_tokens=100, tokenizer=WordTokenizer())
+    docs = [source_chunk(1, 20, 55), source_chunk(0, 0, 30), {"chunk": "Unrelated ruling.", "source": "other.txt"}]
+    assert builder.merge_adjacent(docs) == [SOURCE_TEXT[:55], "Unrelated ruling."]
+    # A neighbour lying entirely inside the passage adds nothing; gaps are joined with a space
+    docs = [source_chunk(0, 0, 40), source_chunk(1, 10, 30), source_chunk(2, 50, 70)]
+    assert builder.merge_adjacent(docs) == [SOURCE_TEXT[:40] + " " + SOURCE_TEXT[50:70]]
+
+def test_context_builder_drops_near_duplicates():
+    builder = ContextBuilder(max_tokens=100, tokenizer=WordTokenizer())
+    duplicate = {"chunk": SOURCE_TEXT, "source": "copy.txt"}
+    context = builder.build([{"chunk": SOURCE_TEXT, "source": "a.txt"}, duplicate,
+                             {"chunk": "Section 302 IPC punishes murder.", "source": "b.txt"}])
+    assert context == SOURCE_TEXT + "\n\n" + "Section 302 IPC punishes murder."
+    assert builder.last_stats["retrieved"] == 3 and builder.last_stats["after_dedup"] == 2
+
+def test_context_builder_truncates_the_top_passage_to_the_budget():
+    builder = ContextBuilder(max_tokens=4, tokenizer=WordTokenizer())
+    context = builder.build([{"chunk": SOURCE_TEXT, "source": "a.txt"}, {"chunk": "Short.", "source": "b.txt"}])
+    assert context == "The Constitution of India"
+    assert builder.last_stats["packed"] == 1 and builder.last_stats["tokens"] == 4
+    builder = ContextBuilder(max_tokens=5, tokenizer=WordTokenizer())
+    assert builder.build([{"chunk": "a b c", "source": "a.txt"}, {"chunk": "d e f", "source": "b.txt"},
+                          {"chunk": "g", "source": "c.txt"}]) == "a b c\n\ng"
@@ -0,0 +1,266 @@
+import numpy as np
+from collections import deque
+import wave
+
+TARGET_SAMPLE_RATE = 16000  # Whisper's input rate
+
+def _scratch(buffers, name, size, dtype=np.float32):
+    """Return a reusable array of at least size elements from buffers, growing it geometrically."""
+    buffer = buffers.get(name)
+    if buffer is None or len(buffer) < size:
+        buffer = buffers[name] = np.empty(max(size, 2 * len(buffer) if buffer is not None else size), dtype=dtype)
+    return buffer
+
+def pcm_to_float(data, sample_width, channels, out=None):
+    """Convert interleaved little-endian PCM bytes to mono float32 in [-1, 1].
+
+    Channels are averaged; the result is written into out when it is large enough.
+    """
+    if sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) - ((raw[:, 2] >= 128) << 24)
+        scale = float(1 << 23)
+    elif sample_width == 1:
+        samples, scale = np.frombuffer(data, dtype=np.uint8), 128.0
+    else:
+        samples, scale = np.frombuffer(data, dtype=f"<i{sample_width}"), float(1 << (8 * sample_width - 1))
+    frames = len(samples) // channels
+    if out is None or len(out) < frames:
+        out = np.empty(frames, dtype=np.float32)
+    result = out[:frames]
+    if channels == 1:
+        result[:] = samples
+    else:
+        np.mean(samples[:frames * channels].reshape(frames, channels), axis=1, dtype=np.float32, out=result)
+    if sample_width == 1:
+        result -= 128.0  # 8-bit WAV is unsigned
+    result *= 1.0 / scale
+    return result
+
+def read_wav(path):
+    """Read a whole PCM WAV file as (mono float32 samples, sample rate)."""
+    with wave.open(path, 'rb') as wav:
+        data = wav.readframes(wav.getnframes())
+        return pcm_to_float(data, wav.getsampwidth(), wav.getnchannels()), wav.getframerate()
+
+def write_wav(path, samples, sample_rate=TARGET_SAMPLE_RATE):
+    """Write mono float samples in [-1, 1] as a 16-bit PCM WAV file (path may be a binary file object)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+class WavReader:
+    """Streams a PCM WAV file as mono float32 blocks.
+
+    Every block is a view of one reused buffer, valid until the next block is read; copy it to keep it.
+    """
+
+    def __init__(self, path, block_ms=100):
+        """Open path and read it in blocks of block_ms milliseconds."""
+        self._wav = wave.open(path, 'rb')
+        self.sample_rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.sample_width = self._wav.getsampwidth()
+        self.duration = self._wav.getnframes() / self.sample_rate
+        self.block_frames = max(1, int(self.sample_rate * block_ms / 1000))
+        self._buffer = np.empty(self.block_frames, dtype=np.float32)
+
+    def __iter__(self):
+        while True:
+            data = self._wav.readframes(self.block_frames)
+            if not data:
+                return
+            yield pcm_to_float(data, self.sample_width, self.channels, self._buffer)
+
+    def close(self):
+        """Close the file."""
+        self._wav.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def lowpass_kernel(cutoff, taps=63):
+    """Hamming-windowed sinc low-pass FIR kernel; cutoff is in cycles per sample (0 to 0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+class StreamingResampler:
+    """Block-wise resampler to 16 kHz that is seamless across block boundaries.
+
+    Downsampling first applies an anti-aliasing FIR low-pass, then samples are linearly
+    interpolated at the target rate. Filter and interpolation state carry over between blocks
+    and all work arrays are reused; the returned block is a view valid until the next call.
+    """
+
+    def __init__(self, source_rate, target_rate=TARGET_SAMPLE_RATE, taps=63):
+        """Initialize for source_rate input; taps sets the low-pass filter length."""
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.ratio = source_rate / target_rate  # Input samples per output sample
+        self.kernel = lowpass_kernel(0.45 / self.ratio, taps) if self.ratio > 1 else None
+        self._history = np.zeros(taps - 1 if self.kernel is not None else 0, dtype=np.float32)
+        self._next = 0.0  # Time of the next output sample, in input samples from the current block's start
+        self._last = 0.0  # Last (filtered) sample of the previous block
+        self._buffers = {}
+
+    def process(self, block):
+        """Resample one block of mono float32 samples."""
+        if self.ratio == 1:
+            return block
+        n = len(block)
+        if n == 0:
+            return block[:0]
+        if self.kernel is not None:
+            history = len(self._history)
+            work = _scratch(self._buffers, "filter", history + n)[:history + n]
+            work[:history] = self._history
+            work[history:] = block
+            filtered = np.convolve(work, self.kernel, mode='valid')
+            self._history[:] = work[n:]
+        else:
+            filtered = block
+        # x[0] is the previous block's last sample (time -1), x[1:n+1] this block, x[n+1] pads the edge
+        x = _scratch(self._buffers, "x", n + 2)[:n + 2]
+        x[0] = self._last
+        x[1:n + 1] = filtered
+        x[n + 1] = filtered[-1]
+        count = int(np.floor((n - 1 - self._next) / self.ratio)) + 1 if self._next <= n - 1 else 0
+        times = _scratch(self._buffers, "times", count, np.float64)[:count]
+        np.multiply(np.arange(count), self.ratio, out=times)
+        times += self._next + 1  # Shift to x's indices
+        floor = _scratch(self._buffers, "floor", count, np.float64)[:count]
+        np.floor(times, out=floor)
+        index = _scratch(self._buffers, "index", count, np.intp)[:count]
+        index[:] = floor
+        frac = times
+        frac -= floor
+        out = _scratch(self._buffers, "out", count)[:count]
+        upper = _scratch(self._buffers, "upper", count)[:count]
+        np.take(x, index, out=out)
+        index += 1
+        np.take(x, index, out=upper)
+        upper -= out
+        upper *= frac
+        out += upper
+        self._next += count * self.ratio - n
+        self._last = filtered[-1]
+        return out
+
+class EnergyVAD:
+    """Frame-energy voice activity detector with an adaptive noise floor.
+
+    A frame is speech when its RMS level is above min_speech_db and margin_db above the noise
+    floor. The floor starts at a calibration prior no higher than min_speech_db - margin_db, so a
+    recording that opens with speech is still detected; it follows quiet frames down immediately
+    and drifts up slowly.
+    """
+
+    def __init__(self, sample_rate=TARGET_SAMPLE_RATE, frame_ms=30, margin_db=10.0, min_speech_db=-45.0,
+                 floor_rise=0.05):
+        """Initialize with the frame length and speech thresholds in dBFS."""
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.floor_rise = floor_rise
+        self.noise_floor_db = None
+
+    def frame_levels(self, frames):
+        """RMS level in dBFS of each row of a (frames, frame_length) array."""
+        power = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        return 10 * np.log10(power + 1e-10)
+
+    def is_speech(self, frames):
+        """Boolean speech flag per frame of a (frames, frame_length) array, updating the noise floor."""
+        levels = self.frame_levels(frames)
+        quiet = float(np.percentile(levels, 10))
+        if self.noise_floor_db is None:
+            self.noise_floor_db = min(quiet, self.min_speech_db - self.margin_db)
+        elif quiet < self.noise_floor_db:
+            self.noise_floor_db = quiet
+        else:
+            self.noise_floor_db += self.floor_rise * (quiet - self.noise_floor_db)
+        return levels > max(self.min_speech_db, self.noise_floor_db + self.margin_db)
+
+class VADSegmenter:
+    """Cuts a stream of 16 kHz samples into utterances using an EnergyVAD.
+
+    process() returns ("start", audio) when speech begins (audio includes pre_roll_ms before it),
+    ("audio", samples) while the utterance continues, and ("end", None) after end_ms of silence.
+    Audio arrays are views valid until the next call.
+    """
+
+    def __init__(self, vad=None, start_ms=90, end_ms=600, pre_roll_ms=240):
+        """Initialize with the speech needed to open an utterance and the silence that closes it."""
+        self.vad = vad or EnergyVAD()
+        self.frame_ms = frame_ms = 1000 * self.vad.frame_length / TARGET_SAMPLE_RATE
+        self.start_frames = max(1, int(start_ms / frame_ms))
+        self.end_frames = max(1, int(end_ms / frame_ms))
+        self.active = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._pre_roll = deque(maxlen=max(self.start_frames, int(pre_roll_ms / frame_ms)))
+        self._buffer = np.empty(0, dtype=np.float32)
+        self._carry_from = 0  # Incomplete trailing frame left by the previous call: buffer[carry_from:carry_to]
+        self._carry_to = 0
+
+    @property
+    def trailing_silence_ms(self):
+        """Silence since the last speech frame of the utterance in progress (0 when idle)."""
+        return self._silent_run * self.frame_ms if self.active else 0
+
+    def _frames(self, block):
+        """Complete frames of the carried samples plus block, as a (frames, frame_length) view."""
+        # The carry is moved only now, so the views returned by the previous call stayed valid until this one
+        carry = self._carry_to - self._carry_from
+        total = carry + len(block)
+        if len(self._buffer) < total:
+            grown = np.empty(max(total, 2 * len(self._buffer)), dtype=np.float32)
+            grown[:carry] = self._buffer[self._carry_from:self._carry_to]
+            self._buffer = grown
+        else:
+            self._buffer[:carry] = self._buffer[self._carry_from:self._carry_to]
+        self._buffer[carry:total] = block
+        length = self.vad.frame_length
+        count = total // length
+        self._carry_from, self._carry_to = count * length, total
+        return self._buffer[:count * length].reshape(count, length)
+
+    def process(self, block):
+        """Consume a block of samples and return the utterance events it completes."""
+        frames = self._frames(block)
+        events = []
+        if len(frames):
+            run_start = None
+            for i, voiced in enumerate(self.vad.is_speech(frames)):
+                if not self.active:
+                    self._pre_roll.append(frames[i].copy())
+                    self._voiced_run = self._voiced_run + 1 if voiced else 0
+                    if self._voiced_run >= self.start_frames:
+                        self.active, self._silent_run = True, 0
+                        events.append(("start", np.concatenate(self._pre_roll)))
+                        self._pre_roll.clear()
+                    continue
+                if run_start is None:
+                    run_start = i
+                self._silent_run = 0 if voiced else self._silent_run + 1
+                if self._silent_run >= self.end_frames:
+                    events.append(("audio", frames[run_start:i + 1].reshape(-1)))
+                    events.append(("end", None))
+                    self.active, self._voiced_run, run_start = False, 0, None
+            if run_start is not None:
+                events.append(("audio", frames[run_start:].reshape(-1)))
+        return events
+
+    def flush(self):
+        """End an utterance in progress at the end of the stream."""
+        if self.active:
+            self.active, self._voiced_run = False, 0
+            return [("end", None)]
+        return []
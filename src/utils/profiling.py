@@ -0,0 +1,61 @@
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+
+def percentile(values, q):
+    """Return the q-th percentile of values."""
+    ordered = sorted(values)
+    return ordered[int(q / 100 * (len(ordered) - 1))] if ordered else 0.0
+
+class StageTimer:
+    """Thread-safe collector of wall-clock spans per named pipeline stage.
+
+    Spans are cheap (two perf_counter calls), so pipelines keep one enabled; each stage keeps
+    its most recent max_samples spans for percentiles plus running totals.
+    """
+
+    def __init__(self, max_samples=10000):
+        """Initialize with the number of recent spans kept per stage."""
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every recorded span."""
+        with self._lock:
+            self._samples = {}
+            self._totals = {}
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one span of stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        """Record one span of stage lasting seconds."""
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.max_samples)
+                self._totals[stage] = [0, 0.0]
+            self._samples[stage].append(seconds)
+            self._totals[stage][0] += 1
+            self._totals[stage][1] += seconds
+
+    def summary(self):
+        """Per-stage span count, total seconds and p50/p95/p99/max latency in milliseconds."""
+        with self._lock:
+            stages = {stage: (list(samples), self._totals[stage]) for stage, samples in self._samples.items()}
+        return {stage: {"count": count, "total_s": total,
+                        "p50_ms": percentile(samples, 50) * 1000, "p95_ms": percentile(samples, 95) * 1000,
+                        "p99_ms": percentile(samples, 99) * 1000, "max_ms": max(samples) * 1000}
+                for stage, (samples, (count, total)) in stages.items()}
+
+    def format(self):
+        """One-line human-readable summary, for logs."""
+        return ", ".join(f"{stage} {stats['total_s']:.2f}s/{stats['count']} (p95 {stats['p95_ms']:.1f} ms)"
+                         for stage, stats in self.summary().items())
@@ -0,0 +1,260 @@
+import numpy as np
+from collections import Counter, deque
+import hashlib
+import re
+
+def collapse_whitespace(text):
+    """Strip text and collapse every whitespace run into a single space."""
+    # str.split() and re's \s share the same Unicode whitespace definition
+    return " ".join(text.split())
+
+class RegexRule:
+    """A named, precompiled regex substitution used by TextCleaningEngine."""
+
+    def __init__(self, name, pattern, replacement="", flags=0, guard=None):
+        """Compile the pattern and optional guard; the rule is skipped when the guard finds nothing."""
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self.replacement = replacement
+        self.guard = re.compile(guard, flags) if guard else None
+
+    def __call__(self, text):
+        if self.guard is not None and not self.guard.search(text):
+            return text
+        return self.pattern.sub(self.replacement, text)
+
+# Backtracking-safe form of the original citation pattern
+#   [A-Za-z\s]+ v\.? [A-Za-z\s]+, \d+ [A-Z\.]+ \d+ \(\d{4}\)
+# A match can only start where a run of letters/spaces starts, and whether the run is
+# followed by "," (plain "v") or ". " (dotted "v.") decides which split can succeed. The
+# lookbehind and lookaheads check that once per run with possessive scans, so the engine no
+# longer retries every position and every " v " inside long runs. Matches are unchanged.
+# Possessive quantifiers need Python 3.11, so they are spelled (?=(X+))\N, which re treats as
+# atomic on every version. The tail needs none: no class in it can absorb the next separator.
+_RUN = r'[A-Za-z\s]'
+_CITATION_TAIL = r', \d+ [A-Z\.]+ \d+ \(\d{4}\)'
+
+def _possessive(pattern, group):
+    """Emulate pattern (ending in + or *) as a possessive match; group is its capture group number."""
+    return rf'(?=({pattern}))\{group}'
+
+_CASE_CITATION = (
+    rf'(?<!{_RUN})'
+    rf'(?:(?={_possessive(_RUN + "*", 1)}{_CITATION_TAIL}){_RUN}+ v {_possessive(_RUN + "+", 2)}'
+    rf'|(?={_possessive(_RUN + "*", 3)}\. {_possessive(_RUN + "+", 4)}{_CITATION_TAIL})'
+    rf'{_RUN}+ v\. {_possessive(_RUN + "+", 5)})'
+    rf'{_CITATION_TAIL}'
+    r'|\[\d{4}\] \d+ [A-Z]+ \d+'
+)
+
+DEFAULT_CLEANING_RULES = [
+    # Remove extra whitespace and newlines
+    collapse_whitespace,
+    # Remove headers/footers (e.g., "Page X of Y", copyright)
+    RegexRule("headers_footers", r'Page \d+ of \d+|\d{4} \w+ \d+|\(c\) \d{4}.*?$', flags=re.IGNORECASE),
+    # Remove case citations (e.g., "Brown v. Board, 347 U.S. 483 (1954)", "[2020] 1 SCC 123")
+    RegexRule("case_citations", _CASE_CITATION, flags=re.IGNORECASE, guard=r'\(\d{4}\)|\[\d{4}\]'),
+    # Remove section numbers (e.g., "Section 123", "Sec. 45A", "§ 19(1)(a)")
+    RegexRule("section_numbers", r'(Section|Sec\.|§)\s*\d+[A-Za-z]*\d*\s*(?:\([a-zA-Z0-9\s]*\))?', flags=re.IGNORECASE),
+    # Remove special characters (keep alphanumeric, spaces, basic punctuation)
+    RegexRule("special_characters", r'[^\w\s.,!?;:]+'),
+]
+
+class TextCleaningEngine:
+    """Applies an ordered, configurable set of cleaning rules to text."""
+
+    def __init__(self, rules=None):
+        """Initialize with a list of rules (callables taking and returning text); defaults to the legal-text rules."""
+        self.rules = list(DEFAULT_CLEANING_RULES if rules is None else rules)
+
+    def clean(self, text):
+        """Run every rule over text in order."""
+        for rule in self.rules:
+            text = rule(text)
+        return text
+
+def simhash(text, shingle_size=3):
+    """Return a 64-bit SimHash fingerprint of text's word shingles as a 16-character hex string."""
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+                       for s in shingles], dtype='>u8')
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(shingles), 64)
+    fingerprint = np.packbits(bits.sum(axis=0) * 2 > len(shingles))
+    return fingerprint.tobytes().hex()
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hex SimHash fingerprints."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+_ACT_NAME = re.compile(r'\b((?:[A-Z][a-z]+ (?:(?:of|and|the|to|for|on|in) )?){1,7}Act),? (\d{4})\b')
+_ACT_NAME_LEADING = {"The", "Under", "In", "Of", "And", "By", "As", "See", "Section", "This"}
+
+def find_act_name(text):
+    """Return the most frequently cited "<Name> Act, <year>" in text, or None."""
+    counts = Counter()
+    for name, year in _ACT_NAME.findall(text):
+        words = name.split()
+        while len(words) > 2 and words[0] in _ACT_NAME_LEADING:
+            words.pop(0)
+        counts[f"{' '.join(words)}, {year}"] += 1
+    return counts.most_common(1)[0][0] if counts else None
+
+class RecursiveTextSplitter:
+    """Native port of LangChain's RecursiveCharacterTextSplitter that also reports chunk offsets.
+
+    Produces the same chunks as the LangChain splitter with keep_separator=True and
+    strip_whitespace=True (its defaults), but works on (start, end) spans of the input instead
+    of copied substrings, so text[start:end] is each chunk.
+    """
+
+    def __init__(self, chunk_size=500, chunk_overlap=50, separators=("\n\n", "\n", " ", "")):
+        """Initialize with the chunk size and overlap in characters and the separators tried in order."""
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+
+    def split_spans(self, text):
+        """Return the (start, end) offsets of each chunk of text."""
+        spans = []
+        self._split(text, 0, len(text), self.separators, spans)
+        return spans
+
+    def split_text(self, text):
+        """Split text into chunks."""
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def _pieces(self, text, start, end, separator):
+        # Pieces of text[start:end] cut before each separator occurrence (the separator starts the next piece)
+        if not separator:
+            return [(i, i + 1) for i in range(start, end)]
+        pieces, piece_start = [], start
+        found = text.find(separator, start, end)
+        while found >= 0:
+            if found > piece_start:
+                pieces.append((piece_start, found))
+            piece_start = found
+            found = text.find(separator, found + len(separator), end)
+        if end > piece_start:
+            pieces.append((piece_start, end))
+        return pieces
+
+    def _split(self, text, start, end, separators, spans):
+        separator, remaining = separators[-1], ()
+        for i, candidate in enumerate(separators):
+            if not candidate or text.find(candidate, start, end) >= 0:
+                separator, remaining = candidate, (separators[i + 1:] if candidate else ())
+                break
+        small = []
+        for piece in self._pieces(text, start, end, separator):
+            if piece[1] - piece[0] < self.chunk_size:
+                small.append(piece)
+                continue
+            if small:
+                self._merge(text, small, spans)
+                small = []
+            if remaining:
+                self._split(text, piece[0], piece[1], remaining, spans)
+            else:
+                spans.append(piece)  # Unsplittable; kept as is, like LangChain
+        if small:
+            self._merge(text, small, spans)
+
+    def _merge(self, text, pieces, spans):
+        # Pieces are adjacent, so a run of them is one contiguous span; keep_separator makes the join separator empty
+        window, total = deque(), 0
+        for piece in pieces:
+            length = piece[1] - piece[0]
+            if total + length > self.chunk_size and window:
+                self._emit(text, window[0][0], window[-1][1], spans)
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    first = window.popleft()
+                    total -= first[1] - first[0]
+            window.append(piece)
+            total += length
+        if window:
+            self._emit(text, window[0][0], window[-1][1], spans)
+
+    def _emit(self, text, start, end, spans):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+
+class KeywordMatcher:
+    """Case-insensitive multi-keyword search in one pass over the text (Aho-Corasick automaton).
+
+    Uses the pyahocorasick C extension when it is installed. Otherwise a pure-Python automaton
+    scans the pieces of a text (e.g. transcript lines) in turn, carrying its state across the
+    boundaries, so the pieces never need to be joined and any_match stops at the first hit.
+    """
+
+    def __init__(self, keywords):
+        """Build the automaton for keywords (matched lowercase, as substrings)."""
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        try:
+            import ahocorasick  # Optional C implementation
+        except ImportError:
+            self._automaton = None
+            self._build()
+        else:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+    def _build(self):
+        """Build the trie with failure links, then fold the failure links into a full transition table."""
+        goto, fail, output = [{}], [0], [()]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    fail.append(0)
+                    output.append(())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            output[state] = (keyword,)
+        self._delta = [None] * len(goto)
+        self._delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # States are visited breadth-first, so the failure state's table is already complete
+            self._delta[state] = dict(self._delta[fail[state]], **goto[state])
+            for char, child in goto[state].items():
+                fail[child] = self._delta[fail[state]].get(char, 0) if state else 0
+                output[child] = output[child] + output[fail[child]]
+                queue.append(child)
+        self._output = output
+
+    def _scan(self, pieces, separator):
+        """Yield every keyword occurrence across pieces joined by separator."""
+        if self._automaton is not None:
+            for _, keyword in self._automaton.iter(separator.join(pieces).lower()):
+                yield keyword
+            return
+        delta, output, state, joint = self._delta, self._output, 0, ""
+        for piece in pieces:
+            for char in joint + piece.lower():
+                state = delta[state].get(char, 0)
+                if output[state]:
+                    yield from output[state]
+            joint = separator
+
+    def matches(self, text, separator=" "):
+        """Set of keywords found in text, or in an iterable of pieces joined by separator."""
+        if not self.keywords:
+            return set()
+        return set(self._scan([text] if isinstance(text, str) else text, separator))
+
+    def any_match(self, text, separator=" "):
+        """Whether any keyword occurs in text, or in an iterable of pieces joined by separator."""
+        if not self.keywords:
+            return False
+        return next(self._scan([text] if isinstance(text, str) else text, separator), None) is not None